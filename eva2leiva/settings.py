@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -31,6 +32,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para medir también las consultas de sesión y autenticación
+    'siriusApp.instrumentacion.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,13 +41,16 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Último, para que el profiler solo cubra la vista
+    'siriusApp.perfilado.PerfiladorMiddleware',
 ]
 
 ROOT_URLCONF = 'eva2leiva.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates que además mide el tiempo de render (siriusApp.instrumentacion)
+        'BACKEND': 'siriusApp.instrumentacion.PlantillasMedidas',
         'DIRS': [TEMPLATE_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -77,6 +83,28 @@ DATABASES = {
 }
 
 
+# Authentication backends
+# PerfilBackend carga el PerfilUsuario junto al usuario en cada request
+
+AUTHENTICATION_BACKENDS = [
+    'siriusApp.backends.PerfilBackend',
+]
+
+
+# Cache
+# Compartida entre los procesos del servidor (a diferencia de LocMemCache), así
+# invalidar una versión en un proceso se ve en todos. Ver siriusApp/cacheo.py
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'sirius_cache'),
+        'TIMEOUT': 24 * 60 * 60,
+        'KEY_PREFIX': 'sirius',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -116,6 +144,49 @@ STATICFILES_DIRS = [STATIC_DIR]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Las subidas se hashean mientras llegan (adjuntos por contenido, ver siriusApp.almacenamiento)
+FILE_UPLOAD_HANDLERS = [
+    'siriusApp.almacenamiento.HashMemoryFileUploadHandler',
+    'siriusApp.almacenamiento.HashTemporaryFileUploadHandler',
+]
+
+# Instrumentación por petición: Server-Timing y log (ver siriusApp/instrumentacion.py)
+INSTRUMENTACION_ACTIVA = True
+# Una línea de log INFO por petición solo con SIRIUS_LOG_PETICIONES=1; los warnings de presupuesto van siempre
+INSTRUMENTACION_LOG_PETICIONES = os.environ.get('SIRIUS_LOG_PETICIONES') == '1'
+# Consultas SQL admitidas por nombre de URL antes de registrar un warning
+PRESUPUESTO_CONSULTAS = {
+    'default': 50,
+}
+
+# Segundos en proceso tras los que `procesar_exportaciones --recuperar` reencola una exportación
+EXPORTACION_TIEMPO_MAXIMO = 60 * 60
+
+# Volcados por proceso de siriusApp.metricas; compartido por los workers del servidor
+METRICAS_DIR = os.path.join(tempfile.gettempdir(), 'sirius_metricas')
+
+# Perfilado con cProfile (ver siriusApp/perfilado.py): 1 de cada N peticiones por nombre de URL
+PERFILADO_MUESTREO = {}
+PERFILES_DIR = os.path.join(tempfile.gettempdir(), 'sirius_perfiles')
+PERFILES_MAXIMO = 50
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'siriusApp.instrumentacion': {
+            'handlers': ['console'],
+            'level': 'INFO' if INSTRUMENTACION_LOG_PETICIONES else 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Login/Logout redirects
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/perfil/'  # Sin login/ antes
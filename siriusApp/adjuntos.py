@@ -0,0 +1,143 @@
+"""Referencias de los adjuntos guardados por contenido (modelo Adjunto).
+
+Las señales de Incidencia suman o restan una referencia cuando cambia
+archivo_adjunto. recolectar() borra los archivos sin referencias pasado un
+período de gracia y reconciliar() recalcula las referencias desde las
+incidencias, para los cambios hechos con update() o directo en la BD.
+"""
+import os
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .almacenamiento import PREFIJO, adjuntos, es_deduplicado
+from .models import Adjunto, Incidencia
+
+CAMPO = 'archivo_adjunto'
+# Un archivo recién subido aún no tiene incidencia guardada: no se toca antes de esto
+GRACIA = timedelta(hours=24)
+LOTE = 500
+
+
+def _tamano(nombre):
+    try:
+        return adjuntos.size(nombre)
+    except OSError:
+        return 0
+
+
+def referenciar(nombre, delta):
+    """Suma `delta` referencias al archivo; crea su fila la primera vez"""
+    if not es_deduplicado(nombre):
+        return
+    cambios = {'referencias': F('referencias') + delta, 'fecha_modificacion': timezone.now()}
+    if Adjunto.objects.filter(nombre=nombre).update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            Adjunto.objects.create(nombre=nombre, referencias=delta, tamano=_tamano(nombre))
+    except IntegrityError:
+        # Otro proceso creó la fila entre el update y el create
+        Adjunto.objects.filter(nombre=nombre).update(**cambios)
+
+
+def registrar_guardado(instance, created):
+    """Mueve la referencia si el save() cambió el archivo de la incidencia"""
+    actual = instance.archivo_adjunto.name or ''
+    if created:
+        anterior = ''
+    else:
+        originales = getattr(instance, '_valores_originales', None)
+        if originales is None or CAMPO not in originales:
+            # No sabemos el archivo anterior; reconciliar() corrige la diferencia
+            return
+        anterior = originales[CAMPO] or ''
+    if anterior != actual:
+        referenciar(anterior, -1)
+        referenciar(actual, 1)
+    instance._valores_originales = {**getattr(instance, '_valores_originales', {}), CAMPO: actual}
+
+
+def registrar_eliminacion(instance):
+    originales = getattr(instance, '_valores_originales', None) or {}
+    referenciar(originales.get(CAMPO, instance.archivo_adjunto.name) or '', -1)
+
+
+def calcular():
+    """Referencias reales por nombre de archivo, contadas desde las incidencias"""
+    filas = (
+        Incidencia.objects.filter(**{f'{CAMPO}__startswith': f'{PREFIJO}/'})
+        .values_list(CAMPO).annotate(total=Count('pk')).order_by()
+    )
+    return {nombre: total for nombre, total in filas if es_deduplicado(nombre)}
+
+
+def reconciliar(corregir=True):
+    """Compara las referencias guardadas con las reales; devuelve {nombre: (guardado, real)}"""
+    with transaction.atomic():
+        reales = calcular()
+        guardados = dict(Adjunto.objects.select_for_update().values_list('nombre', 'referencias'))
+        diferencias = {
+            nombre: (guardados.get(nombre, 0), reales.get(nombre, 0))
+            for nombre in set(reales) | set(guardados)
+            if guardados.get(nombre, 0) != reales.get(nombre, 0)
+        }
+        if corregir:
+            ahora = timezone.now()
+            for nombre, (guardado, real) in diferencias.items():
+                if nombre in guardados:
+                    Adjunto.objects.filter(nombre=nombre).update(referencias=real, fecha_modificacion=ahora)
+                else:
+                    Adjunto.objects.create(nombre=nombre, referencias=real, tamano=_tamano(nombre))
+    return diferencias
+
+
+def _candidatos(limite):
+    """(nombre, fila o None) de los archivos sin uso desde antes de `limite`"""
+    conocidos = {}
+    for adjunto in Adjunto.objects.filter(referencias__lte=0, fecha_modificacion__lt=limite):
+        conocidos[adjunto.nombre] = adjunto
+    registrados = set(Adjunto.objects.values_list('nombre', flat=True))
+    raiz = adjuntos.path(PREFIJO)
+    for carpeta, _, archivos in os.walk(raiz):
+        for archivo in archivos:
+            ruta = os.path.join(carpeta, archivo)
+            nombre = os.path.relpath(ruta, adjuntos.location).replace(os.sep, '/')
+            if not es_deduplicado(nombre) or (nombre in registrados and nombre not in conocidos):
+                continue
+            # El storage toca el archivo al reutilizarlo: la fecha del disco manda
+            if os.path.getmtime(ruta) >= limite.timestamp():
+                continue
+            yield nombre, conocidos.pop(nombre, None)
+    # Filas cuyo archivo ya no está en disco
+    for nombre, adjunto in conocidos.items():
+        yield nombre, adjunto
+
+
+def recolectar(gracia=GRACIA, simular=False):
+    """Borra archivos y filas sin referencias; devuelve (archivos, bytes) liberados.
+
+    Antes de borrar se confirma con las incidencias que nadie apunta al
+    archivo, por si las referencias derivaron.
+    """
+    limite = timezone.now() - gracia
+    borrados = liberados = 0
+    candidatos = list(_candidatos(limite))
+    for inicio in range(0, len(candidatos), LOTE):
+        lote = dict(candidatos[inicio:inicio + LOTE])
+        en_uso = set(Incidencia.objects.filter(**{f'{CAMPO}__in': list(lote)}).values_list(CAMPO, flat=True))
+        for nombre, adjunto in lote.items():
+            if nombre in en_uso:
+                continue
+            tamano = _tamano(nombre)
+            if not simular:
+                if adjunto is not None:
+                    eliminadas, _ = Adjunto.objects.filter(pk=adjunto.pk, referencias__lte=0).delete()
+                    if not eliminadas:
+                        continue
+                adjuntos.delete(nombre)
+            borrados += 1
+            liberados += tamano
+    return borrados, liberados
@@ -1,18 +1,192 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.admin.utils import get_last_value_from_parameters
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Cliente, Servicio, Proyecto, Presupuesto, Incidencia, PerfilUsuario
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import Count, Q
+from django.http import QueryDict
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.translation import gettext_lazy as _
+from . import importacion, transiciones
+from .forms import ImportacionForm, OpcionCacheadaField
+from .paginacion import PaginadorEstimado
+from .models import Cliente, Servicio, Proyecto, Presupuesto, Incidencia, PerfilUsuario, TrabajoExportacion
+
+# Errores que se muestran en pantalla; el resto se cuenta
+ERRORES_VISIBLES = 200
+
+class ImportarMixin:
+    """Agrega "Importar CSV/XLSX" al listado del admin (ver siriusApp.importacion)"""
+    tipo_importacion = None
+    change_list_template = 'admin/importar_change_list.html'
+
+    def get_urls(self):
+        opts = self.model._meta
+        return [
+            path('importar/', self.admin_site.admin_view(self.importar_view),
+                 name=f'{opts.app_label}_{opts.model_name}_importar'),
+        ] + super().get_urls()
+
+    def importar_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        resultado = None
+        form = ImportacionForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            resultado = importacion.importar(
+                self.tipo_importacion, archivo, importacion.formato_de(archivo.name), usuario=request.user,
+            )
+            nivel = messages.WARNING if resultado.errores else messages.SUCCESS
+            self.message_user(
+                request, f'{resultado.creados} filas importadas, {len(resultado.errores)} con errores.', nivel,
+            )
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f'Importar {self.model._meta.verbose_name_plural}',
+            'form': form,
+            'columnas': importacion.IMPORTADORES[self.tipo_importacion].columnas,
+            'resultado': resultado,
+            'errores': resultado.errores[:ERRORES_VISIBLES] if resultado else [],
+        }
+        return TemplateResponse(request, 'admin/importar.html', context)
+
+class ListadoGrandeMixin:
+    """Listado del admin para tablas grandes: total estimado y filtros sin cargar tablas enteras"""
+    paginator = PaginadorEstimado
+    # Sin el "(N en total)" que cuenta la tabla completa en cada página
+    show_full_result_count = False
+
+    class Media:
+        js = ['js/main.js']
+        css = {'all': ['css/admin_filtros.css']}
+
+class FiltroAutocompletar(admin.RelatedFieldListFilter):
+    """Filtro por FK que no lista todas las filas relacionadas.
+
+    RelatedFieldListFilter carga la tabla relacionada completa (miles de
+    clientes o usuarios) para armar los enlaces; este solo muestra lo elegido
+    y busca el resto con la vista de autocompletar del admin.
+    """
+    template = 'admin/filtro_autocompletar.html'
+
+    def field_choices(self, field, request, model_admin):
+        if not self.lookup_val:
+            return []
+        try:
+            relacionados = list(field.remote_field.model._default_manager.filter(
+                **{f'{field.target_field.name}__in': self.lookup_val}
+            ))
+        except (ValueError, ValidationError):
+            # Valor mal formado: queryset() lo reporta como IncorrectLookupParameters
+            return []
+        return [(getattr(obj, field.target_field.attname), str(obj)) for obj in relacionados]
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        opts = changelist.model._meta
+        parametros = QueryDict(mutable=True)
+        parametros.update({'app_label': opts.app_label, 'model_name': opts.model_name, 'field_name': self.field_path})
+        self.url = reverse(f'{changelist.model_admin.admin_site.name}:autocomplete') + '?' + parametros.urlencode()
+        self.ocultos = [
+            (nombre, valor) for nombre, valor in changelist.params.items()
+            if nombre not in (self.lookup_kwarg, self.lookup_kwarg_isnull)
+        ]
+        return super().choices(changelist)
+
+class FiltroAnio(admin.FieldListFilter):
+    """Desglose por año en lugar de date_hierarchy.
+
+    date_hierarchy arma sus enlaces con un SELECT DISTINCT sobre toda la tabla;
+    aquí los años salen de la primera y la última fecha, dos búsquedas en el índice.
+    """
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__year'
+        self.lookup_val = get_last_value_from_parameters(params, self.lookup_kwarg)
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.title = f'año de {self.title}'
+        self.model_admin = model_admin
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def anios(self):
+        if not hasattr(self, '_anios'):
+            # Dos consultas: con MIN y MAX juntos SQLite recorre la tabla en vez de usar el índice
+            fechas = (
+                self.model_admin.get_queryset(self.request)
+                .filter(**{f'{self.field_path}__isnull': False})
+                .order_by(self.field_path).values_list(self.field_path, flat=True)
+            )
+            primero = fechas.first()
+            ultimo = fechas.reverse().first()
+            self._anios = list(range(ultimo.year, primero.year - 1, -1)) if primero else []
+        return self._anios
+
+    def has_output(self):
+        # Sin consultar: has_output se llama también al armar cada conteo de facetas
+        return True
+
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        return {
+            f'{anio}__c': Count(pk_attname, filter=Q(**{self.lookup_kwarg: anio}))
+            for anio in self.anios()
+        }
+
+    def choices(self, changelist):
+        conteos = self.get_facet_queryset(changelist) if changelist.add_facets else None
+        yield {
+            'selected': self.lookup_val is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'display': _('All'),
+        }
+        for anio in self.anios():
+            yield {
+                'selected': self.lookup_val == str(anio),
+                'query_string': changelist.get_query_string({self.lookup_kwarg: anio}),
+                'display': f'{anio} ({conteos[f"{anio}__c"]})' if conteos else anio,
+            }
+
+class ProyectoActionForm(ActionForm):
+    estado = forms.ChoiceField(choices=[('', 'Estado: sin cambio')] + Proyecto.ESTADO_CHOICES, required=False)
+    prioridad = forms.ChoiceField(choices=[('', 'Prioridad: sin cambio')] + Proyecto.PRIORIDAD_CHOICES, required=False)
+
+class IncidenciaActionForm(ActionForm):
+    estado = forms.ChoiceField(choices=[('', 'Estado: sin cambio')] + Incidencia.ESTADO_CHOICES, required=False)
+    prioridad = forms.ChoiceField(choices=[('', 'Prioridad: sin cambio')] + Incidencia.PRIORIDAD_CHOICES, required=False)
+    asignado_a = OpcionCacheadaField('usuarios', empty_label='Asignado: sin cambio', required=False)
+
+def _cambio_masivo(modeladmin, request, queryset, cambiar, campos):
+    """Acción del admin: un UPDATE para todo el queryset con los campos del ActionForm"""
+    form = modeladmin.action_form(request.POST)
+    form.fields['action'].choices = modeladmin.get_action_choices(request)
+    cambios = {campo: form.cleaned_data.get(campo) for campo in campos} if form.is_valid() else {}
+    if not any(cambios.values()):
+        modeladmin.message_user(request, 'Elija al menos un valor nuevo junto a la acción.', messages.WARNING)
+        return
+    actualizadas = cambiar(queryset, **cambios)
+    modeladmin.message_user(request, f'{actualizadas} filas actualizadas.', messages.SUCCESS)
 
 @admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
+class ClienteAdmin(ImportarMixin, ListadoGrandeMixin, admin.ModelAdmin):
+    tipo_importacion = 'clientes'
     list_display = ['nombre', 'rut', 'email', 'tipo_cliente', 'activo', 'fecha_registro']
     list_filter = ['tipo_cliente', 'activo', 'fecha_registro']
     search_fields = ['nombre', 'rut', 'email']
     list_editable = ['activo']
-    ordering = ['nombre']
+    # Con id el orden ya es total y el admin no agrega -pk (usa cliente_nombre_idx)
+    ordering = ['nombre', 'id']
 
 @admin.register(Servicio)
-class ServicioAdmin(admin.ModelAdmin):
+class ServicioAdmin(ImportarMixin, admin.ModelAdmin):
+    tipo_importacion = 'servicios'
     list_display = ['nombre', 'tipo_servicio', 'precio_base', 'activo', 'fecha_creacion']
     list_filter = ['tipo_servicio', 'activo', 'fecha_creacion']
     search_fields = ['nombre', 'descripcion']
@@ -20,13 +194,20 @@ class ServicioAdmin(admin.ModelAdmin):
     ordering = ['tipo_servicio', 'nombre']
 
 @admin.register(Proyecto)
-class ProyectoAdmin(admin.ModelAdmin):
+class ProyectoAdmin(ImportarMixin, ListadoGrandeMixin, admin.ModelAdmin):
+    tipo_importacion = 'proyectos'
     list_display = ['nombre', 'cliente', 'estado', 'prioridad', 'responsable', 'fecha_inicio', 'presupuesto_total']
-    list_filter = ['estado', 'prioridad', 'fecha_inicio', 'responsable']
+    list_select_related = ['cliente', 'responsable']
+    list_filter = [
+        'estado', 'prioridad', 'fecha_inicio', ('fecha_inicio', FiltroAnio),
+        ('cliente', FiltroAutocompletar), ('responsable', FiltroAutocompletar),
+    ]
     search_fields = ['nombre', 'cliente__nombre', 'descripcion']
     list_editable = ['estado', 'prioridad']
+    action_form = ProyectoActionForm
+    actions = ['cambiar_estado_prioridad']
     filter_horizontal = ['servicios']
-    date_hierarchy = 'fecha_inicio'
+    autocomplete_fields = ['cliente', 'responsable', 'creado_por']
     ordering = ['-fecha_creacion']
     
     fieldsets = (
@@ -46,21 +227,34 @@ class ProyectoAdmin(admin.ModelAdmin):
             'fields': ('responsable', 'creado_por')
         }),
     )
+    
+    @admin.action(description='Cambiar estado/prioridad de los seleccionados')
+    def cambiar_estado_prioridad(self, request, queryset):
+        _cambio_masivo(self, request, queryset, transiciones.cambiar_proyectos, ['estado', 'prioridad'])
 
 @admin.register(Presupuesto)
-class PresupuestoAdmin(admin.ModelAdmin):
+class PresupuestoAdmin(ListadoGrandeMixin, admin.ModelAdmin):
     list_display = ['numero_presupuesto', 'cliente', 'monto_total', 'fecha_emision', 'validez_dias', 'estado']
-    list_filter = ['estado', 'fecha_emision', 'cliente']
+    list_select_related = ['cliente']
+    list_filter = ['estado', 'fecha_emision', ('cliente', FiltroAutocompletar)]
     search_fields = ['numero_presupuesto', 'cliente__nombre', 'descripcion']
     readonly_fields = ['numero_presupuesto', 'fecha_creacion']
+    autocomplete_fields = ['cliente', 'proyecto', 'creado_por']
 
 @admin.register(Incidencia)
-class IncidenciaAdmin(admin.ModelAdmin):
+class IncidenciaAdmin(ListadoGrandeMixin, admin.ModelAdmin):
     list_display = ['titulo', 'proyecto', 'tipo_incidencia', 'prioridad', 'estado', 'reportado_por', 'fecha_reporte']
-    list_filter = ['tipo_incidencia', 'prioridad', 'estado', 'fecha_reporte']
+    # str(proyecto) incluye el nombre del cliente
+    list_select_related = ['proyecto__cliente', 'reportado_por']
+    list_filter = [
+        'tipo_incidencia', 'prioridad', 'estado', 'fecha_reporte', ('fecha_reporte', FiltroAnio),
+        ('proyecto', FiltroAutocompletar), ('asignado_a', FiltroAutocompletar),
+    ]
     search_fields = ['titulo', 'descripcion', 'proyecto__nombre']
     list_editable = ['estado', 'prioridad']
-    date_hierarchy = 'fecha_reporte'
+    action_form = IncidenciaActionForm
+    actions = ['cambiar_estado_prioridad']
+    autocomplete_fields = ['proyecto', 'reportado_por', 'asignado_a']
     ordering = ['-fecha_reporte']
     
     fieldsets = (
@@ -80,10 +274,17 @@ class IncidenciaAdmin(admin.ModelAdmin):
             'fields': ('archivo_adjunto',)
         }),
     )
+    
+    @admin.action(description='Cambiar estado/prioridad/asignado de las seleccionadas')
+    def cambiar_estado_prioridad(self, request, queryset):
+        _cambio_masivo(
+            self, request, queryset, transiciones.cambiar_incidencias, ['estado', 'prioridad', 'asignado_a'],
+        )
 
 class PerfilUsuarioInline(admin.StackedInline):
     model = PerfilUsuario
     can_delete = False
+    autocomplete_fields = ['cliente']
     verbose_name_plural = 'Perfil de Usuario'
 
 class UserAdmin(BaseUserAdmin):
@@ -98,4 +299,12 @@ class PerfilUsuarioAdmin(admin.ModelAdmin):
     list_display = ['user', 'tipo_usuario', 'empresa', 'telefono', 'activo']
     list_filter = ['tipo_usuario', 'activo', 'fecha_creacion']
     search_fields = ['user__username', 'user__email', 'empresa', 'rut']
-    list_editable = ['tipo_usuario', 'activo']
\ No newline at end of file
+    list_editable = ['tipo_usuario', 'activo']
+    autocomplete_fields = ['cliente']
+@admin.register(TrabajoExportacion)
+class TrabajoExportacionAdmin(admin.ModelAdmin):
+    list_display = ['id', 'formato', 'usuario', 'estado', 'progreso', 'total', 'fecha_creacion', 'fecha_fin']
+    list_filter = ['formato', 'estado', 'fecha_creacion']
+    search_fields = ['usuario__username']
+    list_select_related = ['usuario']
+    readonly_fields = ['parametros', 'progreso', 'total', 'error', 'fecha_creacion', 'fecha_inicio', 'fecha_fin']
@@ -0,0 +1,221 @@
+"""Almacenamiento por contenido para los adjuntos de incidencias.
+
+Cada archivo se guarda una sola vez bajo su SHA-256 (adjuntos/ab/abcd...ef.pdf):
+el mismo plano subido a cien incidencias ocupa un archivo. El hash se calcula
+mientras llega la subida (HashMemoryFileUploadHandler /
+HashTemporaryFileUploadHandler), por bloques y sin juntar el archivo en
+memoria; si la subida ya está en un temporal en disco, se mueve en lugar de
+copiarse. Las referencias de cada archivo se llevan en el modelo Adjunto
+(ver siriusApp.adjuntos) y el comando limpiar_adjuntos borra los huérfanos.
+"""
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+PREFIJO = 'adjuntos'
+_NOMBRE_HASH = re.compile(r'^(?P<carpeta>.+/)?(?P<sub>[0-9a-f]{2})/(?P<hash>[0-9a-f]{64})(?P<ext>\.[a-z0-9]{1,10})?$')
+_RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class HashUploadMixin:
+    """Calcula el SHA-256 de cada archivo a medida que llegan los bloques"""
+
+    def new_file(self, *args, **kwargs):
+        self.hash = hashlib.sha256()
+        return super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        # MemoryFileUploadHandler sin activar solo deja pasar los bloques al siguiente
+        if getattr(self, 'activated', True):
+            self.hash.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        archivo = super().file_complete(file_size)
+        if archivo is not None:
+            archivo.sha256 = self.hash.hexdigest()
+        return archivo
+
+
+class HashMemoryFileUploadHandler(HashUploadMixin, MemoryFileUploadHandler):
+    pass
+
+
+class HashTemporaryFileUploadHandler(HashUploadMixin, TemporaryFileUploadHandler):
+    pass
+
+
+def es_deduplicado(nombre):
+    """True si el nombre tiene la forma de AlmacenamientoDeduplicado"""
+    return bool(nombre) and _NOMBRE_HASH.match(nombre) is not None
+
+
+class AlmacenamientoDeduplicado(FileSystemStorage):
+    """FileSystemStorage que nombra cada archivo por su contenido.
+
+    La carpeta del upload_to se conserva; el nombre original solo aporta la
+    extensión. Guardar un contenido que ya existe no escribe nada y devuelve
+    el nombre existente. Nunca hay colisiones, así que no se buscan nombres
+    libres (get_available_name no toca el disco).
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _nombre(self, name, sha256):
+        carpeta = os.path.dirname(name).replace('\\', '/') or PREFIJO
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r'\.[a-z0-9]{1,10}', extension):
+            extension = ''
+        return f'{carpeta}/{sha256[:2]}/{sha256}{extension}'
+
+    def _save(self, name, content):
+        sha256 = getattr(content, 'sha256', None)
+        temporal = None
+        if sha256 is None and not hasattr(content, 'temporary_file_path'):
+            # Sin hash previo (guardado desde código): se calcula al copiar a un temporal
+            temporal, sha256 = self._copiar_con_hash(content)
+        elif sha256 is None:
+            sha256 = self._hash_de(content)
+
+        nombre = self._nombre(name, sha256)
+        ruta = self.path(nombre)
+        if os.path.exists(ruta):
+            if temporal:
+                os.remove(temporal)
+            # Marca de uso reciente: limpiar_adjuntos respeta un período de gracia
+            os.utime(ruta)
+            return nombre
+
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        if temporal:
+            os.replace(temporal, ruta)
+        elif hasattr(content, 'temporary_file_path'):
+            # Subida ya en disco: mover (o copiar por bloques si es otro sistema de archivos)
+            file_move_safe(content.temporary_file_path(), ruta, allow_overwrite=True)
+        else:
+            temporal, _ = self._copiar_con_hash(content)
+            os.replace(temporal, ruta)
+        if self.file_permissions_mode is not None:
+            os.chmod(ruta, self.file_permissions_mode)
+        return nombre
+
+    def _copiar_con_hash(self, content):
+        """Copia el contenido por bloques a un temporal junto a location, calculando el hash"""
+        os.makedirs(self.location, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=self.location, prefix='.subida-')
+        sha256 = hashlib.sha256()
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for bloque in content.chunks():
+                    sha256.update(bloque)
+                    destino.write(bloque)
+        except BaseException:
+            os.remove(temporal)
+            raise
+        return temporal, sha256.hexdigest()
+
+    def _hash_de(self, content):
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for bloque in content.chunks():
+            sha256.update(bloque)
+        return sha256.hexdigest()
+
+
+adjuntos = AlmacenamientoDeduplicado()
+
+
+def _rango(cabecera, tamano):
+    """(inicio, fin) inclusivo de un único rango 'bytes=a-b'; None si no aplica, False si no se puede servir"""
+    coincidencia = _RANGO.match(cabecera.strip())
+    if coincidencia is None:
+        # Varios rangos o unidad desconocida: se responde el archivo completo
+        return None
+    desde, hasta = coincidencia.groups()
+    if not desde and not hasta:
+        return None
+    if not desde:
+        # bytes=-N: los últimos N bytes
+        inicio, fin = max(tamano - int(hasta), 0), tamano - 1
+    else:
+        inicio = int(desde)
+        fin = min(int(hasta), tamano - 1) if hasta else tamano - 1
+    if inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+class _Tramo:
+    """Archivo de solo lectura limitado a `longitud` bytes desde la posición actual"""
+
+    def __init__(self, archivo, longitud):
+        self.archivo = archivo
+        self.restante = longitud
+
+    def read(self, tamano=-1):
+        if self.restante <= 0:
+            return b''
+        if tamano < 0 or tamano > self.restante:
+            tamano = self.restante
+        datos = self.archivo.read(tamano)
+        self.restante -= len(datos)
+        return datos
+
+    def close(self):
+        self.archivo.close()
+
+
+def servir(request, archivo, nombre_descarga):
+    """FileResponse del FieldFile con ETag, 304 y soporte de Range (un rango).
+
+    En los archivos deduplicados el nombre es el hash, que sirve de ETag fuerte.
+    """
+    storage = archivo.storage
+    ruta = storage.path(archivo.name)
+    try:
+        estado = os.stat(ruta)
+    except FileNotFoundError:
+        raise Http404('Archivo no encontrado')
+    etag = f'"{os.path.basename(archivo.name)}"' if es_deduplicado(archivo.name) else (
+        f'"{estado.st_mtime_ns:x}-{estado.st_size:x}"'
+    )
+    no_modificado = get_conditional_response(request, etag=etag, last_modified=int(estado.st_mtime))
+    if no_modificado is not None:
+        return no_modificado
+
+    rango = None
+    cabecera = request.META.get('HTTP_RANGE')
+    # If-Range: el rango solo vale si el archivo sigue siendo el mismo
+    if cabecera and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        rango = _rango(cabecera, estado.st_size)
+    if rango is False:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{estado.st_size}'
+        return respuesta
+
+    manejador = open(ruta, 'rb')
+    if rango is None:
+        respuesta = FileResponse(manejador, filename=nombre_descarga)
+    else:
+        inicio, fin = rango
+        manejador.seek(inicio)
+        respuesta = FileResponse(
+            _Tramo(manejador, fin - inicio + 1), status=206, filename=nombre_descarga,
+        )
+        respuesta['Content-Length'] = fin - inicio + 1
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{estado.st_size}'
+    respuesta['Accept-Ranges'] = 'bytes'
+    respuesta['ETag'] = etag
+    respuesta['Last-Modified'] = http_date(estado.st_mtime)
+    return respuesta
@@ -0,0 +1,205 @@
+"""API JSON de solo lectura (v1) para la app móvil.
+
+Cada recurso declara los campos que se pueden pedir y con qué columna se
+leen; ?fields=a,b,c se aplica como .values() con solo esas columnas (sin
+instancias, __str__ ni plantillas). Los filtros son los mismos formularios de
+las listas HTML y el alcance el mismo visible_to. La paginación es siempre por
+cursor (paginacion.PaginadorCursor): ?cursor=... y ?limite=N, sin COUNT salvo
+?total=1. Las respuestas llevan ETag y responden 304 si no cambiaron.
+"""
+from functools import wraps
+
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers, set_response_etag
+from django.views.decorators.http import require_safe
+
+from .forms import IncidenciaFiltroForm, ProyectoFiltroForm
+from .models import Cliente, Incidencia, Presupuesto, Proyecto, Servicio
+from .paginacion import PaginadorCursor
+
+LIMITE_POR_DEFECTO = 50
+LIMITE_MAXIMO = 200
+
+
+class Recurso:
+    """Modelo expuesto por la API: campos públicos -> columna de .values()"""
+
+    def __init__(self, modelo, campos, por_defecto, orden, filtro_form=None, queryset=None):
+        self.modelo = modelo
+        self.campos = campos
+        self.por_defecto = por_defecto
+        self.orden = orden
+        self.filtro_form = filtro_form
+        self._queryset = queryset
+
+    def queryset(self, user):
+        if self._queryset is not None:
+            return self._queryset(user)
+        return self.modelo.objects.visible_to(user)
+
+    def elegir_campos(self, request):
+        """Campos pedidos en ?fields= (o los por defecto) y los que no existen"""
+        pedido = request.GET.get('fields', '').strip()
+        if not pedido:
+            return self.por_defecto, []
+        nombres = list(dict.fromkeys(nombre.strip() for nombre in pedido.split(',') if nombre.strip()))
+        return nombres, [nombre for nombre in nombres if nombre not in self.campos]
+
+    def columnas(self, nombres):
+        """Columnas para .values(): las pedidas más las del orden, que usa el cursor"""
+        columnas = [self.campos[nombre] for nombre in nombres]
+        for campo in self.orden:
+            if campo.lstrip('-') not in columnas:
+                columnas.append(campo.lstrip('-'))
+        return columnas
+
+    def serializar(self, fila, nombres):
+        return {nombre: fila[self.campos[nombre]] for nombre in nombres}
+
+
+RECURSOS = {
+    'proyectos': Recurso(
+        Proyecto,
+        campos={
+            'id': 'id', 'nombre': 'nombre', 'descripcion': 'descripcion',
+            'cliente': 'cliente_id', 'cliente_nombre': 'cliente__nombre',
+            'fecha_inicio': 'fecha_inicio', 'fecha_fin_estimada': 'fecha_fin_estimada',
+            'fecha_fin_real': 'fecha_fin_real', 'estado': 'estado', 'prioridad': 'prioridad',
+            'presupuesto_total': 'presupuesto_total', 'costo_real': 'costo_real',
+            'responsable': 'responsable_id', 'responsable_usuario': 'responsable__username',
+            'fecha_creacion': 'fecha_creacion', 'fecha_modificacion': 'fecha_modificacion',
+        },
+        por_defecto=['id', 'nombre', 'cliente', 'cliente_nombre', 'estado', 'prioridad', 'fecha_inicio'],
+        orden=['-fecha_creacion', '-id'],
+        filtro_form=ProyectoFiltroForm,
+    ),
+    'incidencias': Recurso(
+        Incidencia,
+        campos={
+            'id': 'id', 'titulo': 'titulo', 'descripcion': 'descripcion',
+            'proyecto': 'proyecto_id', 'proyecto_nombre': 'proyecto__nombre',
+            'tipo_incidencia': 'tipo_incidencia', 'prioridad': 'prioridad', 'estado': 'estado',
+            'reportado_por': 'reportado_por_id', 'asignado_a': 'asignado_a_id',
+            'asignado_a_usuario': 'asignado_a__username', 'solucion': 'solucion',
+            'fecha_reporte': 'fecha_reporte', 'fecha_resolucion': 'fecha_resolucion',
+            'fecha_modificacion': 'fecha_modificacion',
+        },
+        por_defecto=['id', 'titulo', 'proyecto', 'tipo_incidencia', 'prioridad', 'estado', 'fecha_reporte'],
+        orden=['-fecha_reporte', '-id'],
+        filtro_form=IncidenciaFiltroForm,
+    ),
+    'presupuestos': Recurso(
+        Presupuesto,
+        campos={
+            'id': 'id', 'numero_presupuesto': 'numero_presupuesto', 'descripcion': 'descripcion',
+            'cliente': 'cliente_id', 'cliente_nombre': 'cliente__nombre', 'proyecto': 'proyecto_id',
+            'monto_total': 'monto_total', 'fecha_emision': 'fecha_emision', 'validez_dias': 'validez_dias',
+            'estado': 'estado', 'observaciones': 'observaciones',
+            'fecha_creacion': 'fecha_creacion', 'fecha_modificacion': 'fecha_modificacion',
+        },
+        por_defecto=['id', 'numero_presupuesto', 'cliente', 'proyecto', 'monto_total', 'fecha_emision', 'estado'],
+        orden=['-fecha_creacion', '-id'],
+    ),
+    'clientes': Recurso(
+        Cliente,
+        campos={
+            'id': 'id', 'nombre': 'nombre', 'rut': 'rut', 'email': 'email', 'telefono': 'telefono',
+            'direccion': 'direccion', 'tipo_cliente': 'tipo_cliente',
+            'fecha_registro': 'fecha_registro', 'fecha_modificacion': 'fecha_modificacion',
+        },
+        por_defecto=['id', 'nombre', 'rut', 'tipo_cliente'],
+        orden=['nombre', 'id'],
+        # Igual que cliente_lista: solo los activos
+        queryset=lambda user: Cliente.objects.visible_to(user).filter(activo=True),
+    ),
+    'servicios': Recurso(
+        Servicio,
+        campos={
+            'id': 'id', 'nombre': 'nombre', 'tipo_servicio': 'tipo_servicio', 'descripcion': 'descripcion',
+            'precio_base': 'precio_base', 'fecha_creacion': 'fecha_creacion',
+            'fecha_modificacion': 'fecha_modificacion',
+        },
+        por_defecto=['id', 'nombre', 'tipo_servicio', 'precio_base'],
+        orden=['nombre', 'id'],
+        # El catálogo es el mismo para todos los usuarios (servicio_lista)
+        queryset=lambda user: Servicio.objects.filter(activo=True),
+    ),
+}
+
+
+def _error(mensaje, status, **extra):
+    return JsonResponse({'error': mensaje, **extra}, status=status)
+
+
+def _api(vista):
+    """Solo GET/HEAD, 401 JSON sin sesión (no redirige al login) y recurso conocido"""
+
+    @require_safe
+    @wraps(vista)
+    def envoltura(request, recurso, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error('Autenticación requerida', 401)
+        if recurso not in RECURSOS:
+            return _error('Recurso no encontrado', 404)
+        return vista(request, RECURSOS[recurso], *args, **kwargs)
+
+    return envoltura
+
+
+def _responder(request, datos):
+    """JsonResponse con ETag del contenido; 304 si el cliente ya lo tiene"""
+    respuesta = JsonResponse(datos)
+    # Privada: el contenido depende del usuario (visible_to)
+    patch_cache_control(respuesta, private=True, no_cache=True)
+    patch_vary_headers(respuesta, ['Cookie'])
+    set_response_etag(respuesta)
+    return get_conditional_response(request, etag=respuesta['ETag'], response=respuesta)
+
+
+def _limite(request):
+    try:
+        limite = int(request.GET.get('limite', LIMITE_POR_DEFECTO))
+    except ValueError:
+        return LIMITE_POR_DEFECTO
+    return min(max(limite, 1), LIMITE_MAXIMO)
+
+
+@_api
+def lista(request, recurso):
+    """Lista paginada por cursor con ?fields=, ?limite=, ?cursor= y los filtros de la lista HTML"""
+    nombres, desconocidos = recurso.elegir_campos(request)
+    if desconocidos:
+        return _error('Campos desconocidos', 400, campos=desconocidos, disponibles=list(recurso.campos))
+
+    queryset = recurso.queryset(request.user)
+    if recurso.filtro_form is not None:
+        filtro_form = recurso.filtro_form(request.GET)
+        if not filtro_form.is_valid():
+            return JsonResponse({'errores': filtro_form.errors}, status=400)
+        queryset = filtro_form.filtrar(queryset)
+
+    paginador = PaginadorCursor(
+        queryset.values(*recurso.columnas(nombres)), recurso.orden, _limite(request),
+        contar=request.GET.get('total') == '1',
+    )
+    pagina = paginador.get_page(request.GET.get('cursor'), request.GET)
+    datos = {
+        'resultados': [recurso.serializar(fila, nombres) for fila in pagina],
+        'siguiente': request.path + pagina.url_siguiente if pagina.has_next() else None,
+        'anterior': request.path + pagina.url_anterior if pagina.has_previous() else None,
+    }
+    if paginador.contar:
+        datos['total'] = pagina.total
+    return _responder(request, datos)
+
+
+@_api
+def detalle(request, recurso, pk):
+    """Una fila visible para el usuario, con los mismos ?fields= que la lista"""
+    nombres, desconocidos = recurso.elegir_campos(request)
+    if desconocidos:
+        return _error('Campos desconocidos', 400, campos=desconocidos, disponibles=list(recurso.campos))
+    fila = recurso.queryset(request.user).filter(pk=pk).values(*recurso.columnas(nombres)).first()
+    if fila is None:
+        return _error('No encontrado', 404)
+    return _responder(request, recurso.serializar(fila, nombres))
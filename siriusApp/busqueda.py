@@ -0,0 +1,163 @@
+"""Búsqueda de texto completo sobre IndiceBusqueda.
+
+Usa el índice nativo del motor: FULLTEXT en MySQL y FTS5 en SQLite (ver la
+migración 0008). En otros motores cae a icontains, sin ranking real.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q, Value, FloatField
+
+from .models import Cliente, Proyecto, Presupuesto, Incidencia, IndiceBusqueda
+
+TABLA_FTS = 'siriusApp_indicebusqueda_fts'
+# Largo mínimo de palabra indexada por InnoDB (innodb_ft_min_token_size)
+LARGO_MINIMO_MYSQL = 3
+MAX_TERMINOS = 8
+
+# modelo -> (tipo, campo del título, campos del contenido)
+DOCUMENTOS = {
+    Proyecto: ('proyecto', 'nombre', ['descripcion']),
+    Incidencia: ('incidencia', 'titulo', ['descripcion', 'solucion']),
+    Cliente: ('cliente', 'nombre', ['rut', 'email']),
+    Presupuesto: ('presupuesto', 'numero_presupuesto', ['descripcion']),
+}
+MODELOS = {tipo: modelo for modelo, (tipo, _, _) in DOCUMENTOS.items()}
+
+
+def documento(instance):
+    """(tipo, titulo, contenido) que se indexa para la instancia"""
+    tipo, campo_titulo, campos = DOCUMENTOS[type(instance)]
+    partes = [str(getattr(instance, campo) or '') for campo in campos]
+    if tipo == 'cliente':
+        # El RUT también sin guion, para encontrarlo escrito de las dos formas
+        partes.append(instance.rut.replace('-', ''))
+    return tipo, str(getattr(instance, campo_titulo))[:255], '\n'.join(partes)
+
+
+def _sin_cambios(instance):
+    """True si ninguno de los campos indexados cambió desde que se leyó de la BD"""
+    originales = getattr(instance, '_valores_originales', None)
+    if originales is None:
+        return False
+    _, campo_titulo, campos = DOCUMENTOS[type(instance)]
+    return all(
+        campo in originales and originales[campo] == getattr(instance, campo)
+        for campo in [campo_titulo, *campos]
+    )
+
+
+def indexar(instance, created=False):
+    """Crea o actualiza la entrada del índice con un solo INSERT ... ON CONFLICT / ON DUPLICATE KEY"""
+    if not created and _sin_cambios(instance):
+        return
+    tipo, titulo, contenido = documento(instance)
+    # MySQL no acepta columnas de conflicto: usa cualquier índice único
+    unicos = ['tipo', 'objeto_id'] if connection.features.supports_update_conflicts_with_target else None
+    IndiceBusqueda.objects.bulk_create(
+        [IndiceBusqueda(tipo=tipo, objeto_id=instance.pk, titulo=titulo, contenido=contenido)],
+        update_conflicts=True, unique_fields=unicos, update_fields=['titulo', 'contenido'],
+    )
+
+
+def desindexar(instance):
+    tipo = DOCUMENTOS[type(instance)][0]
+    IndiceBusqueda.objects.filter(tipo=tipo, objeto_id=instance.pk).delete()
+
+
+def indexar_lote(instancias, lote=2000):
+    """Agrega al índice objetos creados con bulk_create (que no disparan señales).
+
+    Recibe cualquier iterable y escribe de a `lote` filas; devuelve cuántas indexó.
+    """
+    pendientes, total = [], 0
+    for instance in instancias:
+        tipo, titulo, contenido = documento(instance)
+        pendientes.append(IndiceBusqueda(tipo=tipo, objeto_id=instance.pk, titulo=titulo, contenido=contenido))
+        if len(pendientes) == lote:
+            IndiceBusqueda.objects.bulk_create(pendientes)
+            total += len(pendientes)
+            pendientes = []
+    IndiceBusqueda.objects.bulk_create(pendientes)
+    return total + len(pendientes)
+
+
+def para_indexar(queryset):
+    """Queryset con solo las columnas que usa documento()"""
+    _, campo_titulo, campos = DOCUMENTOS[queryset.model]
+    return queryset.only(campo_titulo, *campos)
+
+
+def reindexar_filas(modelo, ids, lote=2000):
+    """Vuelve a indexar las filas dadas tras un update() masivo"""
+    tipo = DOCUMENTOS[modelo][0]
+    with transaction.atomic():
+        for inicio in range(0, len(ids), lote):
+            parte = ids[inicio:inicio + lote]
+            IndiceBusqueda.objects.filter(tipo=tipo, objeto_id__in=parte).delete()
+            indexar_lote(para_indexar(modelo.objects.filter(pk__in=parte).order_by()), lote)
+
+
+def reindexar(lote=2000, modelos=None):
+    """Reconstruye el índice de los modelos dados (todos por defecto); devuelve filas por tipo"""
+    resultado = {}
+    for modelo in modelos or DOCUMENTOS:
+        tipo = DOCUMENTOS[modelo][0]
+        with transaction.atomic():
+            IndiceBusqueda.objects.filter(tipo=tipo).delete()
+            instancias = para_indexar(modelo.objects.order_by()).iterator(chunk_size=lote)
+            resultado[tipo] = indexar_lote(instancias, lote)
+    return resultado
+
+
+def terminos(texto):
+    """Palabras de la consulta, sin operadores del motor"""
+    return re.findall(r'\w+', texto.lower())[:MAX_TERMINOS]
+
+
+def _alcance(user, tipos):
+    """Restringe cada tipo a lo que el usuario ve en su lista (visible_to) como subconsulta"""
+    alcance = Q()
+    for modelo, (tipo, _, _) in DOCUMENTOS.items():
+        if tipos and tipo not in tipos:
+            continue
+        visibles = modelo.objects.visible_to(user)
+        if visibles.query.has_filters():
+            alcance |= Q(tipo=tipo, objeto_id__in=visibles.order_by().values('pk'))
+        else:
+            alcance |= Q(tipo=tipo)
+    return alcance
+
+
+def buscar(user, texto, tipos=None):
+    """Entradas del índice que calzan con todas las palabras de `texto`, de más a menos relevante"""
+    palabras = terminos(texto)
+    if connection.vendor == 'mysql':
+        palabras = [p for p in palabras if len(p) >= LARGO_MINIMO_MYSQL]
+    if not palabras:
+        return IndiceBusqueda.objects.none()
+
+    resultados = IndiceBusqueda.objects.filter(_alcance(user, tipos))
+    tabla = connection.ops.quote_name(IndiceBusqueda._meta.db_table)
+    if connection.vendor == 'mysql':
+        # BOOLEAN MODE exige todas las palabras (con prefijo); el ranking usa el modo natural
+        coincide = 'MATCH (titulo, contenido) AGAINST (%s IN BOOLEAN MODE)'
+        relevancia = 'MATCH (titulo, contenido) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+        resultados = resultados.extra(
+            select={'relevancia': relevancia}, select_params=[' '.join(palabras)],
+            where=[coincide], params=[' '.join(f'+{p}*' for p in palabras)],
+        )
+    elif connection.vendor == 'sqlite':
+        fts = connection.ops.quote_name(TABLA_FTS)
+        resultados = resultados.extra(
+            # bm25() es menor mientras más relevante
+            select={'relevancia': f'-bm25({fts})'},
+            tables=[TABLA_FTS],
+            where=[f'{fts}.rowid = {tabla}.id', f'{fts} MATCH %s'],
+            params=[' '.join(f'"{p}"*' for p in palabras)],
+        )
+    else:
+        for p in palabras:
+            resultados = resultados.filter(Q(titulo__icontains=p) | Q(contenido__icontains=p))
+        resultados = resultados.annotate(relevancia=Value(1.0, output_field=FloatField()))
+    return resultados.order_by('-relevancia', 'id')
@@ -0,0 +1,138 @@
+"""Cache con claves versionadas por grupo de datos.
+
+Cada grupo ('clientes', 'proyectos', 'usuarios', 'servicios') tiene un número de versión en
+la cache. Las claves de datos incluyen la versión de los grupos de los que
+dependen, así invalidar es solo incrementar la versión: las entradas viejas
+dejan de leerse y expiran solas. Las señales de signals.py llaman a invalidar().
+"""
+import time
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from .models import Cliente, Proyecto
+
+TIMEOUT = 24 * 60 * 60
+# Las páginas dependen además de las plantillas, que no tienen versión: con
+# un plazo corto un deploy se ve a los pocos minutos aunque nadie invalide
+TIMEOUT_PAGINAS = 10 * 60
+
+
+def _clave_version(grupo):
+    return f'version:{grupo}'
+
+
+def versiones(*grupos):
+    """Versión actual de cada grupo, en una sola lectura a la cache"""
+    claves = [_clave_version(g) for g in grupos]
+    actuales = cache.get_many(claves)
+    for clave in claves:
+        if clave not in actuales:
+            # Arranca desde la hora y no desde 1: si la versión se pierde de la
+            # cache no se vuelve a un número que ya tuvo datos guardados
+            cache.add(clave, time.time_ns(), None)
+            actuales[clave] = cache.get(clave)
+    return [actuales[clave] for clave in claves]
+
+
+def invalidar(*grupos):
+    for grupo in grupos:
+        try:
+            cache.incr(_clave_version(grupo))
+        except ValueError:
+            versiones(grupo)
+
+
+def clave(nombre, grupos):
+    return ':'.join([nombre] + [f'{g}{v}' for g, v in zip(grupos, versiones(*grupos))])
+
+
+# Última copia leída de cada nombre en este proceso: (clave versionada, valor).
+# Evita deserializar de nuevo un valor grande mientras su versión no cambie.
+_locales = {}
+
+
+def obtener(nombre, grupos, calcular, timeout=TIMEOUT):
+    """Valor cacheado de `nombre` para las versiones actuales de `grupos`"""
+    clave_actual = clave(nombre, grupos)
+    local = _locales.get(nombre)
+    if local is not None and local[0] == clave_actual:
+        return local[1]
+    valor = cache.get_or_set(clave_actual, calcular, timeout)
+    _locales[nombre] = (clave_actual, valor)
+    return valor
+
+
+# ============ OPCIONES DE LOS FILTROS ============
+
+class Opciones:
+    """Opciones (id, etiqueta) de un filtro y el conjunto de ids válidos"""
+
+    def __init__(self, choices):
+        self.choices = choices
+        self.ids = frozenset(pk for pk, _ in choices)
+
+
+def _opciones_clientes():
+    filas = Cliente.objects.filter(activo=True).order_by('nombre', 'id').values_list('id', 'nombre', 'rut')
+    return Opciones([(pk, f'{nombre} - {rut}') for pk, nombre, rut in filas])
+
+
+def _opciones_proyectos():
+    filas = Proyecto.objects.order_by('nombre', 'id').values_list('id', 'nombre', 'cliente__nombre')
+    return Opciones([(pk, f'{nombre} - {cliente}') for pk, nombre, cliente in filas])
+
+
+def _opciones_usuarios():
+    filas = User.objects.filter(is_active=True).order_by('username').values_list('id', 'username')
+    return Opciones(list(filas))
+
+
+# nombre -> (grupos de los que depende, cómo calcularlo)
+OPCIONES = {
+    'clientes': (['clientes'], _opciones_clientes),
+    'proyectos': (['proyectos', 'clientes'], _opciones_proyectos),
+    'usuarios': (['usuarios'], _opciones_usuarios),
+}
+
+
+def opciones(nombre):
+    grupos, calcular = OPCIONES[nombre]
+    return obtener(f'opciones:{nombre}', grupos, calcular)
+
+
+# ============ PÁGINAS COMPLETAS ============
+
+def pagina(nombre, grupos, timeout=TIMEOUT_PAGINAS):
+    """Decorador que cachea la respuesta de una vista bajo una clave versionada por `grupos`.
+
+    Solo para páginas que son iguales para todos los que las ven (nada del
+    usuario, sin {% csrf_token %}). Se salta con parámetros GET, con mensajes
+    pendientes y para respuestas que no son un 200 sin cookies.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.GET or len(get_messages(request)):
+                return vista(request, *args, **kwargs)
+            clave_actual = clave(f'pagina:{nombre}', grupos)
+            local = _locales.get(f'pagina:{nombre}')
+            if local is not None and local[0] == clave_actual:
+                guardada = local[1]
+            else:
+                guardada = cache.get(clave_actual)
+            if guardada is None:
+                respuesta = vista(request, *args, **kwargs)
+                if respuesta.status_code == 200 and not respuesta.streaming and not respuesta.cookies:
+                    guardada = (respuesta.content, respuesta['Content-Type'])
+                    cache.set(clave_actual, guardada, timeout)
+                    _locales[f'pagina:{nombre}'] = (clave_actual, guardada)
+                return respuesta
+            _locales[f'pagina:{nombre}'] = (clave_actual, guardada)
+            contenido, tipo = guardada
+            return HttpResponse(contenido, content_type=tipo)
+        return envoltura
+    return decorador
@@ -0,0 +1,99 @@
+"""Validadores para GET condicional (ETag / Last-Modified).
+
+Se usan con django.views.decorators.http.condition: si el navegador manda
+If-None-Match / If-Modified-Since y nada cambió, la vista responde 304 sin
+ejecutar sus consultas ni la plantilla. Todo sale de una sola consulta por
+request, guardada en el request para que la ETag y la fecha no la repitan.
+
+Las fechas (fecha_modificacion) detectan ediciones; los totales detectan filas
+relacionadas borradas, que no dejan fecha. La ETag incluye el usuario y la
+sesión porque las páginas cambian según quién las ve (visible_to, menú, CSRF).
+"""
+import hashlib
+from datetime import datetime
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from .models import Incidencia, Presupuesto, Proyecto, Servicio
+
+
+def _agregado(queryset, campo, agregado):
+    """Subconsulta con el agregado de las filas de `queryset` que apuntan a la fila externa"""
+    return Subquery(
+        queryset.filter(**{campo: OuterRef('pk')}).order_by()
+        .values(campo).annotate(valor=agregado).values('valor')
+    )
+
+
+def _valores_proyecto(request, pk):
+    """Fechas y totales de todo lo que muestra proyecto_detalle; None si el usuario no lo ve.
+
+    Los nombres de usuario (responsable, creado_por) no tienen fecha de
+    modificación y quedan fuera.
+    """
+    servicios = Proyecto.servicios.through.objects
+    return (
+        Proyecto.objects.visible_to(request.user).filter(pk=pk)
+        .annotate(
+            presupuestos_modif=_agregado(Presupuesto.objects, 'proyecto', Max('fecha_modificacion')),
+            presupuestos_total=_agregado(Presupuesto.objects, 'proyecto', Count('pk')),
+            incidencias_modif=_agregado(Incidencia.objects, 'proyecto', Max('fecha_modificacion')),
+            incidencias_total=_agregado(Incidencia.objects, 'proyecto', Count('pk')),
+            servicios_modif=_agregado(servicios, 'proyecto', Max('servicio__fecha_modificacion')),
+            servicios_total=_agregado(servicios, 'proyecto', Count('pk')),
+        )
+        .values_list(
+            'fecha_modificacion', 'cliente__fecha_modificacion',
+            'presupuestos_modif', 'presupuestos_total',
+            'incidencias_modif', 'incidencias_total',
+            'servicios_modif', 'servicios_total',
+        )
+        .first()
+    )
+
+
+def _valores_presupuesto(request, pk):
+    """Fechas de presupuesto_detalle: el presupuesto, su cliente y su proyecto"""
+    return (
+        Presupuesto.objects.visible_to(request.user).filter(pk=pk)
+        .values_list('fecha_modificacion', 'cliente__fecha_modificacion', 'proyecto__fecha_modificacion')
+        .first()
+    )
+
+
+def _valores_servicios(request):
+    """Última modificación y total del catálogo de servicio_lista"""
+    resumen = Servicio.objects.aggregate(modif=Max('fecha_modificacion'), total=Count('pk'))
+    return resumen['modif'], resumen['total']
+
+
+def _validadores(nombre, consulta):
+    """Par (etag_func, last_modified_func) para condition() a partir de una consulta de valores"""
+
+    def valores(request, *args, **kwargs):
+        memo = request.__dict__.setdefault('_validadores', {})
+        if nombre not in memo:
+            memo[nombre] = consulta(request, *args, **kwargs)
+            # Con mensajes pendientes la página no es la misma que la cacheada
+            if memo[nombre] is not None and len(get_messages(request)):
+                memo[nombre] = None
+        return memo[nombre]
+
+    def etag(request, *args, **kwargs):
+        actuales = valores(request, *args, **kwargs)
+        if actuales is None:
+            return None
+        partes = [nombre, request.user.pk, request.session.session_key, *actuales]
+        return hashlib.sha1(repr(partes).encode(), usedforsecurity=False).hexdigest()
+
+    def ultima_modificacion(request, *args, **kwargs):
+        fechas = [v for v in valores(request, *args, **kwargs) or () if isinstance(v, datetime)]
+        return max(fechas, default=None)
+
+    return etag, ultima_modificacion
+
+
+PROYECTO = _validadores('proyecto', _valores_proyecto)
+PRESUPUESTO = _validadores('presupuesto', _valores_presupuesto)
+SERVICIOS = _validadores('servicios', _valores_servicios)
@@ -0,0 +1,147 @@
+"""Contadores del panel mantenidos de forma incremental.
+
+Cada alta, baja o cambio de estado de Proyecto, Cliente o Incidencia ajusta las
+filas de Contador dentro de la transacción en curso, así el panel lee los totales
+con una consulta indexada en vez de hacer COUNT(*) sobre tablas grandes. Las
+operaciones que no disparan señales (update(), bulk_create()) deben llamar a
+ajustar() o dejar que reconciliar() corrija la deriva.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from .models import Cliente, Contador, Incidencia, Proyecto
+
+# modelo -> campos por los que se cuenta
+DIMENSIONES = {
+    Proyecto: ['estado'],
+    Cliente: ['activo'],
+    Incidencia: ['estado'],
+}
+
+
+def clave(modelo, dimension='', valor=''):
+    """Clave de contador; acepta la clase del modelo o su model_name"""
+    if not isinstance(modelo, str):
+        modelo = modelo._meta.model_name
+    return (modelo, dimension, '' if dimension == '' else str(valor))
+
+
+def ajustar(deltas):
+    """Suma los deltas {clave: n} a los contadores, creando las filas que falten"""
+    with transaction.atomic():
+        for (modelo, dimension, valor), delta in sorted(deltas.items()):
+            if not delta:
+                continue
+            filtro = Contador.objects.filter(modelo=modelo, dimension=dimension, valor=valor)
+            if filtro.update(total=F('total') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    Contador.objects.create(modelo=modelo, dimension=dimension, valor=valor, total=delta)
+            except IntegrityError:
+                # Otra transacción creó la fila entre el UPDATE y el INSERT
+                filtro.update(total=F('total') + delta)
+
+
+def deltas_de(instance, signo=1, valores=None):
+    """Deltas que aporta una fila con los valores dados (por defecto los actuales)"""
+    modelo = type(instance)
+    deltas = Counter({clave(modelo): signo})
+    for dimension in DIMENSIONES[modelo]:
+        valor = valores[dimension] if valores else getattr(instance, dimension)
+        deltas[clave(modelo, dimension, valor)] += signo
+    return deltas
+
+
+def deltas_lote(instances):
+    """Deltas acumulados de un lote de filas nuevas, para usar tras bulk_create()"""
+    deltas = Counter()
+    for instance in instances:
+        deltas.update(deltas_de(instance))
+    return deltas
+
+
+def registrar_guardado(instance, created):
+    """Ajusta los contadores tras un save() según lo que cambió"""
+    modelo = type(instance)
+    actuales = {dimension: getattr(instance, dimension) for dimension in DIMENSIONES[modelo]}
+    if created:
+        deltas = deltas_de(instance)
+    else:
+        originales = getattr(instance, '_valores_originales', None)
+        if originales is None or any(dimension not in originales for dimension in actuales):
+            # Instancia que no vino de la BD: no sabemos el valor anterior
+            return
+        deltas = Counter()
+        for dimension, valor in actuales.items():
+            if originales[dimension] != valor:
+                deltas[clave(modelo, dimension, originales[dimension])] -= 1
+                deltas[clave(modelo, dimension, valor)] += 1
+    ajustar(deltas)
+    instance._valores_originales = {**getattr(instance, '_valores_originales', {}), **actuales}
+
+
+def registrar_eliminacion(instance):
+    """Descuenta la fila eliminada con los valores que tenía en la BD"""
+    originales = getattr(instance, '_valores_originales', None) or {}
+    valores = {
+        dimension: originales.get(dimension, getattr(instance, dimension))
+        for dimension in DIMENSIONES[type(instance)]
+    }
+    ajustar(deltas_de(instance, -1, valores))
+
+
+def leer(*claves):
+    """Totales de las claves pedidas en una sola consulta; las ausentes valen 0"""
+    condicion = Q()
+    for modelo, dimension, valor in claves:
+        condicion |= Q(modelo=modelo, dimension=dimension, valor=valor)
+    encontrados = {
+        (c.modelo, c.dimension, c.valor): c.total
+        for c in Contador.objects.filter(condicion)
+    } if claves else {}
+    return {c: encontrados.get(c, 0) for c in claves}
+
+
+def por_valor(modelo, dimension):
+    """Totales de todos los valores de una dimensión: {valor: total}"""
+    nombre = clave(modelo)[0]
+    return dict(
+        Contador.objects.filter(modelo=nombre, dimension=dimension).values_list('valor', 'total')
+    )
+
+
+def calcular():
+    """Totales reales recalculados desde las tablas, con las mismas claves"""
+    reales = Counter()
+    for modelo, dimensiones in DIMENSIONES.items():
+        reales[clave(modelo)] = modelo.objects.count()
+        for dimension in dimensiones:
+            for fila in modelo.objects.values(dimension).annotate(total=Count('pk')).order_by():
+                reales[clave(modelo, dimension, fila[dimension])] = fila['total']
+    return reales
+
+
+def reconciliar(corregir=True):
+    """Compara contadores con los totales reales y repara la deriva.
+
+    Devuelve {clave: (guardado, real)} con las diferencias encontradas.
+    """
+    with transaction.atomic():
+        # Primero el bloqueo y después los COUNT: una escritura que ya movió su
+        # contador no queda fuera de la cuenta, y las siguientes esperan al final
+        guardados = {
+            (c.modelo, c.dimension, c.valor): c.total
+            for c in Contador.objects.select_for_update()
+        }
+        reales = calcular()
+        diferencias = {
+            c: (guardados.get(c, 0), reales.get(c, 0))
+            for c in set(reales) | set(guardados)
+            if guardados.get(c, 0) != reales.get(c, 0)
+        }
+        if corregir and diferencias:
+            ajustar({c: real - guardado for c, (guardado, real) in diferencias.items()})
+    return diferencias
@@ -0,0 +1,191 @@
+"""Exportaciones de listados a archivo sin cargar el resultado completo en memoria"""
+from itertools import islice
+
+from django.db.models import Max
+from django.db.models.functions import Length
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Table, TableStyle
+
+from .models import Proyecto
+from .paginacion import recorrer
+
+ORDEN_PROYECTOS = ['-fecha_creacion', '-id']
+LOTE = 2000
+ANCHO_MAXIMO = 50
+
+ENCABEZADOS_PROYECTOS = [
+    'ID', 'Nombre', 'Cliente', 'Estado', 'Prioridad',
+    'Fecha Inicio', 'Fecha Fin Est.', 'Presupuesto', 'Responsable'
+]
+
+SIN_ASIGNAR = 'Sin asignar'
+
+
+def _con_progreso(filas, progreso, cada):
+    """Pasa las filas tal cual y avisa a `progreso(n)` cada `cada` filas y al terminar"""
+    n = 0
+    for n, fila in enumerate(filas, 1):
+        yield fila
+        if progreso and n % cada == 0:
+            progreso(n)
+    if progreso:
+        progreso(n)
+
+
+def _ancho_etiquetas(choices):
+    return max(len(str(etiqueta)) for _, etiqueta in choices)
+
+
+def anchos_proyectos(proyectos):
+    """Ancho de cada columna calculado con una sola consulta de agregación.
+
+    En modo write_only los anchos se escriben antes que las filas, así que no
+    se pueden medir celda por celda como en el libro en memoria.
+    """
+    maximos = proyectos.order_by().aggregate(
+        max_id=Max('id'),
+        largo_nombre=Max(Length('nombre')),
+        largo_cliente=Max(Length('cliente__nombre')),
+        largo_rut=Max(Length('cliente__rut')),
+        max_presupuesto=Max('presupuesto_total'),
+        largo_responsable=Max(Length('responsable__username')),
+    )
+    largos = [
+        len(str(maximos['max_id'] or '')),
+        maximos['largo_nombre'] or 0,
+        (maximos['largo_cliente'] or 0) + len(' - ') + (maximos['largo_rut'] or 0),
+        _ancho_etiquetas(Proyecto.ESTADO_CHOICES),
+        _ancho_etiquetas(Proyecto.PRIORIDAD_CHOICES),
+        len('dd/mm/aaaa'),
+        len('dd/mm/aaaa'),
+        len(f"${maximos['max_presupuesto'] or 0:,.2f}"),
+        max(maximos['largo_responsable'] or 0, len(SIN_ASIGNAR)),
+    ]
+    return [min(max(largo, len(encabezado)) + 2, ANCHO_MAXIMO)
+            for largo, encabezado in zip(largos, ENCABEZADOS_PROYECTOS)]
+
+
+def recorrer_proyectos(proyectos, lote=LOTE):
+    """Proyectos con cliente y responsable, leídos por lotes con solo las columnas exportadas"""
+    proyectos = proyectos.select_related('cliente', 'responsable').only(
+        'id', 'nombre', 'estado', 'prioridad', 'fecha_inicio', 'fecha_fin_estimada',
+        'presupuesto_total', 'fecha_creacion',
+        'cliente__nombre', 'cliente__rut', 'responsable__username',
+    )
+    return recorrer(proyectos, ORDEN_PROYECTOS, lote)
+
+
+def filas_proyectos(proyectos, lote=LOTE):
+    """Valores de cada fila de la planilla, leyendo los proyectos por lotes"""
+    for proyecto in recorrer_proyectos(proyectos, lote):
+        yield [
+            proyecto.id,
+            proyecto.nombre,
+            str(proyecto.cliente),
+            proyecto.get_estado_display(),
+            proyecto.get_prioridad_display(),
+            proyecto.fecha_inicio.strftime('%d/%m/%Y'),
+            proyecto.fecha_fin_estimada.strftime('%d/%m/%Y'),
+            f"${proyecto.presupuesto_total:,.2f}",
+            str(proyecto.responsable) if proyecto.responsable else SIN_ASIGNAR,
+        ]
+
+
+def escribir_proyectos_xlsx(proyectos, destino, lote=LOTE, progreso=None):
+    """Escribe la planilla de proyectos en `destino` (ruta o archivo) y devuelve las filas escritas.
+
+    `progreso`, si se entrega, recibe la cantidad de filas escritas después de cada lote.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Proyectos Sirius")
+
+    for columna, ancho in enumerate(anchos_proyectos(proyectos), 1):
+        ws.column_dimensions[get_column_letter(columna)].width = ancho
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    encabezados = []
+    for header in ENCABEZADOS_PROYECTOS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        encabezados.append(cell)
+    ws.append(encabezados)
+
+    total = 0
+    for fila in _con_progreso(filas_proyectos(proyectos, lote), progreso, lote):
+        ws.append(fila)
+        total += 1
+    wb.save(destino)
+    return total
+
+
+# ============ PDF ============
+
+ENCABEZADOS_PDF = ['Proyecto', 'Cliente', 'Estado', 'Presupuesto']
+ANCHOS_PDF = [190, 160, 80, 90]
+ALTO_FILA_PDF = 18
+MARGEN_PDF = 50
+
+ESTILO_TABLA_PDF = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+
+def filas_pdf(proyectos, lote=LOTE):
+    for p in recorrer_proyectos(proyectos, lote):
+        yield [
+            p.nombre[:30],
+            str(p.cliente)[:25],
+            p.get_estado_display(),
+            f"${p.presupuesto_total:,.0f}"
+        ]
+
+
+def escribir_proyectos_pdf(proyectos, destino, lote=LOTE, progreso=None):
+    """Dibuja los proyectos en `destino`, una tabla por página con el encabezado repetido.
+
+    Las columnas y filas tienen medidas fijas, así reportlab no tiene que medir
+    el contenido y el costo de maquetar crece en línea con la cantidad de filas.
+    Devuelve las filas escritas; `progreso` funciona igual que en la planilla.
+    """
+    ancho_pagina, alto_pagina = letter
+    filas_por_pagina = int((alto_pagina - 2 * MARGEN_PDF - 30) // ALTO_FILA_PDF) - 1
+    pdf = canvas.Canvas(destino, pagesize=letter, pageCompression=1)
+    pdf.setTitle('Proyectos Sirius')
+
+    filas = _con_progreso(filas_pdf(proyectos, lote), progreso, lote)
+    total = pagina = 0
+    while True:
+        bloque = list(islice(filas, filas_por_pagina))
+        if not bloque and pagina:
+            break
+        pagina += 1
+        total += len(bloque)
+
+        pdf.setFont('Helvetica-Bold', 14)
+        pdf.drawString(MARGEN_PDF, alto_pagina - MARGEN_PDF, 'Proyectos Sirius')
+        pdf.setFont('Helvetica', 8)
+        pdf.drawRightString(ancho_pagina - MARGEN_PDF, MARGEN_PDF / 2, f'Página {pagina}')
+
+        tabla = Table([ENCABEZADOS_PDF] + bloque, colWidths=ANCHOS_PDF, rowHeights=ALTO_FILA_PDF)
+        tabla.setStyle(ESTILO_TABLA_PDF)
+        _, alto = tabla.wrapOn(pdf, ancho_pagina, alto_pagina)
+        tabla.drawOn(pdf, (ancho_pagina - sum(ANCHOS_PDF)) / 2, alto_pagina - MARGEN_PDF - 20 - alto)
+        pdf.showPage()
+        if len(bloque) < filas_por_pagina:
+            break
+    pdf.save()
+    return total
+
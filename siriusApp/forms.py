@@ -1,7 +1,13 @@
+import os
+from functools import partial
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
+from . import cacheo, importacion, subidas
 from .models import Cliente, Servicio, Proyecto, Presupuesto, Incidencia, PerfilUsuario
+from .validators import validar_rut
+from .widgets import AutocompletarSelect, AutocompletarSelectMultiple
 
 class ClienteForm(forms.ModelForm):
     class Meta:
@@ -35,6 +41,14 @@ class ClienteForm(forms.ModelForm):
             }),
         }
 
+    def clean_rut(self):
+        rut = self.cleaned_data['rut']
+        # El dígito verificador se revisa solo si el RUT es nuevo o cambia: hay clientes
+        # antiguos que no lo cumplen y tienen que poder editarse
+        if 'rut' in self.changed_data:
+            validar_rut(rut)
+        return rut
+
 class ServicioForm(forms.ModelForm):
     class Meta:
         model = Servicio
@@ -73,12 +87,8 @@ class ProyectoForm(forms.ModelForm):
                 'class': 'form-control',
                 'placeholder': 'Nombre del proyecto'
             }),
-            'cliente': forms.Select(attrs={
-                'class': 'form-select'
-            }),
-            'servicios': forms.CheckboxSelectMultiple(attrs={
-                'class': 'form-check-input'
-            }),
+            'cliente': AutocompletarSelect('autocompletar_clientes'),
+            'servicios': AutocompletarSelectMultiple('autocompletar_servicios'),
             'descripcion': forms.Textarea(attrs={
                 'class': 'form-control',
                 'rows': 4,
@@ -104,9 +114,7 @@ class ProyectoForm(forms.ModelForm):
                 'min': '0',
                 'placeholder': '0.00'
             }),
-            'responsable': forms.Select(attrs={
-                'class': 'form-select'
-            }),
+            'responsable': AutocompletarSelect('autocompletar_usuarios'),
         }
 
     def __init__(self, *args, **kwargs):
@@ -125,12 +133,8 @@ class PresupuestoForm(forms.ModelForm):
             'fecha_emision', 'validez_dias', 'estado', 'observaciones'
         ]
         widgets = {
-            'cliente': forms.Select(attrs={
-                'class': 'form-select'
-            }),
-            'proyecto': forms.Select(attrs={
-                'class': 'form-select'
-            }),
+            'cliente': AutocompletarSelect('autocompletar_clientes'),
+            'proyecto': AutocompletarSelect('autocompletar_proyectos'),
             'descripcion': forms.Textarea(attrs={
                 'class': 'form-control',
                 'rows': 4,
@@ -161,6 +165,11 @@ class PresupuestoForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Proyecto.__str__ usa el cliente: evitar una consulta por opción
+        self.fields['proyecto'].queryset = Proyecto.objects.select_related('cliente')
+
 class IncidenciaForm(forms.ModelForm):
     class Meta:
         model = Incidencia
@@ -169,9 +178,7 @@ class IncidenciaForm(forms.ModelForm):
             'prioridad', 'asignado_a', 'archivo_adjunto'
         ]
         widgets = {
-            'proyecto': forms.Select(attrs={
-                'class': 'form-select'
-            }),
+            'proyecto': AutocompletarSelect('autocompletar_proyectos'),
             'titulo': forms.TextInput(attrs={
                 'class': 'form-control',
                 'placeholder': 'Título de la incidencia'
@@ -187,15 +194,18 @@ class IncidenciaForm(forms.ModelForm):
             'prioridad': forms.Select(attrs={
                 'class': 'form-select'
             }),
-            'asignado_a': forms.Select(attrs={
-                'class': 'form-select'
-            }),
+            'asignado_a': AutocompletarSelect('autocompletar_usuarios'),
             'archivo_adjunto': forms.FileInput(attrs={
                 'class': 'form-control',
                 'accept': '.pdf,.jpg,.jpeg,.png,.doc,.docx,.txt'
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Proyecto.__str__ usa el cliente: evitar una consulta por opción
+        self.fields['proyecto'].queryset = Proyecto.objects.select_related('cliente')
+
 class IncidenciaResolucionForm(forms.ModelForm):
     class Meta:
         model = Incidencia
@@ -280,10 +290,34 @@ class PerfilUsuarioForm(forms.ModelForm):
             }),
         }
 
+def _choices_cacheadas(nombre, empty_label):
+    return [('', empty_label)] + cacheo.opciones(nombre).choices
+
+class OpcionCacheadaField(forms.TypedChoiceField):
+    """Filtro por id con las opciones de cacheo.opciones(nombre).
+
+    Las opciones salen de la cache (values_list, sin instancias ni __str__) y
+    la validación revisa el id contra el conjunto cacheado, sin consultar la BD.
+    El valor limpio es el id (int) o None.
+    """
+
+    def __init__(self, opciones, empty_label, **kwargs):
+        self.opciones = opciones
+        super().__init__(
+            choices=partial(_choices_cacheadas, opciones, empty_label),
+            coerce=int, empty_value=None, **kwargs
+        )
+
+    def valid_value(self, value):
+        try:
+            return int(value) in cacheo.opciones(self.opciones).ids
+        except (TypeError, ValueError):
+            return False
+
 # Formulario para filtros personalizados
 class ProyectoFiltroForm(forms.Form):
-    cliente = forms.ModelChoiceField(
-        queryset=Cliente.objects.filter(activo=True),
+    cliente = OpcionCacheadaField(
+        'clientes',
         required=False,
         empty_label="Todos los clientes",
         widget=forms.Select(attrs={'class': 'form-select'})
@@ -317,16 +351,35 @@ class ProyectoFiltroForm(forms.Form):
         })
     )
     
-    responsable = forms.ModelChoiceField(
-        queryset=User.objects.filter(is_active=True),
+    responsable = OpcionCacheadaField(
+        'usuarios',
         required=False,
         empty_label="Todos los responsables",
         widget=forms.Select(attrs={'class': 'form-select'})
     )
 
+    def filtrar(self, proyectos):
+        """Aplica los filtros válidos del formulario al queryset de proyectos"""
+        if not self.is_valid():
+            return proyectos
+        datos = self.cleaned_data
+        if datos['cliente']:
+            proyectos = proyectos.filter(cliente_id=datos['cliente'])
+        if datos['estado']:
+            proyectos = proyectos.filter(estado=datos['estado'])
+        if datos['prioridad']:
+            proyectos = proyectos.filter(prioridad=datos['prioridad'])
+        if datos['fecha_inicio']:
+            proyectos = proyectos.filter(fecha_inicio__gte=datos['fecha_inicio'])
+        if datos['fecha_fin']:
+            proyectos = proyectos.filter(fecha_fin_estimada__lte=datos['fecha_fin'])
+        if datos['responsable']:
+            proyectos = proyectos.filter(responsable_id=datos['responsable'])
+        return proyectos
+
 class IncidenciaFiltroForm(forms.Form):
-    proyecto = forms.ModelChoiceField(
-        queryset=Proyecto.objects.all(),
+    proyecto = OpcionCacheadaField(
+        'proyectos',
         required=False,
         empty_label="Todos los proyectos",
         widget=forms.Select(attrs={'class': 'form-select'})
@@ -348,4 +401,82 @@ class IncidenciaFiltroForm(forms.Form):
         choices=[('', 'Todas las prioridades')] + Incidencia.PRIORIDAD_CHOICES,
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
-    )
\ No newline at end of file
+    )
+
+    def filtrar(self, incidencias):
+        """Aplica los filtros válidos del formulario al queryset de incidencias"""
+        if not self.is_valid():
+            return incidencias
+        datos = self.cleaned_data
+        if datos['proyecto']:
+            incidencias = incidencias.filter(proyecto_id=datos['proyecto'])
+        if datos['tipo_incidencia']:
+            incidencias = incidencias.filter(tipo_incidencia=datos['tipo_incidencia'])
+        if datos['estado']:
+            incidencias = incidencias.filter(estado=datos['estado'])
+        if datos['prioridad']:
+            incidencias = incidencias.filter(prioridad=datos['prioridad'])
+        return incidencias
+
+
+# ============ CAMBIOS MASIVOS ============
+
+class ListaIdsField(forms.Field):
+    """Lista de ids enviada como varios valores con el mismo nombre (ids=1&ids=2...)"""
+    widget = forms.MultipleHiddenInput
+    maximo = 1000
+
+    def to_python(self, value):
+        try:
+            ids = sorted({int(v) for v in value or []})
+        except (TypeError, ValueError):
+            raise forms.ValidationError('Los ids deben ser números enteros.', code='invalid')
+        if len(ids) > self.maximo:
+            raise forms.ValidationError(f'Se pueden cambiar hasta {self.maximo} filas por vez.', code='max')
+        return ids
+
+
+class CambioMasivoForm(forms.Form):
+    """Campos vacíos = sin cambio; al menos uno debe venir"""
+    ids = ListaIdsField()
+
+    def clean(self):
+        datos = super().clean()
+        if not any(valor for campo, valor in datos.items() if campo != 'ids'):
+            raise forms.ValidationError('Indique al menos un cambio.')
+        return datos
+
+
+class CambioMasivoProyectoForm(CambioMasivoForm):
+    estado = forms.ChoiceField(choices=[('', 'Sin cambio')] + Proyecto.ESTADO_CHOICES, required=False)
+    prioridad = forms.ChoiceField(choices=[('', 'Sin cambio')] + Proyecto.PRIORIDAD_CHOICES, required=False)
+
+
+class CambioMasivoIncidenciaForm(CambioMasivoForm):
+    estado = forms.ChoiceField(choices=[('', 'Sin cambio')] + Incidencia.ESTADO_CHOICES, required=False)
+    prioridad = forms.ChoiceField(choices=[('', 'Sin cambio')] + Incidencia.PRIORIDAD_CHOICES, required=False)
+    asignado_a = OpcionCacheadaField('usuarios', empty_label='Sin cambio', required=False)
+    solucion = forms.CharField(required=False, widget=forms.Textarea)
+
+class ImportacionForm(forms.Form):
+    """Archivo a importar desde el admin"""
+    archivo = forms.FileField(help_text='CSV (separado por coma o punto y coma) o XLSX; la primera fila trae los encabezados')
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if importacion.formato_de(archivo.name) is None:
+            raise forms.ValidationError('El archivo debe ser .csv o .xlsx')
+        return archivo
+
+class SubidaForm(forms.Form):
+    """Datos para abrir una subida reanudable (ver siriusApp.subidas)"""
+    nombre = forms.CharField(max_length=255)
+    tamano = forms.IntegerField(min_value=1, max_value=subidas.TAMANO_MAXIMO)
+
+    def clean_nombre(self):
+        nombre = os.path.basename(self.cleaned_data['nombre'].replace('\\', '/'))
+        if os.path.splitext(nombre)[1].lower() not in subidas.EXTENSIONES:
+            raise forms.ValidationError(
+                f'Tipo de archivo no permitido ({", ".join(sorted(subidas.EXTENSIONES))})'
+            )
+        return nombre
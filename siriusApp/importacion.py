@@ -0,0 +1,450 @@
+"""Importación masiva de Clientes, Servicios y Proyectos desde CSV o XLSX.
+
+El archivo se lee fila a fila (csv u openpyxl en modo read_only) y se inserta
+de a `lote` filas con bulk_create, cada lote en su propia transacción. Las
+claves foráneas (cliente por RUT, servicio por nombre, responsable por usuario)
+se buscan con una consulta por lote y quedan guardadas para los lotes
+siguientes. Las filas con errores van al reporte y no detienen la importación.
+
+bulk_create no dispara señales: contadores, índice de búsqueda y cache
+versionada se actualizan por lote, igual que en sintetico.py.
+"""
+import csv
+import io
+import os
+from collections import Counter, defaultdict, deque
+from datetime import date, datetime
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Max
+from openpyxl import load_workbook
+
+from . import busqueda, cacheo, contadores
+from .models import Cliente, Proyecto, Servicio
+from .validators import normalizar_rut, validar_rut
+
+FORMATOS = ('csv', 'xlsx')
+LOTE = 2000
+# Separador de los nombres de servicio en la columna "servicios" de proyectos
+SEPARADOR_SERVICIOS = '|'
+VERDADEROS = {'1', 'si', 'sí', 's', 'true', 'verdadero', 'x', 'activo'}
+FALSOS = {'0', 'no', 'n', 'false', 'falso', 'inactivo'}
+
+
+class ErrorFila(Exception):
+    """Problema de una fila que no es de un campo del modelo (claves foráneas, duplicados)"""
+
+
+class ErrorLote(Exception):
+    """El lote no se pudo guardar completo: se deshace y sus filas van al reporte"""
+
+
+def formato_de(nombre):
+    """'csv' o 'xlsx' según la extensión del archivo, o None"""
+    extension = os.path.splitext(nombre)[1].lower().lstrip('.')
+    return extension if extension in FORMATOS else None
+
+
+def _columna(encabezado):
+    return str(encabezado or '').strip().lower().replace(' ', '_')
+
+
+def leer_filas(archivo, formato):
+    """Genera (número de fila, {columna: valor}); la primera fila trae los encabezados.
+
+    `archivo` es un archivo binario abierto; nunca se carga completo en memoria.
+    """
+    if formato == 'xlsx':
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            encabezados = [_columna(c) for c in next(filas, ())]
+            for numero, valores in enumerate(filas, 2):
+                if any(v not in (None, '') for v in valores):
+                    yield numero, dict(zip(encabezados, valores))
+        finally:
+            libro.close()
+        return
+
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        # Excel en español guarda con ';': se detecta con el comienzo del archivo
+        muestra = texto.read(8192)
+        texto.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=',;\t')
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(texto, dialecto)
+        encabezados = [_columna(c) for c in next(lector, [])]
+        for numero, valores in enumerate(lector, 2):
+            if any(v.strip() for v in valores):
+                yield numero, dict(zip(encabezados, valores))
+    finally:
+        # No cerrar el archivo del llamador al descartar el envoltorio
+        texto.detach()
+
+
+def _texto(valor):
+    return '' if valor is None else str(valor).strip()
+
+
+def _booleano(valor, defecto=True):
+    texto = _texto(valor).lower()
+    if texto == '':
+        return defecto
+    if texto in VERDADEROS:
+        return True
+    if texto in FALSOS:
+        return False
+    raise ErrorFila(f'Valor de sí/no no reconocido: "{valor}"')
+
+
+def _fecha(valor):
+    """Acepta fechas de Excel, AAAA-MM-DD y DD/MM/AAAA; lo demás lo rechaza full_clean()"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = _texto(valor)
+    if '/' in texto:
+        try:
+            return datetime.strptime(texto, '%d/%m/%Y').date()
+        except ValueError:
+            pass
+    return texto or None
+
+
+def _numero(valor):
+    return None if _texto(valor) == '' else valor
+
+
+def _opciones(modelo, campo):
+    """{código o etiqueta en minúsculas: código} de un campo con choices"""
+    opciones = {}
+    for codigo, etiqueta in modelo._meta.get_field(campo).choices:
+        opciones[codigo.lower()] = codigo
+        opciones[str(etiqueta).lower()] = codigo
+    return opciones
+
+
+def _mensajes(error):
+    if isinstance(error, ValidationError):
+        if hasattr(error, 'error_dict'):
+            return '; '.join(f'{campo}: {" ".join(m)}' for campo, m in error.message_dict.items())
+        return ' '.join(error.messages)
+    return str(error)
+
+
+class Resultado:
+    """Filas creadas y errores (número de fila, mensaje) de una importación"""
+
+    def __init__(self):
+        self.creados = 0
+        self.errores = []
+
+    def error(self, numero, error):
+        self.errores.append((numero, _mensajes(error)))
+
+    def escribir_reporte(self, destino):
+        """Escribe los errores como CSV (fila, error) en un archivo de texto abierto"""
+        escritor = csv.writer(destino)
+        escritor.writerow(['fila', 'error'])
+        escritor.writerows(self.errores)
+
+
+class Importador:
+    """Base de los importadores: lee, valida y guarda por lotes"""
+    modelo = None
+    # Columnas que entiende (encabezados de la primera fila), para la ayuda del admin
+    columnas = []
+    # Campos que no revisa full_clean(): las claves foráneas ya se resolvieron por lote
+    excluir_validacion = []
+
+    def __init__(self, usuario=None, lote=LOTE):
+        self.usuario = usuario
+        self.lote = lote
+        self.resultado = Resultado()
+
+    def importar(self, filas):
+        filas = iter(filas)
+        while bloque := list(islice(filas, self.lote)):
+            self.importar_lote(bloque)
+        return self.resultado
+
+    def importar_lote(self, bloque):
+        self.preparar(fila for _, fila in bloque)
+        validos, numeros = [], []
+        for numero, fila in bloque:
+            try:
+                objeto = self.construir(fila)
+                objeto.full_clean(
+                    exclude=self.excluir_validacion, validate_unique=False, validate_constraints=False,
+                )
+                self.revisar_duplicado(objeto)
+            except (ValidationError, ErrorFila) as error:
+                self.resultado.error(numero, error)
+            else:
+                validos.append(objeto)
+                numeros.append(numero)
+        if validos:
+            try:
+                with transaction.atomic():
+                    self.guardar(validos)
+            except ErrorLote as error:
+                for numero in numeros:
+                    self.resultado.error(numero, error)
+                return
+            self.invalidar()
+            self.resultado.creados += len(validos)
+
+    def preparar(self, filas):
+        """Carga en una sola consulta lo que el lote necesita buscar en la BD"""
+
+    def construir(self, fila):
+        raise NotImplementedError
+
+    def revisar_duplicado(self, objeto):
+        """Rechaza la fila si choca con otra del archivo o de la BD"""
+
+    def guardar(self, objetos):
+        self.modelo.objects.bulk_create(objetos, batch_size=self.lote)
+
+    def invalidar(self):
+        """Grupos de cacheo que cambian con las filas nuevas"""
+
+
+class ImportadorClientes(Importador):
+    modelo = Cliente
+    columnas = ['nombre', 'rut', 'email', 'telefono', 'direccion', 'tipo_cliente', 'activo']
+    TIPOS = _opciones(Cliente, 'tipo_cliente')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ruts = set()
+
+    def preparar(self, filas):
+        nuevos = {normalizar_rut(_texto(fila.get('rut'))) for fila in filas} - self.ruts
+        # Los RUT guardados desde el formulario pueden tener la k en minúscula
+        variantes = nuevos | {rut.lower() for rut in nuevos}
+        existentes = Cliente.objects.filter(rut__in=variantes).values_list('rut', flat=True)
+        self.ruts.update(normalizar_rut(rut) for rut in existentes)
+
+    def construir(self, fila):
+        rut = normalizar_rut(_texto(fila.get('rut')))
+        # El modelo no exige el dígito verificador (hay clientes antiguos sin él): se exige al importar
+        try:
+            validar_rut(rut)
+        except ValidationError as error:
+            raise ValidationError({'rut': error.messages})
+        tipo = _texto(fila.get('tipo_cliente')).lower()
+        return Cliente(
+            nombre=_texto(fila.get('nombre')),
+            rut=rut,
+            email=_texto(fila.get('email')),
+            telefono=_texto(fila.get('telefono')),
+            direccion=_texto(fila.get('direccion')),
+            tipo_cliente=self.TIPOS.get(tipo, tipo),
+            activo=_booleano(fila.get('activo')),
+        )
+
+    def revisar_duplicado(self, objeto):
+        if objeto.rut in self.ruts:
+            raise ErrorFila(f'Ya existe un cliente con RUT {objeto.rut}')
+        self.ruts.add(objeto.rut)
+
+    def guardar(self, objetos):
+        super().guardar(objetos)
+        if objetos[0].pk is None:
+            # MySQL no devuelve los ids del INSERT múltiple: se leen por RUT
+            ids = dict(Cliente.objects.filter(rut__in=[c.rut for c in objetos]).values_list('rut', 'id'))
+            for cliente in objetos:
+                cliente.pk = ids[cliente.rut]
+        contadores.ajustar(contadores.deltas_lote(objetos))
+        busqueda.indexar_lote(objetos, self.lote)
+
+    def invalidar(self):
+        cacheo.invalidar('clientes')
+
+
+class ImportadorServicios(Importador):
+    modelo = Servicio
+    columnas = ['nombre', 'tipo_servicio', 'descripcion', 'precio_base', 'activo']
+    TIPOS = _opciones(Servicio, 'tipo_servicio')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.nombres = set()
+
+    def preparar(self, filas):
+        nuevos = {_texto(fila.get('nombre')) for fila in filas} - self.nombres
+        self.nombres.update(Servicio.objects.filter(nombre__in=nuevos).values_list('nombre', flat=True))
+
+    def construir(self, fila):
+        tipo = _texto(fila.get('tipo_servicio')).lower()
+        return Servicio(
+            nombre=_texto(fila.get('nombre')),
+            tipo_servicio=self.TIPOS.get(tipo, tipo),
+            descripcion=_texto(fila.get('descripcion')),
+            precio_base=_numero(fila.get('precio_base')),
+            activo=_booleano(fila.get('activo')),
+        )
+
+    def revisar_duplicado(self, objeto):
+        # Los proyectos referencian servicios por nombre: tiene que ser único
+        if objeto.nombre in self.nombres:
+            raise ErrorFila(f'Ya existe un servicio llamado "{objeto.nombre}"')
+        self.nombres.add(objeto.nombre)
+
+    def invalidar(self):
+        cacheo.invalidar('servicios')
+
+
+class ImportadorProyectos(Importador):
+    modelo = Proyecto
+    columnas = [
+        'nombre', 'cliente (RUT)', 'descripcion', 'fecha_inicio', 'fecha_fin_estimada', 'fecha_fin_real',
+        'estado', 'prioridad', 'presupuesto_total', 'costo_real', 'responsable (usuario)',
+        f'servicios (nombres separados por "{SEPARADOR_SERVICIOS}")',
+    ]
+    excluir_validacion = ['cliente', 'responsable', 'creado_por']
+    ESTADOS = _opciones(Proyecto, 'estado')
+    PRIORIDADES = _opciones(Proyecto, 'prioridad')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Cache de búsquedas: valor -> id, o None si no existe (para no volver a buscarlo)
+        self.clientes = {}
+        self.servicios = {}
+        self.usuarios = {}
+
+    def preparar(self, filas):
+        ruts, servicios, usuarios = set(), set(), set()
+        for fila in filas:
+            ruts.add(normalizar_rut(_texto(fila.get('cliente'))))
+            servicios.update(self._nombres_servicios(fila))
+            usuarios.add(_texto(fila.get('responsable')))
+        self._buscar(self.clientes, ruts, self._ids_clientes)
+        self._buscar(self.servicios, servicios, self._ids_servicios)
+        self._buscar(self.usuarios, usuarios - {''}, self._ids_usuarios)
+
+    @staticmethod
+    def _buscar(cache, valores, consulta):
+        faltantes = [v for v in valores if v not in cache]
+        if faltantes:
+            encontrados = consulta(faltantes)
+            cache.update((v, encontrados.get(v)) for v in faltantes)
+
+    @staticmethod
+    def _ids_clientes(ruts):
+        variantes = set(ruts) | {rut.lower() for rut in ruts}
+        filas = Cliente.objects.filter(rut__in=variantes).values_list('rut', 'id')
+        return {normalizar_rut(rut): pk for rut, pk in filas}
+
+    @staticmethod
+    def _ids_servicios(nombres):
+        ids = {}
+        for nombre, pk in Servicio.objects.filter(nombre__in=nombres).values_list('nombre', 'id'):
+            # Nombre repetido en el catálogo: no se sabe cuál es, se marca ambiguo
+            ids[nombre] = 0 if nombre in ids else pk
+        return ids
+
+    @staticmethod
+    def _ids_usuarios(usernames):
+        return dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+    @staticmethod
+    def _nombres_servicios(fila):
+        nombres = _texto(fila.get('servicios')).split(SEPARADOR_SERVICIOS)
+        return [n.strip() for n in nombres if n.strip()]
+
+    def construir(self, fila):
+        rut = normalizar_rut(_texto(fila.get('cliente')))
+        cliente_id = self.clientes.get(rut)
+        if cliente_id is None:
+            raise ErrorFila(f'No existe un cliente con RUT "{rut}"')
+        responsable = _texto(fila.get('responsable'))
+        responsable_id = self.usuarios.get(responsable) if responsable else None
+        if responsable and responsable_id is None:
+            raise ErrorFila(f'No existe el usuario "{responsable}"')
+        servicios_ids = []
+        for nombre in self._nombres_servicios(fila):
+            pk = self.servicios.get(nombre)
+            if not pk:
+                raise ErrorFila(f'Servicio "{nombre}" ' + ('ambiguo' if pk == 0 else 'no encontrado'))
+            servicios_ids.append(pk)
+        estado = _texto(fila.get('estado')).lower() or 'cotizado'
+        prioridad = _texto(fila.get('prioridad')).lower() or 'media'
+
+        proyecto = Proyecto(
+            nombre=_texto(fila.get('nombre')),
+            cliente_id=cliente_id,
+            descripcion=_texto(fila.get('descripcion')),
+            fecha_inicio=_fecha(fila.get('fecha_inicio')),
+            fecha_fin_estimada=_fecha(fila.get('fecha_fin_estimada')),
+            fecha_fin_real=_fecha(fila.get('fecha_fin_real')),
+            estado=self.ESTADOS.get(estado, estado),
+            prioridad=self.PRIORIDADES.get(prioridad, prioridad),
+            presupuesto_total=_numero(fila.get('presupuesto_total')),
+            costo_real=_numero(fila.get('costo_real')),
+            responsable_id=responsable_id,
+            creado_por=self.usuario,
+        )
+        proyecto._servicios_ids = list(dict.fromkeys(servicios_ids))
+        return proyecto
+
+    def guardar(self, objetos):
+        devuelve_ids = connection.features.can_return_rows_from_bulk_insert
+        ultimo = None if devuelve_ids else Proyecto.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+        super().guardar(objetos)
+        if objetos[0].pk is None:
+            self._leer_ids(objetos, ultimo)
+        Intermedia = Proyecto.servicios.through
+        Intermedia.objects.bulk_create(
+            [Intermedia(proyecto_id=p.pk, servicio_id=s) for p in objetos for s in p._servicios_ids],
+            batch_size=self.lote,
+        )
+        contadores.ajustar(contadores.deltas_lote(objetos))
+        busqueda.indexar_lote(objetos, self.lote)
+
+    def _leer_ids(self, objetos, ultimo):
+        """MySQL no devuelve los ids del INSERT múltiple: se leen los proyectos con id mayor
+        al último previo al lote y se emparejan por cliente y nombre, en orden de id.
+
+        Si otra importación insertó al mismo tiempo filas que también calzan, no hay cómo
+        saber cuáles son de este lote: ErrorLote lo deshace completo.
+        """
+        creados = Proyecto.objects.filter(
+            id__gt=ultimo, creado_por=self.usuario,
+            cliente_id__in={p.cliente_id for p in objetos}, nombre__in={p.nombre for p in objetos},
+        ).order_by('id').values_list('cliente_id', 'nombre', 'id')
+        ids = defaultdict(deque)
+        for cliente_id, nombre, pk in creados:
+            ids[cliente_id, nombre].append(pk)
+        esperados = Counter((p.cliente_id, p.nombre) for p in objetos)
+        if esperados != Counter({clave: len(pks) for clave, pks in ids.items()}):
+            raise ErrorLote(
+                f'No se pudieron identificar los {len(objetos)} proyectos insertados '
+                f'(se encontraron {len(creados)}); el lote no se guardó, vuelva a importarlo'
+            )
+        for proyecto in objetos:
+            proyecto.pk = ids[proyecto.cliente_id, proyecto.nombre].popleft()
+
+    def invalidar(self):
+        cacheo.invalidar('proyectos')
+
+
+IMPORTADORES = {
+    'clientes': ImportadorClientes,
+    'servicios': ImportadorServicios,
+    'proyectos': ImportadorProyectos,
+}
+
+
+def importar(tipo, archivo, formato, usuario=None, lote=LOTE):
+    """Importa un archivo binario abierto; devuelve el Resultado con creados y errores"""
+    importador = IMPORTADORES[tipo](usuario=usuario, lote=lote)
+    return importador.importar(leer_filas(archivo, formato))
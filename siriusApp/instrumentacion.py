@@ -0,0 +1,186 @@
+"""Medición por petición: consultas SQL, tiempo en BD, plantillas y vista.
+
+InstrumentacionMiddleware envuelve cada petición con un execute_wrapper de
+la conexión (sin DEBUG ni connection.queries) y publica el resultado en la
+cabecera Server-Timing y en una línea del logger siriusApp.instrumentacion:
+
+  db    consultas y tiempo total en la BD
+  dup   consultas repetidas: mismo SQL con otros parámetros (N+1)
+  tpl   tiempo renderizando plantillas (backend PlantillasMedidas)
+  view  desde que se resuelve la URL hasta que la respuesta está lista
+  total toda la petición desde este middleware
+
+El tiempo en BD de las consultas lanzadas desde una plantilla cuenta también
+en tpl. Si una URL pasa su presupuesto de consultas (PRESUPUESTO_CONSULTAS,
+por nombre de URL) se registra un warning con los SQL más repetidos; la
+línea INFO de cada petición solo sale con INSTRUMENTACION_LOG_PETICIONES
+(variable de entorno SIRIUS_LOG_PETICIONES=1), que sube el logger a INFO. La
+duración y el status de cada petición también van a siriusApp.metricas.
+"""
+import logging
+from contextlib import ExitStack
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metricas
+
+logger = logging.getLogger(__name__)
+
+PRESUPUESTO_POR_DEFECTO = 50
+SQL_EN_AVISO = 3
+LARGO_SQL = 300
+
+_actual = ContextVar('medicion', default=None)
+
+
+class Medicion:
+    """Acumulado de una petición; cada consulta suma a su SQL sin parámetros"""
+
+    def __init__(self):
+        self.inicio = perf_counter()
+        self.inicio_vista = None
+        self.fin_vista = None
+        self.sql = {}
+        self.consultas = 0
+        self.db = 0.0
+        self.plantillas = 0.0
+        self._anidadas = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = perf_counter() - inicio
+            self.consultas += 1
+            self.db += duracion
+            acumulado = self.sql.get(sql)
+            if acumulado is None:
+                self.sql[sql] = [1, duracion]
+            else:
+                acumulado[0] += 1
+                acumulado[1] += duracion
+
+    @property
+    def duplicadas(self):
+        return self.consultas - len(self.sql)
+
+    @property
+    def vista(self):
+        if self.inicio_vista is None:
+            return 0.0
+        return (self.fin_vista or perf_counter()) - self.inicio_vista
+
+    def repetidas(self, cantidad=SQL_EN_AVISO):
+        """Los SQL con más ejecuciones (y más tiempo a igual número): [(sql, veces, segundos)]"""
+        orden = sorted(self.sql.items(), key=lambda item: (item[1][0], item[1][1]), reverse=True)
+        return [(sql, veces, tiempo) for sql, (veces, tiempo) in orden[:cantidad]]
+
+    def medir(self):
+        """Contexto que registra las consultas de todas las conexiones configuradas"""
+        pila = ExitStack()
+        for alias in connections:
+            pila.enter_context(connections[alias].execute_wrapper(self))
+        return pila
+
+
+class _Plantilla(Template):
+    def render(self, context=None, request=None):
+        medicion = _actual.get()
+        if medicion is None:
+            return super().render(context, request)
+        # Un render dentro de otro (render_to_string en un tag) ya lo cuenta el de afuera
+        medicion._anidadas += 1
+        inicio = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            medicion._anidadas -= 1
+            if not medicion._anidadas:
+                medicion.plantillas += perf_counter() - inicio
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """Backend de plantillas de Django que suma el tiempo de render a la petición en curso"""
+
+    def from_string(self, template_code):
+        return _Plantilla(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return _Plantilla(super().get_template(template_name).template, self)
+
+
+def presupuesto(nombre_url):
+    """Consultas admitidas para la URL; PRESUPUESTO_CONSULTAS = {'default': N, 'proyecto_lista': M, ...}"""
+    presupuestos = getattr(settings, 'PRESUPUESTO_CONSULTAS', {})
+    return presupuestos.get(nombre_url, presupuestos.get('default', PRESUPUESTO_POR_DEFECTO))
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 1)
+
+
+class InstrumentacionMiddleware:
+    """Server-Timing y log estructurado de cada petición; va primero en MIDDLEWARE"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION_ACTIVA', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        try:
+            with medicion.medir():
+                respuesta = self.get_response(request)
+                if medicion.inicio_vista is not None:
+                    medicion.fin_vista = perf_counter()
+        finally:
+            _actual.reset(token)
+        total = perf_counter() - medicion.inicio
+
+        respuesta['Server-Timing'] = ', '.join([
+            f'db;dur={_ms(medicion.db)};desc="{medicion.consultas} consultas"',
+            f'dup;desc="{medicion.duplicadas} repetidas"',
+            f'tpl;dur={_ms(medicion.plantillas)}',
+            f'view;dur={_ms(medicion.vista)}',
+            f'total;dur={_ms(total)}',
+        ])
+        self.registrar(request, respuesta, medicion, total)
+        return respuesta
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        medicion = _actual.get()
+        if medicion is not None:
+            medicion.inicio_vista = perf_counter()
+
+    def registrar(self, request, respuesta, medicion, total):
+        coincidencia = request.resolver_match
+        nombre_url = coincidencia.view_name if coincidencia else '-'
+        datos = {
+            'url': nombre_url, 'metodo': request.method, 'ruta': request.path, 'status': respuesta.status_code,
+            'consultas': medicion.consultas, 'duplicadas': medicion.duplicadas, 'db_ms': _ms(medicion.db),
+            'tpl_ms': _ms(medicion.plantillas), 'vista_ms': _ms(medicion.vista), 'total_ms': _ms(total),
+        }
+        metricas.observar_peticion(nombre_url, request.method, respuesta.status_code, total)
+        # Texto clave=valor para el log plano; el dict en `extra` para formateadores JSON.
+        # Sin SIRIUS_LOG_PETICIONES el logger está en WARNING y no se arma el texto
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(' '.join(f'{clave}={valor}' for clave, valor in datos.items()), extra={'instrumentacion': datos})
+
+        limite = presupuesto(nombre_url)
+        if limite is not None and medicion.consultas > limite:
+            detalle = '\n'.join(
+                f'  {veces}x {_ms(tiempo)}ms {sql[:LARGO_SQL]}' for sql, veces, tiempo in medicion.repetidas()
+            )
+            logger.warning(
+                'url=%s hizo %d consultas (presupuesto %d, %d repetidas); las más repetidas:\n%s',
+                nombre_url, medicion.consultas, limite, medicion.duplicadas, detalle,
+                extra={'instrumentacion': datos},
+            )
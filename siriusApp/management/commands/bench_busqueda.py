@@ -0,0 +1,70 @@
+import time
+from functools import reduce
+from operator import or_
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from siriusApp import busqueda
+from siriusApp.models import Cliente, Proyecto, Presupuesto, Incidencia
+
+# Lo que hacen hoy los search_fields del admin: LIKE '%x%' por campo
+CAMPOS_LIKE = {
+    Proyecto: ['nombre', 'cliente__nombre', 'descripcion'],
+    Incidencia: ['titulo', 'descripcion', 'proyecto__nombre'],
+    Cliente: ['nombre', 'rut', 'email'],
+    Presupuesto: ['numero_presupuesto', 'cliente__nombre', 'descripcion'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara la búsqueda con LIKE %x% sobre cada modelo (como search_fields del admin) '
+        'con la búsqueda de texto completo de IndiceBusqueda'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('terminos', nargs='*', default=['sintético 12', 'rendimiento', 'terreno'],
+                            help='Consultas a medir')
+        parser.add_argument('--usuario', help='Usuario con el que se aplica el alcance (por defecto un staff)')
+        parser.add_argument('--repeticiones', type=int, default=3,
+                            help='Ejecuciones por consulta; se informa la mejor')
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            user = User.objects.filter(username=options['usuario']).first()
+        else:
+            user = User.objects.filter(is_staff=True).first()
+        if user is None:
+            raise CommandError('No hay usuario para medir; use --usuario')
+
+        for texto in options['terminos']:
+            like_ms, like_total = self._medir(lambda: self._like(texto), options['repeticiones'])
+            fts_ms, fts_total = self._medir(lambda: [busqueda.buscar(user, texto)], options['repeticiones'])
+            self.stdout.write(
+                f'"{texto}": LIKE {like_ms:9.2f} ms ({like_total} filas)  '
+                f'texto completo {fts_ms:9.2f} ms ({fts_total} filas)'
+            )
+
+    def _like(self, texto):
+        """Un queryset por modelo, con todas las palabras en alguno de los campos"""
+        querysets = []
+        for modelo, campos in CAMPOS_LIKE.items():
+            queryset = modelo.objects.all()
+            for palabra in texto.split():
+                queryset = queryset.filter(reduce(or_, (Q(**{f'{campo}__icontains': palabra}) for campo in campos)))
+            querysets.append(queryset)
+        return querysets
+
+    def _medir(self, construir, repeticiones):
+        """Mejor tiempo de COUNT + primera página de 20 en cada queryset"""
+        mejor, total = float('inf'), 0
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            total = 0
+            for queryset in construir():
+                total += queryset.count()
+                list(queryset[:20])
+            mejor = min(mejor, time.perf_counter() - inicio)
+        return mejor * 1000, total
@@ -0,0 +1,59 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from siriusApp import cacheo
+
+SIN_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide peticiones por segundo de la portada y del catálogo de servicios '
+        'sin cache (DummyCache) y con la cache configurada en CACHES'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=300, help='Peticiones por página y modo')
+        parser.add_argument('--usuario', help='Usuario para las páginas con login (por defecto un staff)')
+
+    def handle(self, *args, **options):
+        if options['usuario']:
+            user = User.objects.filter(username=options['usuario']).first()
+        else:
+            user = User.objects.filter(is_staff=True).first()
+        if user is None:
+            raise CommandError('No hay usuario para medir; use --usuario')
+
+        anonimo = Client(HTTP_HOST='localhost')
+        autenticado = Client(HTTP_HOST='localhost')
+        autenticado.force_login(user)
+        paginas = [
+            ('portada (visitante)', anonimo, reverse('home')),
+            ('portada (usuario)', autenticado, reverse('home')),
+            ('catálogo de servicios', autenticado, reverse('servicio_lista')),
+        ]
+
+        for nombre, client, url in paginas:
+            with override_settings(CACHES=SIN_CACHE):
+                sin = self._medir(client, url, options['peticiones'], limpiar=True)
+            con = self._medir(client, url, options['peticiones'])
+            self.stdout.write(
+                f'{nombre:24} sin cache {sin:8.1f} req/s   con cache {con:8.1f} req/s   x{con / sin:.1f}'
+            )
+
+    def _medir(self, client, url, peticiones, limpiar=False):
+        """Peticiones por segundo tras una petición de calentamiento"""
+        client.get(url)
+        inicio = time.perf_counter()
+        for _ in range(peticiones):
+            if limpiar:
+                # Sin esto la copia local de cacheo respondería aunque la cache sea DummyCache
+                cacheo._locales.clear()
+            respuesta = client.get(url)
+            if respuesta.status_code != 200:
+                raise CommandError(f'{url} respondió {respuesta.status_code}')
+        return peticiones / (time.perf_counter() - inicio)
@@ -0,0 +1,62 @@
+import resource
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from siriusApp import exportacion, sintetico
+from siriusApp.models import Proyecto
+
+
+def _rss_maximo_mb():
+    """Pico de memoria residente del proceso (ru_maxrss viene en KB en Linux y en bytes en macOS)"""
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide filas/segundo y el pico de memoria (RSS) de la exportación de proyectos a Excel. '
+        'Los tamaños se miden de menor a mayor en el mismo proceso: si la memoria es constante, '
+        'el pico no debe crecer de un tamaño al siguiente'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, nargs='+', default=[10_000, 100_000, 500_000],
+                            help='Cantidades de proyectos a exportar')
+        parser.add_argument('--lote', type=int, default=exportacion.LOTE,
+                            help='Filas leídas por consulta')
+        parser.add_argument('--no-sembrar', action='store_true',
+                            help='No generar proyectos sintéticos si faltan filas')
+
+    def handle(self, *args, **options):
+        tamanos = sorted(options['filas'])
+        faltan = tamanos[-1] - Proyecto.objects.count()
+        if faltan > 0 and not options['no_sembrar']:
+            self._sembrar(faltan)
+
+        self.stdout.write(f'RSS inicial: {_rss_maximo_mb():.1f} MB')
+        for cantidad in tamanos:
+            ids = Proyecto.objects.order_by('id').values_list('id', flat=True)
+            corte = ids[cantidad - 1:cantidad].first()
+            if corte is None:
+                self.stdout.write(self.style.WARNING(f'{cantidad}: no hay suficientes proyectos'))
+                continue
+            proyectos = Proyecto.objects.filter(id__lte=corte)
+
+            with tempfile.TemporaryFile(suffix='.xlsx') as archivo:
+                inicio = time.perf_counter()
+                filas = exportacion.escribir_proyectos_xlsx(proyectos, archivo, options['lote'])
+                segundos = time.perf_counter() - inicio
+                tamano = archivo.tell() / (1024 * 1024)
+            self.stdout.write(
+                f'{filas:>9} filas  {segundos:8.2f} s  {filas / segundos:10.0f} filas/s  '
+                f'{tamano:7.1f} MB xlsx  pico RSS {_rss_maximo_mb():7.1f} MB'
+            )
+
+    def _sembrar(self, cantidad):
+        self.stdout.write(f'Generando {cantidad} proyectos...')
+        usuarios = sintetico.generar_usuarios(max(cantidad // 500, 5))
+        clientes = sintetico.generar_clientes(max(cantidad // 20, 10))
+        sintetico.generar_proyectos(cantidad, clientes, usuarios)
@@ -0,0 +1,119 @@
+import time
+from datetime import date, timedelta
+from itertools import combinations
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from siriusApp import sintetico
+from siriusApp.forms import ProyectoFiltroForm, IncidenciaFiltroForm
+from siriusApp.models import Cliente, Proyecto, Incidencia
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara el plan de ejecución y el tiempo de cada combinación de filtros de '
+        'ProyectoFiltroForm e IncidenciaFiltroForm, sin y con los índices compuestos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sembrar', type=int, default=0,
+                            help='Proyectos sintéticos a generar antes de medir (se crean 3 incidencias por proyecto)')
+        parser.add_argument('--repeticiones', type=int, default=3,
+                            help='Ejecuciones por consulta; se informa la mejor')
+        parser.add_argument('--sin-planes', action='store_true',
+                            help='Mostrar solo los tiempos, sin el EXPLAIN')
+
+    def handle(self, *args, **options):
+        if options['sembrar']:
+            self._sembrar(options['sembrar'])
+
+        casos = [
+            (Proyecto, ProyectoFiltroForm, self._valores_proyecto()),
+            (Incidencia, IncidenciaFiltroForm, self._valores_incidencia()),
+        ]
+        for modelo, form_class, valores in casos:
+            if not valores:
+                self.stdout.write(self.style.WARNING(f'Sin datos de {modelo.__name__}; use --sembrar'))
+                continue
+            combinaciones = self._combinaciones(form_class, valores)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\n{modelo.__name__}: {modelo.objects.count()} filas, {len(combinaciones)} combinaciones de filtros'
+            ))
+
+            self._quitar_indices(modelo)
+            try:
+                antes = {clave: self._medir(form_class, modelo, datos, options) for clave, datos in combinaciones}
+            finally:
+                self._crear_indices(modelo)
+            despues = {clave: self._medir(form_class, modelo, datos, options) for clave, datos in combinaciones}
+
+            for clave, _ in combinaciones:
+                (ms_antes, plan_antes), (ms_despues, plan_despues) = antes[clave], despues[clave]
+                self.stdout.write(f'[{clave or "sin filtros"}] {ms_antes:8.2f} ms -> {ms_despues:8.2f} ms')
+                if not options['sin_planes']:
+                    self.stdout.write('    sin índices: ' + plan_antes.replace('\n', '\n                 '))
+                    self.stdout.write('    con índices: ' + plan_despues.replace('\n', '\n                 '))
+
+    def _sembrar(self, cantidad):
+        self.stdout.write(f'Generando {cantidad} proyectos y {cantidad * 3} incidencias...')
+        usuarios = sintetico.generar_usuarios(max(cantidad // 500, 5))
+        clientes = sintetico.generar_clientes(max(cantidad // 20, 10))
+        proyectos = sintetico.generar_proyectos(cantidad, clientes, usuarios)
+        sintetico.generar_incidencias(cantidad * 3, proyectos, usuarios)
+
+    def _valores_proyecto(self):
+        muestra = Proyecto.objects.filter(cliente__activo=True, responsable__is_active=True).first()
+        if muestra is None:
+            return {}
+        hoy = date.today()
+        return {
+            'cliente': muestra.cliente_id,
+            'estado': 'en_proceso',
+            'prioridad': 'alta',
+            'fecha_inicio': (hoy - timedelta(days=180)).isoformat(),
+            'fecha_fin': (hoy + timedelta(days=180)).isoformat(),
+            'responsable': muestra.responsable_id,
+        }
+
+    def _valores_incidencia(self):
+        muestra = Incidencia.objects.first()
+        if muestra is None:
+            return {}
+        return {
+            'proyecto': muestra.proyecto_id,
+            'tipo_incidencia': 'tecnica',
+            'estado': 'abierta',
+            'prioridad': 'alta',
+        }
+
+    def _combinaciones(self, form_class, valores):
+        """Todas las combinaciones de campos que el formulario puede producir"""
+        campos = list(form_class.base_fields)
+        resultado = []
+        for n in range(len(campos) + 1):
+            for grupo in combinations(campos, n):
+                resultado.append((', '.join(grupo), {campo: valores[campo] for campo in grupo}))
+        return resultado
+
+    def _medir(self, form_class, modelo, datos, options):
+        """Mejor tiempo de la página 1 (COUNT + LIMIT 10) y su plan de ejecución"""
+        queryset = form_class(datos).filtrar(modelo.objects.all())
+        mejor = float('inf')
+        for _ in range(options['repeticiones']):
+            inicio = time.perf_counter()
+            queryset.count()
+            list(queryset[:10])
+            mejor = min(mejor, time.perf_counter() - inicio)
+        plan = '' if options['sin_planes'] else queryset[:10].explain()
+        return mejor * 1000, plan
+
+    def _quitar_indices(self, modelo):
+        with connection.schema_editor() as editor:
+            for index in modelo._meta.indexes:
+                editor.remove_index(modelo, index)
+
+    def _crear_indices(self, modelo):
+        with connection.schema_editor() as editor:
+            for index in modelo._meta.indexes:
+                editor.add_index(modelo, index)
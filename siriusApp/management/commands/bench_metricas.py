@@ -0,0 +1,66 @@
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from siriusApp import metricas
+
+URLS = ['proyecto_lista', 'proyecto_detalle', 'incidencia_crear', 'exportar_proyectos_excel', 'api_lista']
+OBJETIVO_US = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide lo que suma siriusApp.metricas a cada petición (un contador y un histograma, '
+        'como InstrumentacionMiddleware), en uno y en varios hilos, y el costo de /metrics'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=200000, help='Observaciones por hilo')
+        parser.add_argument('--hilos', type=int, default=4)
+
+    def handle(self, *args, **options):
+        # Los volcados periódicos van a un directorio aparte: no se mezclan con las métricas reales
+        with tempfile.TemporaryDirectory() as carpeta, override_settings(METRICAS_DIR=carpeta):
+            self._bench(options)
+
+    def _bench(self, options):
+        peticiones = options['peticiones']
+        self._observar(1000)  # calentamiento: crea las series
+
+        por_peticion = self._medir(peticiones)
+        self._informar('1 hilo', por_peticion)
+
+        tiempos = []
+        hilos = [
+            threading.Thread(target=lambda: tiempos.append(self._medir(peticiones)))
+            for _ in range(options['hilos'])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        self._informar(f'{options["hilos"]} hilos', max(tiempos))
+
+        inicio = time.perf_counter()
+        texto = metricas.registro.exponer()
+        self.stdout.write(
+            f'/metrics: {len(texto.splitlines())} líneas en {(time.perf_counter() - inicio) * 1000:.1f} ms'
+        )
+
+    def _observar(self, cantidad):
+        observar = metricas.observar_peticion
+        for i in range(cantidad):
+            observar(URLS[i % len(URLS)], 'GET', 200, (i % 500) / 1000)
+
+    def _medir(self, peticiones):
+        """Microsegundos por petición observada"""
+        inicio = time.perf_counter()
+        self._observar(peticiones)
+        return (time.perf_counter() - inicio) / peticiones * 1e6
+
+    def _informar(self, nombre, microsegundos):
+        estilo = self.style.SUCCESS if microsegundos < OBJETIVO_US else self.style.ERROR
+        self.stdout.write(estilo(f'{nombre:10} {microsegundos:6.2f} µs por petición (objetivo < {OBJETIVO_US} µs)'))
@@ -0,0 +1,215 @@
+import json
+import logging
+import resource
+import sys
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import URLPattern, get_resolver, reverse
+
+from siriusApp import instrumentacion
+from siriusApp.models import (
+    Cliente, Incidencia, PerfilUsuario, Presupuesto, Proyecto, Servicio, TrabajoExportacion,
+)
+
+# Vistas que modifican datos con un GET: medirlas cambiaría lo que miden las siguientes
+OMITIR = {'cliente_eliminar', 'servicio_eliminar'}
+# Las vistas que responden 405 al GET solo aceptan POST (u otro método): no se miden
+SOLO_OTRO_METODO = 405
+# Prefijo del nombre de la URL -> modelo del <int:pk>
+MODELOS = {
+    'cliente': Cliente, 'servicio': Servicio, 'proyecto': Proyecto, 'presupuesto': Presupuesto,
+    'incidencia': Incidencia, 'exportacion': TrabajoExportacion,
+    # La API se mide con recurso=proyectos
+    'api': Proyecto,
+}
+ROLES = ['admin', 'empleado', 'cliente']
+
+
+def _rss_maximo_mb():
+    """Pico de memoria residente del proceso (ru_maxrss viene en KB en Linux y en bytes en macOS)"""
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / (1024 * 1024) if sys.platform == 'darwin' else maximo / 1024
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Recorre con el cliente de pruebas cada URL de siriusApp/urls.py como admin, empleado y '
+        'cliente, y reporta en JSON p50/p95 de latencia, consultas SQL y pico de memoria por vista. '
+        'Todo corre en una transacción que se deshace al final. Las URL que no se pueden medir con GET '
+        '(solo POST, sin un objeto que el rol pueda ver) van en "omitidas" con el motivo'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20, help='Peticiones medidas por URL y rol')
+        parser.add_argument('--roles', nargs='+', choices=ROLES, default=ROLES)
+        parser.add_argument('--solo', nargs='+', help='Medir solo estos nombres de URL')
+        parser.add_argument('--salida', help='Escribe el JSON en este archivo (por defecto a stdout)')
+        parser.add_argument('--comparar', help='JSON de una corrida anterior contra el que comparar')
+
+    def handle(self, *args, **options):
+        if not Proyecto.objects.exists():
+            raise CommandError('No hay proyectos para medir; use manage.py generar_datos')
+
+        # Una línea de log por petición ensuciaría la salida; los warnings de presupuesto se mantienen
+        registro = logging.getLogger(instrumentacion.__name__)
+        nivel = registro.level
+        registro.setLevel(logging.WARNING)
+        try:
+            with transaction.atomic():
+                resultados, omitidas = self._medir_todo(options)
+                transaction.set_rollback(True)
+        finally:
+            registro.setLevel(nivel)
+
+        informe = {
+            'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'motor': connection.vendor,
+            'filas': {modelo.__name__: modelo.objects.count() for modelo in MODELOS.values()},
+            'repeticiones': options['repeticiones'],
+            'pico_rss_mb': round(_rss_maximo_mb(), 1),
+            'resultados': resultados,
+            'omitidas': omitidas,
+        }
+        texto = json.dumps(informe, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as destino:
+                destino.write(texto + '\n')
+            self._tabla(resultados, omitidas)
+        else:
+            self.stdout.write(texto)
+        if options['comparar']:
+            self._comparar(options['comparar'], resultados)
+
+    def _usuarios(self):
+        """Un usuario por rol; el empleado es responsable de proyectos y el cliente tiene proyectos"""
+        admin, _ = User.objects.get_or_create(
+            username='bench_vistas_admin', defaults={'is_staff': True, 'is_superuser': True},
+        )
+        PerfilUsuario.objects.get_or_create(user=admin, defaults={'tipo_usuario': 'administrador'})
+
+        muestra = Proyecto.objects.exclude(responsable=None).order_by('-id').first() or Proyecto.objects.first()
+        empleado = muestra.responsable
+        if empleado is None:
+            empleado, _ = User.objects.get_or_create(username='bench_vistas_empleado')
+        PerfilUsuario.objects.get_or_create(user=empleado, defaults={'tipo_usuario': 'empleado'})
+
+        cliente, _ = User.objects.get_or_create(username='bench_vistas_cliente')
+        PerfilUsuario.objects.update_or_create(
+            user=cliente, defaults={'tipo_usuario': 'cliente', 'cliente_id': muestra.cliente_id},
+        )
+        return {'admin': admin, 'empleado': empleado, 'cliente': cliente}
+
+    def _argumentos(self, patron, usuario):
+        """kwargs para reverse de la URL; None si no hay un objeto que el rol pueda ver"""
+        kwargs = {}
+        for nombre, conversor in patron.pattern.converters.items():
+            if nombre == 'recurso':
+                kwargs[nombre] = 'proyectos'
+            elif nombre == 'pk' and type(conversor).__name__ == 'IntConverter':
+                modelo = MODELOS.get(patron.name.split('_')[0])
+                if modelo is None:
+                    return None
+                if modelo is TrabajoExportacion:
+                    objetos = modelo.objects.filter(usuario=usuario)
+                elif hasattr(modelo.objects, 'visible_to'):
+                    objetos = modelo.objects.visible_to(usuario)
+                else:
+                    objetos = modelo.objects.all()
+                pk = objetos.order_by('-pk').values_list('pk', flat=True).first()
+                if pk is None:
+                    return None
+                kwargs[nombre] = pk
+            else:
+                return None
+        return kwargs
+
+    def _medir_todo(self, options):
+        usuarios = self._usuarios()
+        patrones = [
+            patron for patron in get_resolver('siriusApp.urls').url_patterns
+            if isinstance(patron, URLPattern) and (not options['solo'] or patron.name in options['solo'])
+        ]
+        resultados, omitidas = [], []
+        for rol in options['roles']:
+            client = Client(HTTP_HOST='localhost')
+            client.force_login(usuarios[rol])
+            for patron in patrones:
+                if patron.name in OMITIR:
+                    omitidas.append({'url': patron.name, 'rol': rol, 'motivo': 'modifica datos con GET'})
+                    continue
+                kwargs = self._argumentos(patron, usuarios[rol])
+                if kwargs is None:
+                    omitidas.append({'url': patron.name, 'rol': rol, 'motivo': 'sin objeto para la URL visible al rol'})
+                    continue
+                ruta = reverse(patron.name, kwargs=kwargs)
+                resultado = self._medir(client, patron.name, ruta, rol, options['repeticiones'])
+                if resultado is None:
+                    omitidas.append({'url': patron.name, 'rol': rol, 'motivo': 'no acepta GET'})
+                else:
+                    resultados.append(resultado)
+        return resultados, omitidas
+
+    def _medir(self, client, nombre, ruta, rol, repeticiones):
+        """Latencia, consultas y memoria de la URL; None si no acepta GET"""
+        # calentamiento: plantillas, caches y conexiones
+        if client.get(ruta).status_code == SOLO_OTRO_METODO:
+            return None
+        tiempos = []
+        consultas = 0
+        for _ in range(repeticiones):
+            medicion = instrumentacion.Medicion()
+            with medicion.medir():
+                inicio = time.perf_counter()
+                respuesta = client.get(ruta)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas = max(consultas, medicion.consultas)
+
+        # tracemalloc hace lenta la petición: se mide memoria en una petición aparte
+        tracemalloc.start()
+        try:
+            client.get(ruta)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return {
+            'url': nombre, 'ruta': ruta, 'rol': rol, 'status': respuesta.status_code,
+            'p50_ms': round(_percentil(tiempos, 50), 2), 'p95_ms': round(_percentil(tiempos, 95), 2),
+            'consultas': consultas, 'pico_memoria_kb': round(pico / 1024, 1),
+        }
+
+    def _tabla(self, resultados, omitidas):
+        for fila in resultados:
+            self.stdout.write(
+                f'{fila["url"]:28} {fila["rol"]:9} {fila["status"]:3}  p50 {fila["p50_ms"]:8.2f} ms  '
+                f'p95 {fila["p95_ms"]:8.2f} ms  {fila["consultas"]:3} consultas  {fila["pico_memoria_kb"]:9.1f} KB'
+            )
+        for fila in omitidas:
+            self.stdout.write(self.style.WARNING(f'{fila["url"]:28} {fila["rol"]:9} omitida: {fila["motivo"]}'))
+
+    def _comparar(self, archivo, resultados):
+        try:
+            with open(archivo, encoding='utf-8') as origen:
+                anteriores = {(fila['url'], fila['rol']): fila for fila in json.load(origen)['resultados']}
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'No se pudo leer {archivo}: {error}')
+        self.stdout.write(self.style.MIGRATE_HEADING(f'\nComparado con {archivo}'))
+        for fila in resultados:
+            anterior = anteriores.get((fila['url'], fila['rol']))
+            if anterior is None:
+                continue
+            razon = fila['p50_ms'] / anterior['p50_ms'] if anterior['p50_ms'] else 1
+            diferencia = fila['consultas'] - anterior['consultas']
+            estilo = self.style.ERROR if razon > 1.2 or diferencia > 0 else self.style.SUCCESS
+            self.stdout.write(estilo(
+                f'{fila["url"]:28} {fila["rol"]:9} p50 x{razon:5.2f}  consultas {diferencia:+d}'
+            ))
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from siriusApp import sintetico
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera datos sintéticos con bulk_create: usuarios, clientes con RUT válido, servicios, '
+        'proyectos con servicios, presupuestos e incidencias con estados sesgados. '
+        'Los volúmenes grandes se crean por bloques para acotar la memoria'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=100)
+        parser.add_argument('--clientes', type=int, default=2_000)
+        parser.add_argument('--servicios', type=int, default=100)
+        parser.add_argument('--proyectos', type=int, default=20_000)
+        parser.add_argument('--presupuestos', type=int, default=20_000)
+        parser.add_argument('--incidencias', type=int, default=100_000)
+        parser.add_argument('--bloque', type=int, default=50_000,
+                            help='Filas construidas en memoria por llamada al generador')
+        parser.add_argument('--lote', type=int, default=2_000, help='batch_size de bulk_create')
+        parser.add_argument('--semilla', type=int, help='Semilla para repetir exactamente los mismos datos')
+
+    def handle(self, *args, **options):
+        self.options = options
+        usuarios = self._generar('usuarios', lambda cantidad, semilla: sintetico.generar_usuarios(
+            cantidad, lote=options['lote']))
+        clientes = self._generar('clientes', lambda cantidad, semilla: sintetico.generar_clientes(
+            cantidad, lote=options['lote'], semilla=semilla))
+        servicios = self._generar('servicios', lambda cantidad, semilla: sintetico.generar_servicios(
+            cantidad, lote=options['lote'], semilla=semilla))
+        if not clientes:
+            self.stdout.write(self.style.WARNING('Sin clientes no se generan proyectos ni lo que depende de ellos'))
+            return
+
+        def proyectos_con_servicios(cantidad, semilla):
+            ids = sintetico.generar_proyectos(cantidad, clientes, usuarios, lote=options['lote'], semilla=semilla)
+            sintetico.asignar_servicios(ids, servicios, lote=options['lote'], semilla=semilla)
+            return ids
+
+        proyectos = self._generar('proyectos', proyectos_con_servicios)
+        if not proyectos:
+            return
+        self._generar('presupuestos', lambda cantidad, semilla: sintetico.generar_presupuestos(
+            cantidad, proyectos, usuarios, lote=options['lote'], semilla=semilla))
+        self._generar('incidencias', lambda cantidad, semilla: sintetico.generar_incidencias(
+            cantidad, proyectos, usuarios, lote=options['lote'], semilla=semilla))
+
+    def _generar(self, nombre, generador):
+        """Llama al generador por bloques; devuelve los ids creados (o [] si devuelve una cantidad)"""
+        total = self.options[nombre]
+        if not total:
+            return []
+        inicio = time.perf_counter()
+        ids = []
+        for numero, desde in enumerate(range(0, total, self.options['bloque'])):
+            cantidad = min(self.options['bloque'], total - desde)
+            semilla = None if self.options['semilla'] is None else self.options['semilla'] * 1000 + numero
+            creados = generador(cantidad, semilla)
+            if isinstance(creados, list):
+                ids.extend(creados)
+            self.stdout.write(f'  {nombre}: {desde + cantidad}/{total}', ending='\r')
+            self.stdout.flush()
+        segundos = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f'{nombre:13} {total:>9}  {segundos:7.1f} s  {total / segundos:9.0f} filas/s'
+        ))
+        return ids
@@ -0,0 +1,56 @@
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from siriusApp import importacion
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa clientes, servicios o proyectos desde un archivo CSV o XLSX. '
+        'Las filas con errores se informan y no detienen la importación'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(importacion.IMPORTADORES))
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx')
+        parser.add_argument('--formato', choices=importacion.FORMATOS,
+                            help='Formato del archivo (por defecto según la extensión)')
+        parser.add_argument('--lote', type=int, default=importacion.LOTE,
+                            help='Filas validadas e insertadas por transacción')
+        parser.add_argument('--errores', help='Escribe el reporte de errores en este CSV (por defecto a stderr)')
+        parser.add_argument('--usuario', help='Usuario que queda como creado_por de los proyectos')
+
+    def handle(self, *args, **options):
+        formato = options['formato'] or importacion.formato_de(options['archivo'])
+        if formato is None:
+            raise CommandError('No se reconoce el formato del archivo; use --formato')
+        usuario = None
+        if options['usuario']:
+            usuario = User.objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f'No existe el usuario {options["usuario"]}')
+
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                resultado = importacion.importar(
+                    options['tipo'], archivo, formato, usuario=usuario, lote=options['lote'],
+                )
+        except OSError as error:
+            raise CommandError(error)
+        segundos = time.perf_counter() - inicio
+
+        if resultado.errores:
+            if options['errores']:
+                with open(options['errores'], 'w', newline='', encoding='utf-8') as destino:
+                    resultado.escribir_reporte(destino)
+            else:
+                resultado.escribir_reporte(sys.stderr)
+        estilo = self.style.WARNING if resultado.errores else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'{resultado.creados} {options["tipo"]} importados, {len(resultado.errores)} filas con errores '
+            f'en {segundos:.1f} s ({resultado.creados / max(segundos, 1e-9):.0f} filas/s).'
+        ))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from siriusApp import adjuntos
+
+
+class Command(BaseCommand):
+    help = 'Borra los adjuntos de incidencias que ya no usa ninguna incidencia'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=float, default=adjuntos.GRACIA.total_seconds() / 3600,
+                            help='Período de gracia: no borrar archivos usados o subidos hace menos de esto')
+        parser.add_argument('--reconciliar', action='store_true',
+                            help='Recalcular antes las referencias desde las incidencias')
+        parser.add_argument('--simular', action='store_true', help='Informar sin borrar')
+
+    def handle(self, *args, **options):
+        if options['reconciliar']:
+            diferencias = adjuntos.reconciliar(corregir=not options['simular'])
+            for nombre, (guardado, real) in sorted(diferencias.items()):
+                self.stdout.write(f'{nombre}: {guardado} -> {real}')
+        borrados, liberados = adjuntos.recolectar(timedelta(hours=options['horas']), simular=options['simular'])
+        verbo = 'Se borrarían' if options['simular'] else 'Borrados'
+        self.stdout.write(self.style.SUCCESS(f'{verbo} {borrados} archivos ({liberados / 1024 / 1024:.1f} MB).'))
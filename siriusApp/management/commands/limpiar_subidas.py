@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from siriusApp import subidas
+
+
+class Command(BaseCommand):
+    help = 'Borra las subidas reanudables vencidas y sus archivos parciales'
+
+    def handle(self, *args, **options):
+        sesiones, archivos = subidas.limpiar()
+        self.stdout.write(self.style.SUCCESS(
+            f'{sesiones} subidas vencidas borradas, {archivos} archivos parciales sin sesión.'
+        ))
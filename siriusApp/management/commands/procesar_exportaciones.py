@@ -0,0 +1,62 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from siriusApp import trabajos
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de exportaciones (TrabajoExportacion) en un pool de procesos locales'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                            help='Exportaciones en paralelo (por defecto, un proceso por núcleo)')
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help='Segundos entre consultas a la cola cuando no hay trabajo')
+        parser.add_argument('--una-vez', action='store_true',
+                            help='Procesar lo pendiente y terminar')
+        parser.add_argument('--recuperar', action='store_true',
+                            help='Reencolar al iniciar los trabajos en proceso hace más de '
+                                 'EXPORTACION_TIEMPO_MAXIMO segundos (de un worker caído)')
+
+    def handle(self, *args, **options):
+        if options['recuperar']:
+            self.stdout.write(f'Reencolados: {trabajos.recuperar_colgados()}')
+
+        procesos = max(options['procesos'], 1)
+        # fork explícito: los hijos heredan Django ya configurado
+        contexto = multiprocessing.get_context('fork')
+        en_curso = {}
+        with ProcessPoolExecutor(procesos, mp_context=contexto, initializer=trabajos.inicializar_proceso) as pool:
+            while True:
+                libres = procesos - len(en_curso)
+                nuevos = trabajos.reclamar(libres) if libres else []
+                # Los procesos del pool se crean al enviar trabajo: no deben heredar conexiones abiertas
+                connections.close_all()
+                for pk in nuevos:
+                    en_curso[pool.submit(trabajos.ejecutar, pk)] = pk
+                    self.stdout.write(f'Exportación {pk}: iniciada')
+
+                if not en_curso:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['intervalo'])
+                    continue
+
+                listos, _ = wait(en_curso, timeout=options['intervalo'], return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    pk = en_curso.pop(futuro)
+                    try:
+                        estado = futuro.result()
+                    except Exception as exc:  # el proceso murió antes de registrar el error
+                        trabajos.marcar_error(pk, repr(exc))
+                        if isinstance(exc, BrokenProcessPool):
+                            raise CommandError(f'El pool de procesos se detuvo en la exportación {pk}') from exc
+                        estado = f'error ({exc})'
+                    estilo = self.style.SUCCESS if estado == 'completado' else self.style.ERROR
+                    self.stdout.write(estilo(f'Exportación {pk}: {estado}'))
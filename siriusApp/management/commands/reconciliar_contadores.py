@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from siriusApp import contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del panel desde las tablas y corrige la deriva'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solo-revisar', action='store_true',
+                            help='Informar las diferencias sin corregirlas')
+
+    def handle(self, *args, **options):
+        diferencias = contadores.reconciliar(corregir=not options['solo_revisar'])
+        if not diferencias:
+            self.stdout.write(self.style.SUCCESS('Contadores al día.'))
+            return
+        for (modelo, dimension, valor), (guardado, real) in sorted(diferencias.items()):
+            etiqueta = f'{modelo}.{dimension}={valor}' if dimension else f'{modelo} (total)'
+            self.stdout.write(f'{etiqueta}: {guardado} -> {real}')
+        if options['solo_revisar']:
+            self.stdout.write(self.style.WARNING(f'{len(diferencias)} contadores con deriva (sin corregir).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'{len(diferencias)} contadores corregidos.'))
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from siriusApp import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye el índice de búsqueda de texto completo (IndiceBusqueda)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tipo', action='append', choices=sorted(busqueda.MODELOS),
+                            help='Reindexar solo este tipo (se puede repetir)')
+        parser.add_argument('--lote', type=int, default=2000,
+                            help='Filas leídas e insertadas por lote')
+
+    def handle(self, *args, **options):
+        modelos = [busqueda.MODELOS[tipo] for tipo in options['tipo']] if options['tipo'] else None
+        inicio = time.perf_counter()
+        resultado = busqueda.reindexar(options['lote'], modelos)
+        for tipo, total in resultado.items():
+            self.stdout.write(f'{tipo}: {total} entradas')
+        self.stdout.write(self.style.SUCCESS(f'Índice reconstruido en {time.perf_counter() - inicio:.1f} s.'))
@@ -0,0 +1,69 @@
+from django.db import models
+from django.db.models import Q
+
+
+def perfil_de(user):
+    """Perfil del usuario; PerfilBackend lo carga junto al usuario, sin consulta extra"""
+    return getattr(user, 'perfilusuario', None)
+
+
+def cliente_de(user):
+    """Id del cliente vinculado si el usuario tiene perfil de cliente, si no None.
+
+    Un perfil de cliente sin cliente vinculado devuelve 0 para no ver nada.
+    """
+    perfil = perfil_de(user)
+    if perfil is None or perfil.tipo_usuario != 'cliente':
+        return None
+    return perfil.cliente_id or 0
+
+
+class ClienteQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Clientes: solo su propio cliente. Resto: todos"""
+        if not user.is_authenticated:
+            return self.none()
+        cliente_id = cliente_de(user)
+        if cliente_id is not None:
+            return self.filter(pk=cliente_id)
+        return self
+
+
+class ProyectoQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Clientes: sus proyectos. Staff: todos. Resto: los que tienen a cargo"""
+        if not user.is_authenticated:
+            return self.none()
+        cliente_id = cliente_de(user)
+        if cliente_id is not None:
+            return self.filter(cliente_id=cliente_id)
+        if user.is_staff:
+            return self
+        return self.filter(responsable=user)
+
+
+class PresupuestoQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Clientes: sus presupuestos. Resto: todos"""
+        if not user.is_authenticated:
+            return self.none()
+        cliente_id = cliente_de(user)
+        if cliente_id is not None:
+            return self.filter(cliente_id=cliente_id)
+        return self
+
+
+class IncidenciaQuerySet(models.QuerySet):
+    def visible_to(self, user):
+        """Clientes: las de sus proyectos. Staff: todas. Resto: las de sus proyectos,
+        las asignadas a ellos y las que reportaron"""
+        if not user.is_authenticated:
+            return self.none()
+        cliente_id = cliente_de(user)
+        if cliente_id is not None:
+            return self.filter(proyecto__cliente_id=cliente_id)
+        if user.is_staff:
+            return self
+        # Subconsulta en vez de join: así cada rama del OR usa su propio índice de incidencia
+        proyectos = self.model._meta.get_field('proyecto').related_model.objects.filter(responsable=user)
+        return self.filter(Q(proyecto__in=proyectos.values('pk')) | Q(asignado_a=user) | Q(reportado_por=user))
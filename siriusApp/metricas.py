@@ -0,0 +1,316 @@
+"""Métricas de la app en formato de texto de Prometheus (vista /metrics).
+
+Contadores e histogramas de límites fijos, con etiquetas. Cada hilo suma en
+su propio fragmento (un dict por hilo), así registrar una observación no toma
+ningún lock; al exponer se suman los fragmentos. Para sumar los workers de
+gunicorn cada proceso vuelca su total a METRICAS_DIR/<pid>-<id>.json como
+mucho cada INTERVALO segundos (y las exportaciones al terminar), y /metrics
+suma los archivos de todos los procesos con el estado en memoria del que
+responde. El id aleatorio evita que un worker nuevo que repite el pid de uno
+muerto pise su archivo.
+
+Cada proceso que vuelca mantiene un flock sobre <pid>-<id>.lock mientras vive.
+Al exponer, los archivos cuyo lock ya nadie tiene (procesos terminados) se
+suman a acumulado.json y se borran: los contadores no retroceden y el
+directorio no crece con cada reinicio. Sin fcntl (Windows) no se consolida.
+Borrar el directorio en cada despliegue reinicia las series.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+INTERVALO = 5
+ACUMULADO = 'acumulado'
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LIMITES_BYTES = tuple(1024 * 4 ** n for n in range(11))  # 1 KiB .. 1 GiB
+
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def directorio():
+    return getattr(settings, 'METRICAS_DIR', os.path.join(tempfile.gettempdir(), 'sirius_metricas'))
+
+
+def _bloquear(ruta, esperar=False):
+    """Abre `ruta` con un flock exclusivo; None si lo tiene otro proceso"""
+    archivo = open(ruta, 'a')
+    if fcntl is not None:
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB))
+        except BlockingIOError:
+            archivo.close()
+            return None
+    return archivo
+
+
+@contextmanager
+def _exclusivo(carpeta):
+    """Un solo proceso a la vez consolida y lee los volcados"""
+    archivo = _bloquear(os.path.join(carpeta, f'{ACUMULADO}.lock'), esperar=True)
+    try:
+        yield
+    finally:
+        archivo.close()
+
+
+def _leer(ruta):
+    try:
+        with open(ruta) as archivo:
+            return json.load(archivo)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir(carpeta, nombre_archivo, total):
+    """Vuelca {nombre: {etiquetas: valores}} a JSON con reemplazo atómico"""
+    datos = {
+        nombre: [[list(etiquetas), valores] for etiquetas, valores in series.items()]
+        for nombre, series in total.items()
+    }
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, prefix='.volcado-')
+    with os.fdopen(descriptor, 'w') as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, os.path.join(carpeta, nombre_archivo))
+
+
+def _acumular(total, datos):
+    """Suma a `total` lo leído de un volcado"""
+    for nombre, series in datos.items():
+        por_serie = total.setdefault(nombre, {})
+        for etiquetas, valores in series:
+            etiquetas = tuple(etiquetas)
+            por_serie[etiquetas] = _sumar(por_serie[etiquetas], valores) if etiquetas in por_serie else valores
+
+
+class Registro:
+    """Métricas declaradas y los fragmentos por hilo de este proceso"""
+
+    def __init__(self):
+        self.metricas = {}
+        self._local = threading.local()
+        self._fragmentos = []
+        self._alta = threading.Lock()
+        self._volcando = threading.Lock()
+        self._proximo_volcado = time.monotonic() + INTERVALO
+        self._identificar()
+
+    def _identificar(self):
+        # El pid solo no basta: en contenedores los workers nuevos repiten los de los muertos
+        self.proceso = f'{os.getpid()}-{uuid.uuid4().hex[:12]}'
+        self._candado = None
+
+    def fragmento(self):
+        try:
+            return self._local.valores
+        except AttributeError:
+            valores = self._local.valores = {}
+            with self._alta:
+                self._fragmentos.append(valores)
+            return valores
+
+    def reiniciar(self):
+        """Tras un fork: el hijo empieza de cero (lo del padre lo informa el padre)"""
+        self._local = threading.local()
+        self._fragmentos = []
+        self._alta = threading.Lock()
+        self._volcando = threading.Lock()
+        self._proximo_volcado = time.monotonic() + INTERVALO
+        self._identificar()
+
+    def tal_vez_volcar(self):
+        if time.monotonic() >= self._proximo_volcado:
+            self.volcar()
+
+    def local(self):
+        """{nombre: {etiquetas: valores}} sumando los fragmentos de todos los hilos"""
+        total = {}
+        for fragmento in list(self._fragmentos):
+            for (nombre, etiquetas), valores in fragmento.copy().items():
+                por_serie = total.setdefault(nombre, {})
+                if etiquetas in por_serie:
+                    por_serie[etiquetas] = _sumar(por_serie[etiquetas], valores)
+                else:
+                    por_serie[etiquetas] = valores if isinstance(valores, float) else list(valores)
+        return total
+
+    def volcar(self):
+        """Escribe el total de este proceso en METRICAS_DIR/<pid>-<id>.json (reemplazo atómico)"""
+        if not self._volcando.acquire(blocking=False):
+            return
+        try:
+            self._proximo_volcado = time.monotonic() + INTERVALO
+            carpeta = directorio()
+            os.makedirs(carpeta, exist_ok=True)
+            candado = os.path.join(carpeta, f'{self.proceso}.lock')
+            if self._candado is None or self._candado.name != candado:
+                # Se mantiene abierto (y bloqueado) mientras viva el proceso
+                self._candado = _bloquear(candado)
+            _escribir(carpeta, f'{self.proceso}.json', self.local())
+        finally:
+            self._volcando.release()
+
+    def consolidar(self, carpeta):
+        """Suma a acumulado.json los volcados de procesos terminados y los borra"""
+        if fcntl is None:
+            return
+        terminados = []
+        for base in {os.path.splitext(n)[0] for n in os.listdir(carpeta) if n.endswith(('.json', '.lock'))}:
+            if base in (ACUMULADO, self.proceso):
+                continue
+            candado = os.path.join(carpeta, f'{base}.lock')
+            if os.path.exists(candado):
+                archivo = _bloquear(candado)
+                if archivo is None:
+                    continue  # el proceso sigue vivo
+                archivo.close()
+            terminados.append(base)
+        if not terminados:
+            return
+        total = {}
+        for base in [ACUMULADO] + terminados:
+            datos = _leer(os.path.join(carpeta, f'{base}.json'))
+            if datos:
+                _acumular(total, datos)
+        _escribir(carpeta, f'{ACUMULADO}.json', total)
+        for base in terminados:
+            for extension in ('.json', '.lock'):
+                try:
+                    os.remove(os.path.join(carpeta, base + extension))
+                except FileNotFoundError:
+                    pass
+
+    def recolectar(self):
+        """Total de todos los procesos: los volcados en disco más este proceso en vivo"""
+        total = self.local()
+        carpeta = directorio()
+        if not os.path.isdir(carpeta):
+            return total
+        propio = f'{self.proceso}.json'
+        with _exclusivo(carpeta):
+            self.consolidar(carpeta)
+            for nombre_archivo in os.listdir(carpeta):
+                if nombre_archivo == propio or not nombre_archivo.endswith('.json'):
+                    continue
+                datos = _leer(os.path.join(carpeta, nombre_archivo))
+                if datos is not None:
+                    _acumular(total, datos)
+        return total
+
+    def exponer(self):
+        """Texto de Prometheus con todas las métricas declaradas"""
+        total = self.recolectar()
+        lineas = []
+        for nombre, metrica in self.metricas.items():
+            lineas.append(f'# HELP {nombre} {metrica.ayuda}')
+            lineas.append(f'# TYPE {nombre} {metrica.tipo}')
+            for etiquetas, valores in sorted(total.get(nombre, {}).items()):
+                lineas.extend(metrica.lineas(etiquetas, valores))
+        return '\n'.join(lineas) + '\n'
+
+
+def _sumar(a, b):
+    if isinstance(a, list):
+        return [x + y for x, y in zip(a, b)]
+    return a + b
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _etiquetas(nombres, valores, extra=''):
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+registro = Registro()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=registro.reiniciar)
+
+
+class Contador:
+    tipo = 'counter'
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        registro.metricas[nombre] = self
+
+    def inc(self, *etiquetas, cantidad=1):
+        fragmento = registro.fragmento()
+        clave = (self.nombre, etiquetas)
+        fragmento[clave] = fragmento.get(clave, 0.0) + cantidad
+        registro.tal_vez_volcar()
+
+    def lineas(self, etiquetas, valor):
+        yield f'{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {_numero(valor)}'
+
+
+class Histograma:
+    """Cuentas por tramo (no acumuladas) más la suma y el total de observaciones"""
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_SEGUNDOS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(limites)
+        registro.metricas[nombre] = self
+
+    def observar(self, valor, *etiquetas):
+        fragmento = registro.fragmento()
+        clave = (self.nombre, etiquetas)
+        valores = fragmento.get(clave)
+        if valores is None:
+            # Un tramo por límite, uno para +Inf, la suma y el total
+            valores = fragmento[clave] = [0] * (len(self.limites) + 1) + [0.0, 0]
+        valores[bisect_left(self.limites, valor)] += 1
+        valores[-2] += valor
+        valores[-1] += 1
+        registro.tal_vez_volcar()
+
+    def lineas(self, etiquetas, valores):
+        base = _etiquetas(self.etiquetas, etiquetas)
+        acumulado = 0
+        for limite, cuenta in zip(self.limites + (float('inf'),), valores):
+            acumulado += cuenta
+            le = '+Inf' if limite == float('inf') else _numero(limite)
+            etiquetas_tramo = _etiquetas(self.etiquetas, etiquetas, f'le="{le}"')
+            yield f'{self.nombre}_bucket{etiquetas_tramo} {acumulado}'
+        yield f'{self.nombre}_sum{base} {_numero(valores[-2])}'
+        yield f'{self.nombre}_count{base} {_numero(valores[-1])}'
+
+
+PETICIONES = Contador('sirius_peticiones_total', 'Peticiones atendidas por nombre de URL', ['url', 'metodo', 'status'])
+DURACION = Histograma('sirius_peticion_segundos', 'Duración de las peticiones por nombre de URL', ['url'])
+EXPORTACION_SEGUNDOS = Histograma(
+    'sirius_exportacion_segundos', 'Duración de las exportaciones de proyectos', ['formato'],
+    limites=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800),
+)
+EXPORTACION_BYTES = Histograma(
+    'sirius_exportacion_bytes', 'Tamaño de los archivos exportados', ['formato'], limites=LIMITES_BYTES,
+)
+
+
+def observar_peticion(nombre_url, metodo, status, segundos):
+    PETICIONES.inc(nombre_url, metodo, str(status))
+    DURACION.observar(segundos, nombre_url)
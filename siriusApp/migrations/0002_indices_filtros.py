@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['estado', 'prioridad', '-fecha_reporte'], name='incidencia_estado_prio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['proyecto', 'estado', '-fecha_reporte'], name='incidencia_proy_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['proyecto', '-fecha_reporte'], name='incidencia_proy_reporte_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['tipo_incidencia', '-fecha_reporte'], name='incidencia_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['-fecha_reporte'], name='incidencia_reporte_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['responsable', 'estado', '-fecha_creacion'], name='proyecto_resp_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['responsable', '-fecha_creacion'], name='proyecto_resp_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['cliente', 'estado', '-fecha_creacion'], name='proyecto_cli_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['cliente', '-fecha_creacion'], name='proyecto_cli_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['estado', 'prioridad', '-fecha_creacion'], name='proyecto_estado_prio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['-fecha_creacion'], name='proyecto_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['fecha_inicio'], name='proyecto_inicio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['fecha_fin_estimada'], name='proyecto_fin_est_idx'),
+        ),
+    ]
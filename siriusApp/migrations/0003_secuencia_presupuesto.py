@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:04
+
+from django.db import migrations, models
+
+
+def inicializar_secuencias(apps, schema_editor):
+    """Parte cada año desde el mayor número ya emitido (formato PRES-AAAA-NNNN)"""
+    Presupuesto = apps.get_model('siriusApp', 'Presupuesto')
+    SecuenciaPresupuesto = apps.get_model('siriusApp', 'SecuenciaPresupuesto')
+    ultimos = {}
+    for numero in Presupuesto.objects.values_list('numero_presupuesto', flat=True).iterator():
+        partes = numero.split('-')
+        if len(partes) == 3 and partes[1].isdigit() and partes[2].isdigit():
+            anio, correlativo = int(partes[1]), int(partes[2])
+            ultimos[anio] = max(ultimos.get(anio, 0), correlativo)
+    SecuenciaPresupuesto.objects.bulk_create(
+        SecuenciaPresupuesto(anio=anio, ultimo=ultimo) for anio, ultimo in ultimos.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0002_indices_filtros'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaPresupuesto',
+            fields=[
+                ('anio', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('ultimo', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(inicializar_secuencias, migrations.RunPython.noop),
+    ]
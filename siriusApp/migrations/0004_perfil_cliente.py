@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def vincular_por_email(apps, schema_editor):
+    """Conserva el comportamiento anterior: el cliente con el mismo email del usuario"""
+    Cliente = apps.get_model('siriusApp', 'Cliente')
+    PerfilUsuario = apps.get_model('siriusApp', 'PerfilUsuario')
+    perfiles = PerfilUsuario.objects.filter(tipo_usuario='cliente', cliente__isnull=True).select_related('user')
+    for perfil in perfiles:
+        if not perfil.user.email:
+            continue
+        cliente = Cliente.objects.filter(email__iexact=perfil.user.email).order_by('id').first()
+        if cliente:
+            perfil.cliente = cliente
+            perfil.save(update_fields=['cliente'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0003_secuencia_presupuesto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='perfilusuario',
+            name='cliente',
+            field=models.ForeignKey(blank=True, help_text='Cliente cuyos proyectos y presupuestos ve este usuario', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='usuarios', to='siriusApp.cliente'),
+        ),
+        migrations.RunPython(vincular_por_email, migrations.RunPython.noop),
+    ]
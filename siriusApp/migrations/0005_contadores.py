@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:08
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_contadores(apps, schema_editor):
+    """Carga inicial con los totales actuales (ver siriusApp.contadores)"""
+    Contador = apps.get_model('siriusApp', 'Contador')
+    dimensiones = {'proyecto': 'estado', 'cliente': 'activo', 'incidencia': 'estado'}
+    filas = []
+    for nombre, dimension in dimensiones.items():
+        modelo = apps.get_model('siriusApp', nombre)
+        filas.append(Contador(modelo=nombre, dimension='', valor='', total=modelo.objects.count()))
+        for fila in modelo.objects.values(dimension).annotate(total=Count('pk')).order_by():
+            filas.append(Contador(modelo=nombre, dimension=dimension, valor=str(fila[dimension]), total=fila['total']))
+    Contador.objects.bulk_create(filas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0004_perfil_cliente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modelo', models.CharField(max_length=50)),
+                ('dimension', models.CharField(blank=True, max_length=50)),
+                ('valor', models.CharField(blank=True, max_length=50)),
+                ('total', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('modelo', 'dimension', 'valor'), name='contador_clave_unica')],
+            },
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
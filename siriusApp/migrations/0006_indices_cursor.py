@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0005_contadores'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='incidencia',
+            name='incidencia_proy_reporte_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='incidencia',
+            name='incidencia_reporte_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='proyecto',
+            name='proyecto_resp_creacion_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='proyecto',
+            name='proyecto_cli_creacion_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='proyecto',
+            name='proyecto_creacion_idx',
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['activo', 'nombre', 'id'], name='cliente_activo_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['proyecto', '-fecha_reporte', '-id'], name='incidencia_proy_reporte_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['-fecha_reporte', '-id'], name='incidencia_reporte_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presupuesto',
+            index=models.Index(fields=['cliente', '-fecha_creacion', '-id'], name='presupuesto_cli_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='presupuesto',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='presupuesto_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['responsable', '-fecha_creacion', '-id'], name='proyecto_resp_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['cliente', '-fecha_creacion', '-id'], name='proyecto_cli_creacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='proyecto_creacion_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:19
+
+from django.db import migrations, models
+
+TABLA_FTS = 'siriusApp_indicebusqueda_fts'
+TRIGGERS = ['indice_busqueda_ai', 'indice_busqueda_ad', 'indice_busqueda_au']
+
+
+def crear_indice_texto(apps, schema_editor):
+    """Índice de texto completo nativo del motor sobre (titulo, contenido)"""
+    tabla = apps.get_model('siriusApp', 'IndiceBusqueda')._meta.db_table
+    q = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            f'ALTER TABLE {q(tabla)} ADD FULLTEXT INDEX indice_busqueda_texto (titulo, contenido)'
+        )
+    elif vendor == 'sqlite':
+        # Tabla FTS5 de contenido externo: guarda solo el índice y lee el texto de la tabla base
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {q(TABLA_FTS)} USING fts5(titulo, contenido, "
+            f"content='{tabla}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        insertar = f'INSERT INTO {q(TABLA_FTS)}(rowid, titulo, contenido) VALUES (new.id, new.titulo, new.contenido);'
+        borrar = (
+            f"INSERT INTO {q(TABLA_FTS)}({q(TABLA_FTS)}, rowid, titulo, contenido) "
+            f"VALUES ('delete', old.id, old.titulo, old.contenido);"
+        )
+        schema_editor.execute(f'CREATE TRIGGER indice_busqueda_ai AFTER INSERT ON {q(tabla)} BEGIN {insertar} END')
+        schema_editor.execute(f'CREATE TRIGGER indice_busqueda_ad AFTER DELETE ON {q(tabla)} BEGIN {borrar} END')
+        schema_editor.execute(
+            f'CREATE TRIGGER indice_busqueda_au AFTER UPDATE ON {q(tabla)} BEGIN {borrar} {insertar} END'
+        )
+
+
+def quitar_indice_texto(apps, schema_editor):
+    tabla = apps.get_model('siriusApp', 'IndiceBusqueda')._meta.db_table
+    q = schema_editor.quote_name
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(f'ALTER TABLE {q(tabla)} DROP INDEX indice_busqueda_texto')
+    elif vendor == 'sqlite':
+        for trigger in TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {q(TABLA_FTS)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0007_trabajos_exportacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusqueda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('proyecto', 'Proyecto'), ('incidencia', 'Incidencia'), ('cliente', 'Cliente'), ('presupuesto', 'Presupuesto')], max_length=15)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('titulo', models.CharField(max_length=255)),
+                ('contenido', models.TextField(blank=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='indice_busqueda_objeto_unico')],
+            },
+        ),
+        migrations.RunPython(crear_indice_texto, quitar_indice_texto),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0008_indice_busqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['nombre', 'id'], name='proyecto_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicio',
+            index=models.Index(fields=['activo', 'nombre', 'id'], name='servicio_activo_nombre_idx'),
+        ),
+    ]
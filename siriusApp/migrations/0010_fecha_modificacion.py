@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:02
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def poblar_fecha_modificacion(apps, schema_editor):
+    """Las filas existentes parten con su fecha de alta (o de resolución) en vez de la del migrate"""
+    altas = {
+        'cliente': 'fecha_registro',
+        'servicio': 'fecha_creacion',
+        'presupuesto': 'fecha_creacion',
+        'incidencia': 'fecha_reporte',
+    }
+    for nombre, campo in altas.items():
+        apps.get_model('siriusApp', nombre).objects.update(fecha_modificacion=F(campo))
+    Incidencia = apps.get_model('siriusApp', 'incidencia')
+    Incidencia.objects.filter(fecha_resolucion__isnull=False).update(fecha_modificacion=F('fecha_resolucion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0009_indices_autocompletar'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='servicio',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='presupuesto',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='incidencia',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(poblar_fecha_modificacion, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='presupuesto',
+            index=models.Index(fields=['proyecto', 'fecha_modificacion'], name='presupuesto_proy_modif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['proyecto', 'fecha_modificacion'], name='incidencia_proy_modif_idx'),
+        ),
+    ]
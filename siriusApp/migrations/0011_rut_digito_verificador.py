@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:37
+
+import django.core.validators
+import siriusApp.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0010_fecha_modificacion'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='rut',
+            field=models.CharField(max_length=12, unique=True, validators=[django.core.validators.RegexValidator('^\\d{7,8}-[0-9kK]$', 'Formato: 12345678-9'), siriusApp.validators.validar_rut]),
+        ),
+    ]
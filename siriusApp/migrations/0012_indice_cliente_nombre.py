@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0011_rut_digito_verificador'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nombre', 'id'], name='cliente_nombre_idx'),
+        ),
+    ]
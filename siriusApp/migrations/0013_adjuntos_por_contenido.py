@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 10:56
+
+import siriusApp.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0012_indice_cliente_nombre'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='incidencia',
+            name='archivo_adjunto',
+            field=models.FileField(blank=True, help_text='Subir archivos relacionados (fotos, documentos, etc.)', max_length=255, null=True, storage=siriusApp.almacenamiento.AlmacenamientoDeduplicado(), upload_to='adjuntos/'),
+        ),
+        migrations.CreateModel(
+            name='Adjunto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('tamano', models.BigIntegerField(default=0)),
+                ('referencias', models.IntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['referencias', 'fecha_modificacion'], name='adjunto_huerfano_idx')],
+            },
+        ),
+    ]
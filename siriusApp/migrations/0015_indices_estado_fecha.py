@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0014_sesiones_subida'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incidencia',
+            index=models.Index(fields=['estado', '-fecha_reporte', '-id'], name='incidencia_estado_reporte_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proyecto',
+            index=models.Index(fields=['estado', '-fecha_creacion', '-id'], name='proyecto_estado_creacion_idx'),
+        ),
+    ]
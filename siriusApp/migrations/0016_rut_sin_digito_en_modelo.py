@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:31
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0015_indices_estado_fecha'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cliente',
+            name='rut',
+            field=models.CharField(max_length=12, unique=True, validators=[django.core.validators.RegexValidator('^\\d{7,8}-[0-9kK]$', 'Formato: 12345678-9')]),
+        ),
+    ]
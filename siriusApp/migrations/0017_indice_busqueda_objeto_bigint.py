@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 11:34
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+indice_busqueda = import_module('siriusApp.migrations.0008_indice_busqueda')
+
+
+def quitar_fts_sqlite(apps, schema_editor):
+    """En SQLite AlterField rehace la tabla y se pierden los triggers de la FTS5: se quitan antes"""
+    if schema_editor.connection.vendor == 'sqlite':
+        indice_busqueda.quitar_indice_texto(apps, schema_editor)
+
+
+def crear_fts_sqlite(apps, schema_editor):
+    """Vuelve a crear la FTS5 con sus triggers y la llena con lo que ya estaba indexado"""
+    if schema_editor.connection.vendor == 'sqlite':
+        indice_busqueda.crear_indice_texto(apps, schema_editor)
+        fts = schema_editor.quote_name(indice_busqueda.TABLA_FTS)
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0016_rut_sin_digito_en_modelo'),
+    ]
+
+    operations = [
+        migrations.RunPython(quitar_fts_sqlite, crear_fts_sqlite),
+        migrations.AlterField(
+            model_name='indicebusqueda',
+            name='objeto_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+        migrations.RunPython(crear_fts_sqlite, quitar_fts_sqlite),
+    ]
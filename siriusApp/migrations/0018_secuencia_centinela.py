@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 14:02
+
+from django.db import migrations
+
+
+CENTINELA = 0
+
+
+def crear_centinela(apps, schema_editor):
+    """Fila que serializa la creación de la secuencia de cada año nuevo"""
+    SecuenciaPresupuesto = apps.get_model('siriusApp', 'SecuenciaPresupuesto')
+    SecuenciaPresupuesto.objects.get_or_create(anio=CENTINELA)
+
+
+def borrar_centinela(apps, schema_editor):
+    SecuenciaPresupuesto = apps.get_model('siriusApp', 'SecuenciaPresupuesto')
+    SecuenciaPresupuesto.objects.filter(anio=CENTINELA).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siriusApp', '0017_indice_busqueda_objeto_bigint'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_centinela, borrar_centinela),
+    ]
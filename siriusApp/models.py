@@ -1,8 +1,24 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
+from django.urls import reverse
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
+from django.utils import timezone
+
+from .almacenamiento import adjuntos
+from .managers import ClienteQuerySet, ProyectoQuerySet, PresupuestoQuerySet, IncidenciaQuerySet
 
-class Cliente(models.Model):
+class ValoresOriginalesMixin:
+    """Recuerda los valores leídos de la BD para saber qué cambió al guardar"""
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._valores_originales = dict(zip(field_names, values))
+        return instance
+
+class Cliente(ValoresOriginalesMixin, models.Model):
     TIPO_CLIENTE_CHOICES = [
         ('empresa', 'Empresa'),
         ('particular', 'Particular'),
@@ -20,13 +36,20 @@ class Cliente(models.Model):
     direccion = models.TextField()
     tipo_cliente = models.CharField(max_length=20, choices=TIPO_CLIENTE_CHOICES)
     fecha_registro = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
     activo = models.BooleanField(default=True)
     
+    objects = ClienteQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.nombre} - {self.rut}"
     
     class Meta:
         ordering = ['nombre']
+        indexes = [
+            models.Index(fields=['activo', 'nombre', 'id'], name='cliente_activo_nombre_idx'),
+            models.Index(fields=['nombre', 'id'], name='cliente_nombre_idx'),
+        ]
 
 class Servicio(models.Model):
     TIPO_SERVICIO_CHOICES = [
@@ -42,14 +65,19 @@ class Servicio(models.Model):
     precio_base = models.DecimalField(max_digits=10, decimal_places=2)
     activo = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return f"{self.nombre} ({self.get_tipo_servicio_display()})"
     
     class Meta:
         ordering = ['tipo_servicio', 'nombre']
+        indexes = [
+            # Autocompletado por prefijo de nombre
+            models.Index(fields=['activo', 'nombre', 'id'], name='servicio_activo_nombre_idx'),
+        ]
 
-class Proyecto(models.Model):
+class Proyecto(ValoresOriginalesMixin, models.Model):
     ESTADO_CHOICES = [
         ('cotizado', 'Cotizado'),
         ('aprobado', 'Aprobado'),
@@ -82,11 +110,27 @@ class Proyecto(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
     
+    objects = ProyectoQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.nombre} - {self.cliente.nombre}"
     
     class Meta:
         ordering = ['-fecha_creacion']
+        # Índices alineados con los filtros de proyecto_lista / ProyectoFiltroForm
+        indexes = [
+            models.Index(fields=['responsable', 'estado', '-fecha_creacion'], name='proyecto_resp_estado_idx'),
+            models.Index(fields=['responsable', '-fecha_creacion', '-id'], name='proyecto_resp_creacion_idx'),
+            models.Index(fields=['cliente', 'estado', '-fecha_creacion'], name='proyecto_cli_estado_idx'),
+            models.Index(fields=['cliente', '-fecha_creacion', '-id'], name='proyecto_cli_creacion_idx'),
+            models.Index(fields=['estado', 'prioridad', '-fecha_creacion'], name='proyecto_estado_prio_idx'),
+            models.Index(fields=['estado', '-fecha_creacion', '-id'], name='proyecto_estado_creacion_idx'),
+            models.Index(fields=['-fecha_creacion', '-id'], name='proyecto_creacion_idx'),
+            # Autocompletado por prefijo de nombre
+            models.Index(fields=['nombre', 'id'], name='proyecto_nombre_idx'),
+            models.Index(fields=['fecha_inicio'], name='proyecto_inicio_idx'),
+            models.Index(fields=['fecha_fin_estimada'], name='proyecto_fin_est_idx'),
+        ]
 
 class Presupuesto(models.Model):
     ESTADO_PRESUPUESTO_CHOICES = [
@@ -107,22 +151,85 @@ class Presupuesto(models.Model):
     observaciones = models.TextField(blank=True)
     creado_por = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+    
+    objects = PresupuestoQuerySet.as_manager()
     
     def __str__(self):
         return f"Presupuesto {self.numero_presupuesto} - {self.cliente.nombre}"
     
     def save(self, *args, **kwargs):
-        if not self.numero_presupuesto:
-            from datetime import datetime
-            year = datetime.now().year
-            count = Presupuesto.objects.filter(fecha_creacion__year=year).count() + 1
-            self.numero_presupuesto = f"PRES-{year}-{count:04d}"
-        super().save(*args, **kwargs)
+        if self.numero_presupuesto:
+            return super().save(*args, **kwargs)
+        
+        # El número se reserva en la misma transacción que el INSERT: si éste
+        # falla, el contador vuelve atrás y no quedan huecos ni duplicados
+        year = timezone.localdate().year
+        try:
+            with transaction.atomic():
+                numero = SecuenciaPresupuesto.siguiente(year)
+                self.numero_presupuesto = f"PRES-{year}-{numero:04d}"
+                super().save(*args, **kwargs)
+        except Exception:
+            self.numero_presupuesto = ''
+            raise
     
     class Meta:
         ordering = ['-fecha_creacion']
+        # Orden de la paginación por cursor, con y sin el filtro por cliente
+        indexes = [
+            models.Index(fields=['cliente', '-fecha_creacion', '-id'], name='presupuesto_cli_creacion_idx'),
+            models.Index(fields=['-fecha_creacion', '-id'], name='presupuesto_creacion_idx'),
+            # Validadores de proyecto_detalle: MAX(fecha_modificacion) por proyecto
+            models.Index(fields=['proyecto', 'fecha_modificacion'], name='presupuesto_proy_modif_idx'),
+        ]
+
+class SecuenciaPresupuesto(models.Model):
+    """Último correlativo de presupuesto asignado en cada año"""
+    # Fila sin año (la crea la migración 0018) que serializa la creación de la
+    # fila de cada año nuevo
+    CENTINELA = 0
+    
+    anio = models.PositiveIntegerField(primary_key=True)
+    ultimo = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.anio}: {self.ultimo}"
+    
+    @classmethod
+    def siguiente(cls, anio):
+        """Incrementa y devuelve el correlativo del año bajo bloqueo de fila.
+        
+        Debe llamarse dentro de una transacción; el bloqueo dura hasta el commit.
+        """
+        return cls.reservar(anio, 1)
+    
+    @classmethod
+    def reservar(cls, anio, cantidad):
+        """Reserva `cantidad` correlativos seguidos y devuelve el primero (cargas masivas).
+        
+        Mismo bloqueo que siguiente(): llamar dentro de una transacción.
+        """
+        # Con la fila ya creada basta el bloqueo de fila. Un SELECT ... FOR UPDATE
+        # sobre una fila inexistente toma en InnoDB un gap lock compatible con el
+        # de otra transacción, y los dos INSERT posteriores se bloquean entre sí
+        # (deadlock): por eso se comprueba primero con una lectura sin bloqueo
+        if cls.objects.filter(anio=anio).exists():
+            secuencia = cls.objects.select_for_update().get(anio=anio)
+        else:
+            # Primer presupuesto del año: quienes crean la fila se turnan en la
+            # centinela y la relectura bajo bloqueo ve la que haya creado otro.
+            # El get_or_create sólo crea la centinela si se vació la tabla
+            cls.objects.select_for_update().get_or_create(anio=cls.CENTINELA)
+            secuencia = cls.objects.select_for_update().filter(anio=anio).first()
+            if secuencia is None:
+                secuencia = cls.objects.create(anio=anio)
+        primero = secuencia.ultimo + 1
+        secuencia.ultimo += cantidad
+        secuencia.save(update_fields=['ultimo'])
+        return primero
 
-class Incidencia(models.Model):
+class Incidencia(ValoresOriginalesMixin, models.Model):
     TIPO_INCIDENCIA_CHOICES = [
         ('tecnica', 'Técnica'),
         ('administrativa', 'Administrativa'),
@@ -155,20 +262,36 @@ class Incidencia(models.Model):
     asignado_a = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='incidencias_asignadas')
     fecha_reporte = models.DateTimeField(auto_now_add=True)
     fecha_resolucion = models.DateTimeField(null=True, blank=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
     solucion = models.TextField(blank=True)
     
+    # Guardado por contenido: el mismo archivo en varias incidencias ocupa uno (ver Adjunto)
     archivo_adjunto = models.FileField(
-        upload_to='incidencias/%Y/%m/',
+        upload_to='adjuntos/',
+        storage=adjuntos,
+        max_length=255,
         null=True,
         blank=True,
         help_text='Subir archivos relacionados (fotos, documentos, etc.)'
     )
     
+    objects = IncidenciaQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.titulo} - {self.proyecto.nombre}"
     
     class Meta:
         ordering = ['-fecha_reporte']
+        # Índices alineados con los filtros de incidencia_lista / IncidenciaFiltroForm
+        indexes = [
+            models.Index(fields=['estado', 'prioridad', '-fecha_reporte'], name='incidencia_estado_prio_idx'),
+            models.Index(fields=['estado', '-fecha_reporte', '-id'], name='incidencia_estado_reporte_idx'),
+            models.Index(fields=['proyecto', 'estado', '-fecha_reporte'], name='incidencia_proy_estado_idx'),
+            models.Index(fields=['proyecto', '-fecha_reporte', '-id'], name='incidencia_proy_reporte_idx'),
+            models.Index(fields=['tipo_incidencia', '-fecha_reporte'], name='incidencia_tipo_idx'),
+            models.Index(fields=['-fecha_reporte', '-id'], name='incidencia_reporte_idx'),
+            models.Index(fields=['proyecto', 'fecha_modificacion'], name='incidencia_proy_modif_idx'),
+        ]
 
 class PerfilUsuario(models.Model):
     TIPO_USUARIO_CHOICES = [
@@ -180,6 +303,14 @@ class PerfilUsuario(models.Model):
     
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     tipo_usuario = models.CharField(max_length=20, choices=TIPO_USUARIO_CHOICES, default='cliente')
+    cliente = models.ForeignKey(
+        Cliente,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='usuarios',
+        help_text='Cliente cuyos proyectos y presupuestos ve este usuario'
+    )
     telefono = models.CharField(max_length=15, blank=True)
     empresa = models.CharField(max_length=200, blank=True)
     rut = models.CharField(max_length=12, blank=True)
@@ -189,4 +320,135 @@ class PerfilUsuario(models.Model):
     activo = models.BooleanField(default=True)
     
     def __str__(self):
-        return f"{self.user.username} ({self.get_tipo_usuario_display()})"
\ No newline at end of file
+        return f"{self.user.username} ({self.get_tipo_usuario_display()})"
+
+class Contador(models.Model):
+    """Total precalculado por (modelo, dimensión, valor), mantenido por señales.
+    
+    La fila con dimensión y valor vacíos guarda el total del modelo.
+    """
+    modelo = models.CharField(max_length=50)
+    dimension = models.CharField(max_length=50, blank=True)
+    valor = models.CharField(max_length=50, blank=True)
+    total = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.modelo}.{self.dimension}={self.valor}: {self.total}"
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['modelo', 'dimension', 'valor'], name='contador_clave_unica'),
+        ]
+
+class TrabajoExportacion(models.Model):
+    """Exportación pendiente o terminada, procesada fuera del ciclo de la petición"""
+    FORMATO_CHOICES = [
+        ('excel', 'Excel'),
+        ('pdf', 'PDF'),
+    ]
+    
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En Proceso'),
+        ('completado', 'Completado'),
+        ('error', 'Error'),
+    ]
+    
+    formato = models.CharField(max_length=10, choices=FORMATO_CHOICES)
+    parametros = models.JSONField(default=dict, blank=True, help_text='Filtros de ProyectoFiltroForm')
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exportaciones')
+    estado = models.CharField(max_length=15, choices=ESTADO_CHOICES, default='pendiente')
+    progreso = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    archivo = models.FileField(upload_to='exportaciones/%Y/%m/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.get_formato_display()} #{self.pk} ({self.get_estado_display()})"
+    
+    class Meta:
+        ordering = ['-fecha_creacion']
+        indexes = [
+            # El worker busca los pendientes más antiguos
+            models.Index(fields=['estado', 'fecha_creacion'], name='exportacion_estado_idx'),
+            models.Index(fields=['usuario', '-fecha_creacion'], name='exportacion_usuario_idx'),
+        ]
+
+class IndiceBusqueda(models.Model):
+    """Texto indexable de proyectos, incidencias, clientes y presupuestos.
+    
+    Sobre (titulo, contenido) hay un índice FULLTEXT en MySQL o una tabla FTS5
+    sincronizada por triggers en SQLite (migración 0008). Lo mantienen las
+    señales de busqueda.py.
+    """
+    TIPO_CHOICES = [
+        ('proyecto', 'Proyecto'),
+        ('incidencia', 'Incidencia'),
+        ('cliente', 'Cliente'),
+        ('presupuesto', 'Presupuesto'),
+    ]
+    
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES)
+    objeto_id = models.PositiveBigIntegerField()
+    titulo = models.CharField(max_length=255)
+    contenido = models.TextField(blank=True)
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()}: {self.titulo}"
+    
+    def get_absolute_url(self):
+        vistas = {
+            'proyecto': 'proyecto_detalle',
+            'incidencia': 'incidencia_resolver',
+            'cliente': 'cliente_editar',
+            'presupuesto': 'presupuesto_detalle',
+        }
+        return reverse(vistas[self.tipo], args=[self.objeto_id])
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['tipo', 'objeto_id'], name='indice_busqueda_objeto_unico'),
+        ]
+
+class Adjunto(models.Model):
+    """Archivo guardado por contenido (almacenamiento.py) y cuántas incidencias lo usan.
+    
+    Lo mantienen las señales de adjuntos.py; limpiar_adjuntos borra los que
+    quedan sin referencias.
+    """
+    nombre = models.CharField(max_length=255, unique=True)
+    tamano = models.BigIntegerField(default=0)
+    referencias = models.IntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias})"
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['referencias', 'fecha_modificacion'], name='adjunto_huerfano_idx'),
+        ]
+
+class SesionSubida(models.Model):
+    """Subida reanudable en curso del adjunto de una incidencia (ver subidas.py)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='subidas')
+    incidencia = models.ForeignKey(Incidencia, on_delete=models.CASCADE, related_name='subidas')
+    nombre = models.CharField(max_length=255)
+    tamano = models.BigIntegerField()
+    recibido = models.BigIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.nombre} ({self.recibido}/{self.tamano})"
+    
+    class Meta:
+        indexes = [
+            # limpiar_subidas busca las sesiones sin actividad
+            models.Index(fields=['fecha_modificacion'], name='subida_modif_idx'),
+        ]
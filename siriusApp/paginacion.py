@@ -0,0 +1,230 @@
+"""Paginación por cursor (keyset / seek) para las listas grandes.
+
+En lugar de OFFSET, cada página continúa desde la última fila vista usando el
+índice del orden, así la página 5.000 cuesta lo mismo que la primera. El cursor
+es opaco para el cliente: base64 de los valores de orden de la fila límite.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.http import QueryDict
+
+MODO_CURSOR = 'cursor'
+
+# Por debajo de este total el COUNT(*) exacto es barato y se prefiere
+UMBRAL_ESTIMADO = 10000
+
+
+def _valor(fila, campo):
+    return fila[campo] if isinstance(fila, dict) else getattr(fila, campo)
+
+
+class PaginaCursor:
+    """Página de resultados con la misma interfaz básica que django.core.paginator.Page"""
+    es_cursor = True
+
+    def __init__(self, object_list, paginador, cursor_siguiente=None, cursor_anterior=None, parametros=None):
+        self.object_list = object_list
+        self.paginador = paginador
+        self.cursor_siguiente = cursor_siguiente
+        self.cursor_anterior = cursor_anterior
+        self.parametros = parametros
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    def __repr__(self):
+        return f'<PaginaCursor {len(self)} filas>'
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def total(self):
+        """Total de filas, solo si se pidió contar (evita el COUNT(*) por defecto)"""
+        return self.paginador.count if self.paginador.contar else None
+
+    def _url(self, cursor):
+        """Query string con los filtros actuales y el nuevo cursor"""
+        parametros = self.parametros.copy() if self.parametros is not None else QueryDict(mutable=True)
+        parametros['cursor'] = cursor
+        parametros.pop('page', None)
+        return '?' + parametros.urlencode()
+
+    @property
+    def url_siguiente(self):
+        return self._url(self.cursor_siguiente) if self.cursor_siguiente else ''
+
+    @property
+    def url_anterior(self):
+        return self._url(self.cursor_anterior) if self.cursor_anterior else ''
+
+
+class PaginadorCursor:
+    """Pagina un queryset por los campos de `orden`, que deben terminar en un campo único (id)"""
+
+    def __init__(self, queryset, orden, por_pagina=10, contar=False):
+        self.queryset = queryset.order_by(*orden)
+        self.orden = [(campo.lstrip('-'), campo.startswith('-')) for campo in orden]
+        self.por_pagina = por_pagina
+        self.contar = contar
+
+    @property
+    def count(self):
+        if not hasattr(self, '_count'):
+            self._count = self.queryset.count()
+        return self._count
+
+    def codificar(self, fila, direccion):
+        valores = []
+        for campo, _ in self.orden:
+            valor = _valor(fila, campo)
+            valores.append(valor.isoformat() if hasattr(valor, 'isoformat') else valor)
+        datos = json.dumps({'d': direccion, 'v': valores}, separators=(',', ':'), default=str)
+        return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+    def decodificar(self, cursor):
+        """(dirección, valores) del cursor, o None si no es válido"""
+        try:
+            relleno = '=' * (-len(cursor) % 4)
+            datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+            direccion, valores = datos['d'], datos['v']
+            if direccion not in ('s', 'a') or len(valores) != len(self.orden):
+                return None
+            modelo = self.queryset.model
+            valores = [
+                modelo._meta.get_field(campo).to_python(valor)
+                for (campo, _), valor in zip(self.orden, valores)
+            ]
+        except (ValueError, TypeError, LookupError, ValidationError):
+            return None
+        return direccion, valores
+
+    def _condicion(self, valores, hacia_atras):
+        """Filas estrictamente después (o antes) de la fila límite en el orden dado"""
+        condicion = Q()
+        for n, (campo, descendente) in enumerate(self.orden):
+            mayor = descendente == hacia_atras
+            filtro = {c: v for (c, _), v in zip(self.orden[:n], valores[:n])}
+            filtro[f'{campo}__{"gt" if mayor else "lt"}'] = valores[n]
+            condicion |= Q(**filtro)
+        return condicion
+
+    def get_page(self, cursor=None, parametros=None):
+        decodificado = self.decodificar(cursor) if cursor else None
+        queryset = self.queryset
+        hacia_atras = False
+        if decodificado:
+            direccion, valores = decodificado
+            hacia_atras = direccion == 'a'
+            queryset = queryset.filter(self._condicion(valores, hacia_atras))
+            if hacia_atras:
+                queryset = queryset.reverse()
+
+        filas = list(queryset[:self.por_pagina + 1])
+        hay_mas = len(filas) > self.por_pagina
+        filas = filas[:self.por_pagina]
+        if hacia_atras:
+            filas.reverse()
+
+        siguiente = anterior = None
+        if filas:
+            if hay_mas or hacia_atras:
+                siguiente = self.codificar(filas[-1], 's')
+            if decodificado and (hay_mas or not hacia_atras):
+                anterior = self.codificar(filas[0], 'a')
+        return PaginaCursor(filas, self, siguiente, anterior, parametros)
+
+
+def paginar(request, queryset, orden, por_pagina=10):
+    """Página clásica (?page=N) o por cursor (?paginacion=cursor / ?cursor=...).
+
+    En modo cursor el COUNT(*) se omite salvo que se pida con ?total=1.
+    """
+    if request.GET.get('paginacion') == MODO_CURSOR or 'cursor' in request.GET:
+        paginador = PaginadorCursor(queryset, orden, por_pagina, contar=request.GET.get('total') == '1')
+        return paginador.get_page(request.GET.get('cursor'), request.GET)
+    paginator = Paginator(queryset, por_pagina)
+    return paginator.get_page(request.GET.get('page'))
+
+
+def recorrer(queryset, orden, lote=2000):
+    """Itera todo el queryset por lotes de `lote` filas avanzando por cursor.
+
+    Cada lote es una consulta acotada que usa el índice del orden, así la
+    memoria no depende del total aunque el driver no tenga cursores de servidor.
+    """
+    paginador = PaginadorCursor(queryset, orden, lote)
+    pagina = paginador.get_page()
+    while True:
+        yield from pagina.object_list
+        if not pagina.has_next():
+            break
+        pagina = paginador.get_page(pagina.cursor_siguiente)
+
+
+def estimar_filas(modelo, using='default'):
+    """Filas de la tabla según las estadísticas del motor, sin recorrerla; None si no hay.
+
+    MySQL (InnoDB) y PostgreSQL mantienen un aproximado que se actualiza solo;
+    SQLite solo lo tiene después de ANALYZE (tabla sqlite_stat1).
+    """
+    conexion = connections[using]
+    tabla = modelo._meta.db_table
+    with conexion.cursor() as cursor:
+        if conexion.vendor == 'mysql':
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s', [tabla],
+            )
+        elif conexion.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)', [tabla])
+        elif conexion.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if cursor.fetchone() is None:
+                return None
+            # La primera cifra de stat es el total de filas de la tabla
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [tabla])
+            fila = cursor.fetchone()
+            return int(fila[0].split()[0]) if fila else None
+        else:
+            return None
+        fila = cursor.fetchone()
+    # reltuples es -1 en tablas nunca analizadas
+    return int(fila[0]) if fila and fila[0] is not None and fila[0] >= 0 else None
+
+
+class PaginadorEstimado(Paginator):
+    """Paginator del admin que no hace COUNT(*) de la tabla completa.
+
+    Sin filtros el total sale de las estadísticas del motor (estimar_filas);
+    si es menor que UMBRAL_ESTIMADO, o hay filtros o búsqueda, se cuenta de
+    verdad: con filtros el conteo usa los índices y suele ser mucho menor.
+    Como el total es aproximado, la última página puede quedar corta o vacía.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where and not queryset.query.distinct:
+            estimado = estimar_filas(queryset.model, queryset.db)
+            if estimado is not None and estimado >= UMBRAL_ESTIMADO:
+                return estimado
+        return super().count
@@ -0,0 +1,146 @@
+"""Perfilado bajo demanda de las vistas con cProfile.
+
+Una petición se perfila si trae una firma vigente (cabecera X-Perfilar o
+?perfilar=, ver firmar()) o si le toca por muestreo: PERFILADO_MUESTREO =
+{'proyecto_lista': 1000} perfila 1 de cada 1000 peticiones de esa URL. El
+profiler se activa en process_view y se apaga cuando la respuesta vuelve al
+middleware, así cubre la vista y el render de las TemplateResponse. Cada
+perfil se guarda en formato pstats (.prof, para snakeviz o pstats) en
+PERFILES_DIR, que conserva solo los PERFILES_MAXIMO más recientes.
+
+Las peticiones que no se perfilan solo pagan dos búsquedas en dicts.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import tempfile
+from datetime import datetime
+from time import perf_counter
+
+from django.conf import settings
+from django.core import signing
+from django.utils import timezone
+
+SAL = 'siriusApp.perfilado'
+VIGENCIA_FIRMA = 60 * 60
+MAXIMO = 50
+EXTENSION = '.prof'
+_NOMBRE = re.compile(r'^(?P<fecha>\d{8}-\d{6}-\d{6})-(?P<url>[\w.-]+)-(?P<ms>\d+)ms-(?P<pid>\d+)\.prof$')
+
+
+def directorio():
+    return getattr(settings, 'PERFILES_DIR', os.path.join(tempfile.gettempdir(), 'sirius_perfiles'))
+
+
+def firmar():
+    """Firma para X-Perfilar o ?perfilar=, válida por VIGENCIA_FIRMA segundos"""
+    return signing.TimestampSigner(salt=SAL).sign('perfilar')
+
+
+def firma_valida(valor):
+    try:
+        signing.TimestampSigner(salt=SAL).unsign(valor, max_age=VIGENCIA_FIRMA)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def toca_muestra(nombre_url):
+    cada = getattr(settings, 'PERFILADO_MUESTREO', {}).get(nombre_url)
+    return bool(cada) and random.random() * cada < 1
+
+
+def guardar(perfil, nombre_url, segundos):
+    """Guarda el perfil y borra los más viejos; devuelve el nombre del archivo"""
+    carpeta = directorio()
+    os.makedirs(carpeta, exist_ok=True)
+    url = re.sub(r'[^\w.-]', '.', nombre_url)
+    nombre = f'{timezone.now():%Y%m%d-%H%M%S-%f}-{url}-{int(segundos * 1000)}ms-{os.getpid()}{EXTENSION}'
+    perfil.dump_stats(os.path.join(carpeta, nombre))
+    rotar(getattr(settings, 'PERFILES_MAXIMO', MAXIMO))
+    return nombre
+
+
+def rotar(maximo):
+    perfiles = listar()
+    for perfil in perfiles[maximo:]:
+        try:
+            os.remove(os.path.join(directorio(), perfil['nombre']))
+        except FileNotFoundError:
+            pass
+
+
+def listar():
+    """Perfiles guardados, del más reciente al más antiguo"""
+    carpeta = directorio()
+    if not os.path.isdir(carpeta):
+        return []
+    perfiles = []
+    for nombre in os.listdir(carpeta):
+        coincidencia = _NOMBRE.match(nombre)
+        if coincidencia is None:
+            continue
+        try:
+            estado = os.stat(os.path.join(carpeta, nombre))
+        except FileNotFoundError:
+            continue
+        perfiles.append({
+            'nombre': nombre, 'url': coincidencia['url'], 'ms': int(coincidencia['ms']),
+            'fecha': datetime.fromtimestamp(estado.st_mtime, tz=timezone.get_current_timezone()),
+            'tamano': estado.st_size,
+        })
+    perfiles.sort(key=lambda perfil: (perfil['fecha'], perfil['nombre']), reverse=True)
+    return perfiles
+
+
+def ruta(nombre):
+    """Ruta de un perfil guardado; None si el nombre no es de un perfil"""
+    if _NOMBRE.match(nombre) is None:
+        return None
+    return os.path.join(directorio(), nombre)
+
+
+def resumen(nombre, orden='cumulative', lineas=40):
+    """Texto de pstats con las funciones que más tiempo se llevaron"""
+    salida = io.StringIO()
+    estadisticas = pstats.Stats(ruta(nombre), stream=salida)
+    estadisticas.strip_dirs().sort_stats(orden).print_stats(lineas)
+    return salida.getvalue()
+
+
+class PerfiladorMiddleware:
+    """Perfila la vista si la petición trae firma o le toca muestra; va último en MIDDLEWARE"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        respuesta = self.get_response(request)
+        perfil = getattr(request, '_perfil', None)
+        if perfil is None:
+            return respuesta
+        perfil.disable()
+        del request._perfil
+        nombre_url = request.resolver_match.view_name if request.resolver_match else '-'
+        respuesta['X-Perfil'] = guardar(perfil, nombre_url, perf_counter() - request._perfil_inicio)
+        return respuesta
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        firma = request.META.get('HTTP_X_PERFILAR') or request.GET.get('perfilar')
+        if firma is not None:
+            if not firma_valida(firma):
+                return None
+        elif not toca_muestra(request.resolver_match.view_name):
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # Ya hay otro profiler activo en este hilo
+            return None
+        request._perfil = perfil
+        request._perfil_inicio = perf_counter()
+        return None
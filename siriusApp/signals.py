@@ -0,0 +1,93 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import adjuntos, busqueda, cacheo, contadores
+from .models import Cliente, Incidencia, Presupuesto, Proyecto, Servicio
+
+
+@receiver(post_save, sender=Proyecto)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Incidencia)
+def actualizar_contadores(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        contadores.registrar_guardado(instance, created)
+
+
+@receiver(post_delete, sender=Proyecto)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Incidencia)
+def descontar_contadores(sender, instance, **kwargs):
+    contadores.registrar_eliminacion(instance)
+
+
+@receiver(post_save, sender=Incidencia)
+def referenciar_adjunto(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        adjuntos.registrar_guardado(instance, created)
+
+
+@receiver(post_delete, sender=Incidencia)
+def liberar_adjunto(sender, instance, **kwargs):
+    adjuntos.registrar_eliminacion(instance)
+
+
+@receiver(post_save, sender=Proyecto)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Incidencia)
+@receiver(post_save, sender=Presupuesto)
+def actualizar_indice_busqueda(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        busqueda.indexar(instance, created)
+
+
+@receiver(post_delete, sender=Proyecto)
+@receiver(post_delete, sender=Cliente)
+@receiver(post_delete, sender=Incidencia)
+@receiver(post_delete, sender=Presupuesto)
+def quitar_de_indice_busqueda(sender, instance, **kwargs):
+    busqueda.desindexar(instance)
+
+
+# Las versiones se suben al confirmar la transacción: si se subieran antes, una petición
+# entre medio leería las filas viejas y las guardaría bajo la versión nueva
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def invalidar_cache_clientes(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: cacheo.invalidar('clientes'))
+
+
+@receiver(post_save, sender=Proyecto)
+@receiver(post_delete, sender=Proyecto)
+def invalidar_cache_proyectos(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: cacheo.invalidar('proyectos'))
+
+
+@receiver(post_save, sender=Servicio)
+@receiver(post_delete, sender=Servicio)
+def invalidar_cache_servicios(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: cacheo.invalidar('servicios'))
+
+
+@receiver(m2m_changed, sender=Proyecto.servicios.through)
+def tocar_proyecto_servicios(sender, instance, action, reverse, pk_set, **kwargs):
+    # Cambiar servicios no guarda el proyecto: sin esto un cambio que deja
+    # igual el total y la última fecha no invalidaría la ETag de proyecto_detalle
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    proyectos = Proyecto.objects.filter(pk__in=pk_set or ()) if reverse else Proyecto.objects.filter(pk=instance.pk)
+    proyectos.update(fecha_modificacion=timezone.now())
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidar_cache_usuarios(sender, raw=False, update_fields=None, **kwargs):
+    # El login guarda solo last_login: no cambia nada de lo cacheado
+    if raw or update_fields == frozenset({'last_login'}):
+        return
+    transaction.on_commit(lambda: cacheo.invalidar('usuarios'))
@@ -0,0 +1,234 @@
+"""Generación rápida de datos sintéticos para benchmarks y pruebas de carga"""
+import random
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import busqueda, cacheo, contadores
+from .models import Cliente, Servicio, Proyecto, Presupuesto, Incidencia, SecuenciaPresupuesto
+from .validators import digito_verificador
+
+# Distribuciones sesgadas, parecidas a las de producción
+PESOS_ESTADO_PROYECTO = {
+    'cotizado': 15, 'aprobado': 10, 'en_proceso': 30,
+    'completado': 35, 'cancelado': 5, 'pausado': 5,
+}
+PESOS_PRIORIDAD_PROYECTO = {'baja': 20, 'media': 50, 'alta': 25, 'urgente': 5}
+PESOS_ESTADO_INCIDENCIA = {'abierta': 10, 'en_proceso': 10, 'resuelta': 30, 'cerrada': 50}
+PESOS_PRIORIDAD_INCIDENCIA = {'baja': 30, 'media': 45, 'alta': 20, 'critica': 5}
+PESOS_ESTADO_PRESUPUESTO = {'pendiente': 20, 'revision': 10, 'aprobado': 55, 'rechazado': 15}
+# Servicios por proyecto: la mayoría contrata uno o dos
+PESOS_SERVICIOS_POR_PROYECTO = {0: 5, 1: 45, 2: 30, 3: 15, 4: 5}
+
+
+def _elegir(pesos, cantidad, rng):
+    return rng.choices(list(pesos), weights=list(pesos.values()), k=cantidad)
+
+
+@contextmanager
+def _fechas_manuales(modelo, *campos):
+    """Desactiva auto_now_add temporalmente para poder repartir las fechas"""
+    originales = {}
+    for nombre in campos:
+        campo = modelo._meta.get_field(nombre)
+        originales[campo] = campo.auto_now_add
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, valor in originales.items():
+            campo.auto_now_add = valor
+
+
+def _indexar_ultimos(modelo, cantidad, lote):
+    """bulk_create no dispara señales ni devuelve ids en todos los motores: se indexa releyendo"""
+    recientes = busqueda.para_indexar(modelo.objects.order_by('-id'))[:cantidad]
+    busqueda.indexar_lote(recientes.iterator(chunk_size=lote), lote)
+
+
+def _fecha_aleatoria(rng, dias_atras=3 * 365):
+    return timezone.now() - timedelta(days=rng.random() * dias_atras)
+
+
+def generar_usuarios(cantidad, prefijo='sintetico', lote=2000):
+    """Crea usuarios sin contraseña utilizable y devuelve sus ids"""
+    inicio = User.objects.filter(username__startswith=prefijo).count()
+    usuarios = [
+        User(username=f'{prefijo}{inicio + i}', email=f'{prefijo}{inicio + i}@sirius.test', password='!')
+        for i in range(cantidad)
+    ]
+    User.objects.bulk_create(usuarios, batch_size=lote)
+    cacheo.invalidar('usuarios')
+    return list(
+        User.objects.filter(username__startswith=prefijo).order_by('-id').values_list('id', flat=True)[:cantidad]
+    )
+
+
+def generar_clientes(cantidad, lote=2000, semilla=None):
+    """Crea clientes con RUT válido y devuelve sus ids"""
+    rng = random.Random(semilla)
+    base = 30_000_000 + Cliente.objects.count()
+    clientes = []
+    for i in range(cantidad):
+        numero = base + i
+        clientes.append(Cliente(
+            nombre=f'Cliente {numero}',
+            rut=f'{numero}-{digito_verificador(numero)}',
+            email=f'cliente{numero}@sirius.test',
+            telefono='+56912345678',
+            direccion='Av. Siempre Viva 742',
+            tipo_cliente=rng.choice(['empresa', 'particular', 'gobierno']),
+            fecha_registro=_fecha_aleatoria(rng),
+        ))
+    with _fechas_manuales(Cliente, 'fecha_registro'):
+        Cliente.objects.bulk_create(clientes, batch_size=lote)
+    contadores.ajustar(contadores.deltas_lote(clientes))
+    _indexar_ultimos(Cliente, cantidad, lote)
+    cacheo.invalidar('clientes')
+    return list(Cliente.objects.order_by('-id').values_list('id', flat=True)[:cantidad])
+
+
+def generar_servicios(cantidad, lote=2000, semilla=None):
+    """Crea servicios del catálogo repartidos entre los tipos y devuelve sus ids"""
+    rng = random.Random(semilla)
+    tipos = [codigo for codigo, _ in Servicio.TIPO_SERVICIO_CHOICES]
+    base = Servicio.objects.count()
+    servicios = [
+        Servicio(
+            nombre=f'Servicio sintético {base + i}',
+            tipo_servicio=rng.choice(tipos),
+            descripcion='Servicio generado para pruebas de rendimiento',
+            precio_base=Decimal(rng.randint(50_000, 5_000_000)),
+            activo=rng.random() < 0.9,
+        )
+        for i in range(cantidad)
+    ]
+    Servicio.objects.bulk_create(servicios, batch_size=lote)
+    cacheo.invalidar('servicios')
+    return list(Servicio.objects.order_by('-id').values_list('id', flat=True)[:cantidad])
+
+
+def generar_proyectos(cantidad, clientes_ids, usuarios_ids, lote=2000, semilla=None):
+    """Crea proyectos repartidos entre clientes y responsables y devuelve sus ids"""
+    rng = random.Random(semilla)
+    estados = _elegir(PESOS_ESTADO_PROYECTO, cantidad, rng)
+    prioridades = _elegir(PESOS_PRIORIDAD_PROYECTO, cantidad, rng)
+    hoy = date.today()
+    proyectos = []
+    for i in range(cantidad):
+        inicio = hoy - timedelta(days=rng.randint(0, 3 * 365))
+        proyectos.append(Proyecto(
+            nombre=f'Proyecto sintético {i}',
+            cliente_id=rng.choice(clientes_ids),
+            descripcion='Proyecto generado para pruebas de rendimiento',
+            fecha_inicio=inicio,
+            fecha_fin_estimada=inicio + timedelta(days=rng.randint(15, 365)),
+            estado=estados[i],
+            prioridad=prioridades[i],
+            presupuesto_total=Decimal(rng.randint(500_000, 90_000_000)),
+            responsable_id=rng.choice(usuarios_ids) if usuarios_ids else None,
+            fecha_creacion=_fecha_aleatoria(rng),
+        ))
+    with _fechas_manuales(Proyecto, 'fecha_creacion'):
+        Proyecto.objects.bulk_create(proyectos, batch_size=lote)
+    contadores.ajustar(contadores.deltas_lote(proyectos))
+    _indexar_ultimos(Proyecto, cantidad, lote)
+    cacheo.invalidar('proyectos')
+    return list(Proyecto.objects.order_by('-id').values_list('id', flat=True)[:cantidad])
+
+
+def generar_incidencias(cantidad, proyectos_ids, usuarios_ids, lote=2000, semilla=None):
+    """Crea incidencias con distribución de estados sesgada hacia las cerradas"""
+    rng = random.Random(semilla)
+    estados = _elegir(PESOS_ESTADO_INCIDENCIA, cantidad, rng)
+    prioridades = _elegir(PESOS_PRIORIDAD_INCIDENCIA, cantidad, rng)
+    tipos = [codigo for codigo, _ in Incidencia.TIPO_INCIDENCIA_CHOICES]
+    incidencias = []
+    for i in range(cantidad):
+        reporte = _fecha_aleatoria(rng)
+        resuelta = estados[i] in ('resuelta', 'cerrada')
+        incidencias.append(Incidencia(
+            proyecto_id=rng.choice(proyectos_ids),
+            titulo=f'Incidencia sintética {i}',
+            descripcion='Incidencia generada para pruebas de rendimiento',
+            tipo_incidencia=rng.choice(tipos),
+            prioridad=prioridades[i],
+            estado=estados[i],
+            reportado_por_id=rng.choice(usuarios_ids) if usuarios_ids else None,
+            asignado_a_id=rng.choice(usuarios_ids) if usuarios_ids and rng.random() < 0.7 else None,
+            fecha_reporte=reporte,
+            fecha_resolucion=reporte + timedelta(days=rng.randint(1, 30)) if resuelta else None,
+            solucion='Resuelta en terreno' if resuelta else '',
+        ))
+    with _fechas_manuales(Incidencia, 'fecha_reporte'):
+        Incidencia.objects.bulk_create(incidencias, batch_size=lote)
+    contadores.ajustar(contadores.deltas_lote(incidencias))
+    _indexar_ultimos(Incidencia, cantidad, lote)
+    return cantidad
+
+
+def asignar_servicios(proyectos_ids, servicios_ids, lote=2000, semilla=None):
+    """Agrega servicios a los proyectos con filas de la tabla intermedia en bloque.
+
+    No dispara m2m_changed: los proyectos recién creados no tienen ETag que invalidar.
+    """
+    rng = random.Random(semilla)
+    if not servicios_ids:
+        return 0
+    Intermedia = Proyecto.servicios.through
+    cantidades = _elegir(PESOS_SERVICIOS_POR_PROYECTO, len(proyectos_ids), rng)
+    filas = [
+        Intermedia(proyecto_id=proyecto_id, servicio_id=servicio_id)
+        for proyecto_id, cantidad in zip(proyectos_ids, cantidades)
+        for servicio_id in rng.sample(servicios_ids, min(cantidad, len(servicios_ids)))
+    ]
+    Intermedia.objects.bulk_create(filas, batch_size=lote, ignore_conflicts=True)
+    return len(filas)
+
+
+def generar_presupuestos(cantidad, proyectos_ids, usuarios_ids, lote=2000, semilla=None):
+    """Crea presupuestos de proyectos existentes, numerados con correlativos reservados en bloque"""
+    rng = random.Random(semilla)
+    estados = _elegir(PESOS_ESTADO_PRESUPUESTO, cantidad, rng)
+    elegidos = [rng.choice(proyectos_ids) for _ in range(cantidad)]
+    cliente_de_proyecto = {}
+    unicos = list(set(elegidos))
+    for inicio in range(0, len(unicos), lote):
+        cliente_de_proyecto.update(
+            Proyecto.objects.filter(pk__in=unicos[inicio:inicio + lote]).values_list('id', 'cliente_id')
+        )
+
+    presupuestos = []
+    por_anio = defaultdict(list)
+    for i, proyecto_id in enumerate(elegidos):
+        creacion = _fecha_aleatoria(rng)
+        presupuesto = Presupuesto(
+            cliente_id=cliente_de_proyecto[proyecto_id],
+            proyecto_id=proyecto_id,
+            descripcion='Presupuesto generado para pruebas de rendimiento',
+            monto_total=Decimal(rng.randint(100_000, 50_000_000)),
+            fecha_emision=creacion.date(),
+            validez_dias=rng.choice([15, 30, 30, 60]),
+            estado=estados[i],
+            creado_por_id=rng.choice(usuarios_ids) if usuarios_ids else None,
+            fecha_creacion=creacion,
+        )
+        presupuestos.append(presupuesto)
+        por_anio[timezone.localdate(creacion).year].append(presupuesto)
+
+    # Un bloqueo de SecuenciaPresupuesto por año en lugar de uno por presupuesto
+    with transaction.atomic():
+        for anio, del_anio in por_anio.items():
+            del_anio.sort(key=lambda presupuesto: presupuesto.fecha_creacion)
+            primero = SecuenciaPresupuesto.reservar(anio, len(del_anio))
+            for numero, presupuesto in enumerate(del_anio, start=primero):
+                presupuesto.numero_presupuesto = f'PRES-{anio}-{numero:04d}'
+        with _fechas_manuales(Presupuesto, 'fecha_creacion'):
+            Presupuesto.objects.bulk_create(presupuestos, batch_size=lote)
+    _indexar_ultimos(Presupuesto, cantidad, lote)
+    return cantidad
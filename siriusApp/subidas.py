@@ -0,0 +1,180 @@
+"""Subidas reanudables por partes para los adjuntos de incidencias.
+
+Protocolo (JSON, con sesión):
+  POST incidencias/<pk>/subidas/    nombre, tamano          -> 201 {id, offset, ...}
+  PUT  subidas/<id>/                Upload-Offset: N, bytes -> {offset}
+  GET  subidas/<id>/                                        -> {offset} para reanudar
+  POST subidas/<id>/finalizar/      sha256 opcional         -> adjunto en la incidencia
+
+Cada parte se escribe en MEDIA_ROOT/subidas/<id>.parte en la posición del
+offset, leyendo el cuerpo por bloques: la memoria por petición es un bloque,
+no la parte. Si la conexión se corta a mitad de parte se guarda lo recibido y
+el cliente continúa desde el offset que informa GET. Al finalizar el archivo
+se mueve al almacenamiento de adjuntos (sin copiarlo) y la sesión se borra;
+las sesiones sin actividad vencen y las borra limpiar_subidas.
+
+El cliente de este protocolo es la app móvil de los técnicos, que crea la
+incidencia y después sube el adjunto. El formulario web de incidencia_crear
+no lo usa: sigue enviando el archivo en un solo POST multipart.
+"""
+import hashlib
+import os
+from datetime import timedelta
+
+from django.core.files import File
+from django.http import UnreadablePostError
+from django.utils import timezone
+
+from .almacenamiento import adjuntos
+from .models import Incidencia, SesionSubida
+
+CARPETA = 'subidas'
+VIGENCIA = timedelta(hours=24)
+TAMANO_MAXIMO = 500 * 1024 * 1024
+PARTE_MAXIMA = 16 * 1024 * 1024
+BLOQUE = 64 * 1024
+EXTENSIONES = {
+    '.pdf', '.jpg', '.jpeg', '.png', '.doc', '.docx', '.txt',
+    '.mp4', '.mov', '.m4v', '.3gp', '.webm',
+}
+
+
+class ErrorSubida(Exception):
+    """Error del protocolo con su código HTTP y datos extra para la respuesta"""
+
+    def __init__(self, mensaje, status=400, **datos):
+        super().__init__(mensaje)
+        self.status = status
+        self.datos = datos
+
+
+class _ArchivoSubido(File):
+    """Archivo ya en disco: el storage lo mueve en lugar de copiarlo"""
+
+    def __init__(self, ruta, nombre, sha256):
+        super().__init__(open(ruta, 'rb'), name=nombre)
+        self.ruta = ruta
+        self.sha256 = sha256
+
+    def temporary_file_path(self):
+        return self.ruta
+
+
+def ruta(sesion):
+    return adjuntos.path(f'{CARPETA}/{sesion.pk}.parte')
+
+
+def vencida(sesion, ahora=None):
+    return sesion.fecha_modificacion < (ahora or timezone.now()) - VIGENCIA
+
+
+def crear(usuario, incidencia, nombre, tamano):
+    sesion = SesionSubida.objects.create(usuario=usuario, incidencia=incidencia, nombre=nombre, tamano=tamano)
+    os.makedirs(os.path.dirname(ruta(sesion)), exist_ok=True)
+    open(ruta(sesion), 'wb').close()
+    return sesion
+
+
+def recibir(sesion, offset, flujo, longitud):
+    """Escribe la parte que empieza en `offset`; devuelve el nuevo offset.
+
+    Lee `flujo` por bloques de BLOQUE bytes. El offset se avanza con un UPDATE
+    condicional, así dos peticiones con el mismo offset no avanzan las dos.
+    """
+    if vencida(sesion):
+        raise ErrorSubida('La subida expiró', 410)
+    if offset != sesion.recibido:
+        raise ErrorSubida('El offset no coincide con lo recibido', 409, offset=sesion.recibido)
+    if longitud > PARTE_MAXIMA:
+        raise ErrorSubida(f'Cada parte admite hasta {PARTE_MAXIMA} bytes', 413, offset=sesion.recibido)
+    if offset + longitud > sesion.tamano:
+        raise ErrorSubida('La parte excede el tamaño declarado', 400, offset=sesion.recibido)
+
+    escritos = 0
+    try:
+        with open(ruta(sesion), 'r+b') as destino:
+            destino.seek(offset)
+            while escritos < longitud:
+                bloque = flujo.read(min(BLOQUE, longitud - escritos))
+                if not bloque:
+                    break
+                destino.write(bloque)
+                escritos += len(bloque)
+    except FileNotFoundError:
+        raise ErrorSubida('La subida expiró', 410)
+    except UnreadablePostError:
+        # Conexión cortada: se conserva lo escrito y el cliente reanuda desde ahí
+        pass
+
+    nuevo = offset + escritos
+    if not SesionSubida.objects.filter(pk=sesion.pk, recibido=offset).update(
+        recibido=nuevo, fecha_modificacion=timezone.now()
+    ):
+        actual = SesionSubida.objects.filter(pk=sesion.pk).values_list('recibido', flat=True).first()
+        raise ErrorSubida('Otra petición avanzó la subida', 409, offset=actual)
+    sesion.recibido = nuevo
+    return nuevo
+
+
+def _sha256(ruta_archivo):
+    sha256 = hashlib.sha256()
+    with open(ruta_archivo, 'rb') as archivo:
+        for bloque in iter(lambda: archivo.read(BLOQUE * 16), b''):
+            sha256.update(bloque)
+    return sha256.hexdigest()
+
+
+def descartar(sesion):
+    parte = ruta(sesion)
+    sesion.delete()
+    try:
+        os.remove(parte)
+    except FileNotFoundError:
+        pass
+
+
+def finalizar(sesion, sha256=''):
+    """Adjunta el archivo completo a la incidencia y cierra la sesión"""
+    if vencida(sesion):
+        raise ErrorSubida('La subida expiró', 410)
+    if sesion.recibido != sesion.tamano:
+        raise ErrorSubida('La subida no está completa', 409, offset=sesion.recibido)
+    parte = ruta(sesion)
+    calculado = _sha256(parte)
+    if sha256 and sha256.lower() != calculado:
+        descartar(sesion)
+        raise ErrorSubida('El SHA-256 no coincide; la subida se descartó', 400, sha256=calculado)
+
+    # Desde la BD: las señales necesitan el adjunto anterior para mover la referencia
+    incidencia = Incidencia.objects.get(pk=sesion.incidencia_id)
+    archivo = _ArchivoSubido(parte, sesion.nombre, calculado)
+    try:
+        incidencia.archivo_adjunto.save(sesion.nombre, archivo, save=False)
+    finally:
+        archivo.close()
+    incidencia.save(update_fields=['archivo_adjunto', 'fecha_modificacion'])
+    # Si el contenido ya existía el storage no movió la parte
+    descartar(sesion)
+    return incidencia
+
+
+def limpiar(ahora=None):
+    """Borra las sesiones vencidas y las partes sin sesión; devuelve (sesiones, archivos)"""
+    ahora = ahora or timezone.now()
+    limite = ahora - VIGENCIA
+    sesiones = 0
+    for sesion in SesionSubida.objects.filter(fecha_modificacion__lt=limite):
+        descartar(sesion)
+        sesiones += 1
+
+    archivos = 0
+    carpeta = adjuntos.path(CARPETA)
+    if os.path.isdir(carpeta):
+        activas = {str(pk) for pk in SesionSubida.objects.values_list('pk', flat=True)}
+        for nombre in os.listdir(carpeta):
+            ruta_parte = os.path.join(carpeta, nombre)
+            if nombre.removesuffix('.parte') in activas or os.path.getmtime(ruta_parte) >= limite.timestamp():
+                continue
+            os.remove(ruta_parte)
+            archivos += 1
+    return sesiones, archivos
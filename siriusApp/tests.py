@@ -1,3 +1,1611 @@
-from django.test import TestCase
+import hashlib
+import html
+import os
+import re
+import shutil
+import tempfile
+import threading
+from datetime import date, timedelta
+from io import BytesIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import openpyxl
+from django.contrib import messages
+from django.contrib.messages.storage.fallback import FallbackStorage
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import QuerySet, Subquery
+from django.http import UnreadablePostError
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    adjuntos, busqueda, cacheo, condicional, contadores, importacion, instrumentacion, metricas, paginacion, perfilado,
+    sintetico, subidas, trabajos, transiciones,
+)
+from .forms import ClienteForm, IncidenciaForm, IncidenciaFiltroForm, ProyectoFiltroForm
+from .validators import digito_verificador, validar_rut
+from .models import (
+    Adjunto, Cliente, Servicio, Proyecto, Presupuesto, Incidencia, PerfilUsuario, SecuenciaPresupuesto,
+    IndiceBusqueda, SesionSubida, TrabajoExportacion, Contador,
+)
+
+
+def crear_cliente(rut='11111111-1', **kwargs):
+    datos = {
+        'nombre': 'Cliente de prueba', 'rut': rut, 'email': f'{rut}@sirius.test',
+        'telefono': '+56912345678', 'direccion': 'Calle 123', 'tipo_cliente': 'empresa',
+    }
+    datos.update(kwargs)
+    return Cliente.objects.create(**datos)
+
+
+def crear_usuario(username, tipo_usuario='empleado', cliente=None, **kwargs):
+    user = User.objects.create_user(username, f'{username}@sirius.test', 'clave-segura-123', **kwargs)
+    PerfilUsuario.objects.create(user=user, tipo_usuario=tipo_usuario, cliente=cliente)
+    return user
+
+
+def crear_proyecto(cliente, responsable=None, **kwargs):
+    datos = {
+        'nombre': 'Proyecto de prueba', 'cliente': cliente, 'descripcion': 'Descripción',
+        'fecha_inicio': date.today(), 'fecha_fin_estimada': date.today(),
+        'presupuesto_total': 1000, 'responsable': responsable,
+    }
+    datos.update(kwargs)
+    return Proyecto.objects.create(**datos)
+
+
+def crear_incidencia(proyecto, **kwargs):
+    datos = {
+        'proyecto': proyecto, 'titulo': 'Incidencia de prueba', 'descripcion': 'Descripción',
+        'tipo_incidencia': 'tecnica',
+    }
+    datos.update(kwargs)
+    return Incidencia.objects.create(**datos)
+
+
+def crear_presupuesto(cliente, **kwargs):
+    datos = {
+        'cliente': cliente, 'descripcion': 'Presupuesto de prueba',
+        'monto_total': 1000, 'fecha_emision': date.today(),
+    }
+    datos.update(kwargs)
+    return Presupuesto.objects.create(**datos)
+
+
+class NumeracionPresupuestoTests(TestCase):
+    def setUp(self):
+        self.cliente = crear_cliente()
+        self.year = timezone.localdate().year
+
+    def test_numeros_correlativos(self):
+        numeros = [crear_presupuesto(self.cliente).numero_presupuesto for _ in range(3)]
+        self.assertEqual(numeros, [f'PRES-{self.year}-{n:04d}' for n in (1, 2, 3)])
+
+    def test_continua_desde_la_secuencia(self):
+        SecuenciaPresupuesto.objects.create(anio=self.year, ultimo=41)
+        self.assertEqual(crear_presupuesto(self.cliente).numero_presupuesto, f'PRES-{self.year}-0042')
+
+    def test_costo_constante(self):
+        SecuenciaPresupuesto.objects.create(anio=self.year, ultimo=100_000)
+        # Lectura sin bloqueo, SELECT ... FOR UPDATE y UPDATE de la secuencia, INSERT
+        # y upsert del índice de búsqueda (más los savepoints), sin importar cuántos existan
+        with self.assertNumQueries(7):
+            crear_presupuesto(self.cliente)
+
+    def test_primero_del_anio_crea_la_secuencia(self):
+        self.assertTrue(SecuenciaPresupuesto.objects.filter(anio=SecuenciaPresupuesto.CENTINELA).exists())
+        self.assertEqual(crear_presupuesto(self.cliente).numero_presupuesto, f'PRES-{self.year}-0001')
+        self.assertEqual(SecuenciaPresupuesto.objects.get(anio=self.year).ultimo, 1)
+        self.assertEqual(SecuenciaPresupuesto.objects.get(anio=SecuenciaPresupuesto.CENTINELA).ultimo, 0)
+
+    def test_primero_del_anio_creado_por_otra_transaccion(self):
+        # Otra transacción crea la fila entre la lectura sin bloqueo y la centinela
+        SecuenciaPresupuesto.objects.create(anio=self.year, ultimo=5)
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            with transaction.atomic():
+                primero = SecuenciaPresupuesto.reservar(self.year, 3)
+        self.assertEqual(primero, 6)
+        self.assertEqual(SecuenciaPresupuesto.objects.get(anio=self.year).ultimo, 8)
+
+    def test_primero_del_anio_sin_centinela(self):
+        # Tabla vaciada (p. ej. por un flush): la centinela se recrea
+        SecuenciaPresupuesto.objects.all().delete()
+        self.assertEqual(crear_presupuesto(self.cliente).numero_presupuesto, f'PRES-{self.year}-0001')
+        self.assertTrue(SecuenciaPresupuesto.objects.filter(anio=SecuenciaPresupuesto.CENTINELA).exists())
+
+    def test_numero_manual_no_consume_secuencia(self):
+        crear_presupuesto(self.cliente, numero_presupuesto='PRES-MANUAL-1')
+        self.assertFalse(SecuenciaPresupuesto.objects.filter(anio=self.year).exists())
+
+
+class NumeracionConcurrenteTests(TransactionTestCase):
+    hilos = 8
+    por_hilo = 10
+
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_sin_duplicados_entre_hilos(self):
+        cliente = crear_cliente()
+        errores = []
+
+        def crear_varios():
+            try:
+                for _ in range(self.por_hilo):
+                    crear_presupuesto(cliente)
+            except Exception as exc:
+                errores.append(exc)
+            finally:
+                connection.close()
+
+        hilos = [threading.Thread(target=crear_varios) for _ in range(self.hilos)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        numeros = list(Presupuesto.objects.values_list('numero_presupuesto', flat=True))
+        self.assertEqual(len(numeros), self.hilos * self.por_hilo)
+        self.assertEqual(len(set(numeros)), len(numeros))
+
+
+class VisibilidadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente_a = crear_cliente('11111111-1')
+        cls.cliente_b = crear_cliente('22222222-2')
+        cls.admin = crear_usuario('admin', 'administrador', is_staff=True)
+        cls.empleado = crear_usuario('empleado')
+        cls.usuario_a = crear_usuario('cliente_a', 'cliente', cliente=cls.cliente_a)
+        cls.sin_cliente = crear_usuario('sin_cliente', 'cliente')
+        cls.proyecto_a = crear_proyecto(cls.cliente_a, responsable=cls.empleado)
+        cls.proyecto_b = crear_proyecto(cls.cliente_b, responsable=cls.admin)
+        cls.incidencia_b = crear_incidencia(cls.proyecto_b, asignado_a=cls.empleado)
+        crear_presupuesto(cls.cliente_a)
+        crear_presupuesto(cls.cliente_b)
+
+    def visibles(self, queryset, user):
+        return set(queryset.visible_to(User.objects.select_related('perfilusuario').get(pk=user.pk)))
+
+    def test_proyectos_por_rol(self):
+        self.assertEqual(self.visibles(Proyecto.objects, self.admin), {self.proyecto_a, self.proyecto_b})
+        self.assertEqual(self.visibles(Proyecto.objects, self.empleado), {self.proyecto_a})
+        self.assertEqual(self.visibles(Proyecto.objects, self.usuario_a), {self.proyecto_a})
+        self.assertEqual(self.visibles(Proyecto.objects, self.sin_cliente), set())
+
+    def test_presupuestos_e_incidencias_por_rol(self):
+        self.assertEqual({p.cliente for p in self.visibles(Presupuesto.objects, self.usuario_a)}, {self.cliente_a})
+        self.assertEqual(len(self.visibles(Presupuesto.objects, self.empleado)), 2)
+        self.assertEqual(self.visibles(Incidencia.objects, self.empleado), {self.incidencia_b})
+        self.assertEqual(self.visibles(Incidencia.objects, self.usuario_a), set())
+
+    def test_detalle_fuera_de_alcance_da_404(self):
+        self.client.force_login(self.usuario_a)
+        respuesta = self.client.get(f'/proyectos/{self.proyecto_b.pk}/')
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Cada vista hace un número fijo de consultas, sin importar cuántas filas existan"""
+
+    # (url, variable de contexto, atributos por fila que usan las plantillas, máximo de consultas)
+    VISTAS = [
+        ('/', 'proyectos_recientes', ['cliente.nombre'], 8),
+        ('/clientes/', 'clientes', [], 5),
+        ('/servicios/', 'servicios', [], 4),
+        ('/proyectos/', 'proyectos', ['cliente.nombre', 'responsable.username'], 5),
+        ('/proyectos/{proyecto}/', 'presupuestos', ['cliente.nombre'], 7),
+        ('/proyectos/{proyecto}/', 'incidencias', ['proyecto.nombre', 'reportado_por.username'], 7),
+        ('/proyectos/{proyecto}/', 'servicios', [], 7),
+        ('/proyectos/{proyecto}/editar/', 'form', [], 7),
+        ('/presupuestos/', 'presupuestos', ['cliente.nombre', 'proyecto.cliente.nombre'], 5),
+        ('/presupuestos/{presupuesto}/', 'presupuesto', ['cliente.nombre', 'proyecto.cliente.nombre'], 4),
+        ('/presupuestos/crear/', 'form', [], 6),
+        ('/incidencias/', 'incidencias', ['proyecto.nombre', 'reportado_por.username'], 5),
+        ('/incidencias/crear/', 'form', [], 5),
+        ('/incidencias/{incidencia}/resolver/', 'incidencia', ['proyecto.nombre'], 3),
+    ]
+
+    def setUp(self):
+        self.admin = crear_usuario('admin', 'administrador', is_staff=True)
+        self.client.force_login(self.admin)
+        self.sembrar(2)
+
+    def sembrar(self, cantidad):
+        # Las caches versionadas se invalidan al confirmar: se ejecutan los on_commit del sembrado
+        with self.captureOnCommitCallbacks(execute=True):
+            self._sembrar(cantidad)
+
+    def _sembrar(self, cantidad):
+        from .models import Servicio
+        inicio = Cliente.objects.count()
+        for i in range(inicio, inicio + cantidad):
+            cliente = crear_cliente(f'{10000000 + i}-{i % 10}', nombre=f'Cliente {i}')
+            servicio = Servicio.objects.create(
+                nombre=f'Servicio {i}', tipo_servicio='electrico', descripcion='-', precio_base=100
+            )
+            responsable = crear_usuario(f'responsable{i}')
+            proyecto = crear_proyecto(cliente, responsable=responsable, nombre=f'Proyecto {i}')
+            proyecto.servicios.add(servicio)
+            crear_presupuesto(cliente, proyecto=proyecto)
+            crear_incidencia(proyecto, reportado_por=responsable, asignado_a=responsable)
+
+    def url(self, plantilla):
+        return plantilla.format(
+            proyecto=Proyecto.objects.order_by('id').first().pk,
+            presupuesto=Presupuesto.objects.order_by('id').first().pk,
+            incidencia=Incidencia.objects.order_by('id').first().pk,
+        )
+
+    def medir(self, plantilla, variable, atributos):
+        """Consultas de la vista más las que haría la plantilla al recorrer las filas"""
+        url = self.url(plantilla)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            if variable == 'form':
+                str(respuesta.context['form'])
+            elif variable:
+                valor = respuesta.context[variable]
+                filas = valor if hasattr(valor, '__iter__') else [valor]
+                for fila in filas:
+                    str(fila)
+                    for atributo in atributos:
+                        objeto = fila
+                        for parte in atributo.split('.'):
+                            objeto = getattr(objeto, parte, None)
+            elif hasattr(respuesta, 'streaming_content'):
+                b''.join(respuesta.streaming_content)
+        return len(consultas)
+
+    def test_consultas_constantes_por_vista(self):
+        antes = {(p, v): self.medir(p, v, a) for p, v, a, _ in self.VISTAS}
+        self.sembrar(6)
+        for plantilla, variable, atributos, maximo in self.VISTAS:
+            with self.subTest(url=plantilla, variable=variable):
+                despues = self.medir(plantilla, variable, atributos)
+                self.assertEqual(despues, antes[(plantilla, variable)], 'las consultas crecen con las filas')
+                self.assertLessEqual(despues, maximo)
+
+
+class ContadoresTests(TestCase):
+    def setUp(self):
+        self.cliente = crear_cliente()
+
+    def assertContadoresAlDia(self):
+        self.assertEqual(contadores.reconciliar(corregir=False), {})
+
+    def test_altas_cambios_y_bajas(self):
+        proyecto = crear_proyecto(self.cliente)
+        incidencia = crear_incidencia(proyecto)
+        self.assertContadoresAlDia()
+
+        proyecto = Proyecto.objects.get(pk=proyecto.pk)
+        proyecto.estado = 'en_proceso'
+        proyecto.save()
+        incidencia.estado = 'resuelta'
+        incidencia.save()
+        self.cliente.activo = False
+        self.cliente.save()
+        self.assertContadoresAlDia()
+
+        incidencia.delete()
+        self.cliente.delete()
+        self.assertContadoresAlDia()
+
+    def test_reconciliar_corrige_deriva(self):
+        crear_proyecto(self.cliente)
+        Proyecto.objects.update(estado='pausado')  # update() no dispara señales
+        diferencias = contadores.reconciliar()
+        self.assertEqual(diferencias[('proyecto', 'estado', 'pausado')], (0, 1))
+        self.assertContadoresAlDia()
+
+    def test_resumen_de_incidencias_por_estado(self):
+        empleado = crear_usuario('empleado')
+        propio = crear_proyecto(self.cliente, responsable=empleado)
+        for estado in ('abierta', 'abierta', 'resuelta'):
+            crear_incidencia(propio, estado=estado)
+        crear_incidencia(crear_proyecto(self.cliente), estado='en_proceso')
+
+        for usuario, esperado in ((crear_usuario('admin', is_staff=True), [2, 1, 1, 0]), (empleado, [2, 0, 1, 0])):
+            self.client.force_login(usuario)
+            respuesta = self.client.get(reverse('incidencia_lista'))
+            resumen = respuesta.context['resumen_estados']
+            self.assertEqual([estado['total'] for estado in resumen], esperado)
+            self.assertIn('<h5>Abierta</h5><h2>2</h2>', re.sub(r'>\s+<', '><', respuesta.content.decode()))
+
+    def test_reconciliar_bloquea_antes_de_contar(self):
+        with CaptureQueriesContext(connection) as consultas:
+            contadores.reconciliar(corregir=False)
+        selects = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('SELECT')]
+        self.assertIn(Contador._meta.db_table, selects[0])
+
+    def test_home_lee_contadores_en_una_consulta(self):
+        user = crear_usuario('empleado')
+        self.client.force_login(user)
+        crear_incidencia(crear_proyecto(self.cliente, estado='en_proceso'))
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get('/')
+        self.assertEqual(respuesta.context['proyectos_activos'], 1)
+        self.assertEqual(respuesta.context['incidencias_abiertas'], 1)
+        self.assertFalse([q for q in consultas.captured_queries if 'COUNT(' in q['sql']])
+
+
+class PaginacionCursorTests(TestCase):
+    """El modo cursor recorre la lista completa sin saltos ni repetidos"""
+
+    def setUp(self):
+        self.user = crear_usuario('staff', is_staff=True)
+        self.client.force_login(self.user)
+        cliente = crear_cliente()
+        # Fechas repetidas para forzar el desempate por id
+        ahora = timezone.now()
+        for i in range(25):
+            proyecto = crear_proyecto(cliente, self.user)
+            Proyecto.objects.filter(pk=proyecto.pk).update(fecha_creacion=ahora - timedelta(days=i // 3))
+
+    def recorrer(self, url, direccion='url_siguiente'):
+        vistos = []
+        while url:
+            pagina = self.client.get(url).context['proyectos']
+            vistos.append([p.pk for p in pagina])
+            url = getattr(pagina, direccion) and '/proyectos/' + getattr(pagina, direccion)
+        return vistos
+
+    def test_recorre_adelante_y_atras(self):
+        esperado = list(Proyecto.objects.order_by('-fecha_creacion', '-id').values_list('pk', flat=True))
+        paginas = self.recorrer('/proyectos/?paginacion=cursor')
+        self.assertEqual([pk for pagina in paginas for pk in pagina], esperado)
+        self.assertEqual([len(p) for p in paginas], [10, 10, 5])
+
+        ultima = self.client.get('/proyectos/?paginacion=cursor').context['proyectos']
+        ultima = self.client.get('/proyectos/' + ultima.url_siguiente).context['proyectos']
+        ultima = self.client.get('/proyectos/' + ultima.url_siguiente).context['proyectos']
+        self.assertFalse(ultima.has_next())
+        hacia_atras = self.recorrer('/proyectos/' + ultima.url_anterior, 'url_anterior')
+        self.assertEqual(hacia_atras, paginas[1::-1])
+
+    def test_cursor_invalido_vuelve_al_inicio(self):
+        pagina = self.client.get('/proyectos/?cursor=no-es-un-cursor').context['proyectos']
+        self.assertEqual(len(pagina), 10)
+        self.assertFalse(pagina.has_previous())
+
+    def test_sin_count_salvo_que_se_pida(self):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/proyectos/?paginacion=cursor')
+        self.assertFalse([q for q in consultas.captured_queries if 'COUNT(' in q['sql']])
+        pagina = self.client.get('/proyectos/?paginacion=cursor&total=1').context['proyectos']
+        self.assertEqual(pagina.total, 25)
+
+
+MEDIA_PRUEBAS = tempfile.mkdtemp(prefix='sirius-test-media-')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_PRUEBAS)
+class ExportacionTests(TestCase):
+    """Las vistas encolan; el trabajo se ejecuta aquí en el mismo proceso"""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        self.user = crear_usuario('staff', is_staff=True)
+        self.client.force_login(self.user)
+        self.cliente = crear_cliente()
+
+    def exportar(self, url):
+        respuesta = self.client.post(url)
+        self.assertEqual(respuesta.status_code, 202)
+        pk = respuesta.json()['id']
+        self.assertEqual(self.client.get(respuesta.json()['url_estado']).json()['estado'], 'pendiente')
+        self.assertEqual(trabajos.reclamar(5), [pk])
+        self.assertEqual(trabajos.ejecutar(pk), 'completado')
+
+        estado = self.client.get(f'/exportaciones/{pk}/').json()
+        self.assertEqual(estado['progreso'], estado['total'])
+        descarga = self.client.get(estado['url_descarga'])
+        self.assertIn('attachment', descarga['Content-Disposition'])
+        return b''.join(descarga.streaming_content)
+
+    def test_planilla_completa_y_filtrada(self):
+        for i in range(5):
+            crear_proyecto(self.cliente, self.user, nombre=f'Proyecto {i}', estado='en_proceso' if i % 2 else 'cotizado')
+
+        contenido = self.exportar('/proyectos/exportar-excel/?estado=en_proceso')
+        ws = openpyxl.load_workbook(BytesIO(contenido)).active
+        filas = list(ws.values)
+        self.assertEqual(filas[0][:2], ('ID', 'Nombre'))
+        self.assertEqual(sorted(fila[1] for fila in filas[1:]), ['Proyecto 1', 'Proyecto 3'])
+        self.assertGreaterEqual(ws.column_dimensions['C'].width, len(str(self.cliente)))
+
+    def test_pdf_incluye_todas_las_filas(self):
+        for i in range(40):
+            crear_proyecto(self.cliente, self.user, nombre=f'Proyecto {i}')
+
+        pdf = self.exportar('/proyectos/exportar-pdf/')
+        # 35 filas por página: las 40 filas ocupan dos páginas, sin tope de 20
+        self.assertEqual(len(re.findall(rb'/Type /Page\b(?!s)', pdf)), 2)
+
+    def test_trabajo_de_otro_usuario_no_visible(self):
+        trabajo = trabajos.encolar(crear_usuario('otro'), 'excel', {})
+        self.assertEqual(self.client.get(f'/exportaciones/{trabajo.pk}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/exportaciones/{trabajo.pk}/descargar/').status_code, 404)
+
+    def test_encolar_solo_por_post_y_sin_duplicar(self):
+        url = reverse('exportar_proyectos_excel')
+        self.assertEqual(self.client.get(url).status_code, 405)
+        self.assertFalse(TrabajoExportacion.objects.exists())
+
+        primero = self.client.post(url, {'estado': 'cotizado'}).json()['id']
+        self.assertEqual(self.client.post(f'{url}?estado=cotizado').json()['id'], primero)
+        self.assertNotEqual(self.client.post(url, {'estado': 'en_proceso'}).json()['id'], primero)
+        self.assertNotEqual(self.client.post(reverse('exportar_proyectos_pdf'), {'estado': 'cotizado'}).json()['id'],
+                            primero)
+        TrabajoExportacion.objects.filter(pk=primero).update(estado='completado')
+        self.assertNotEqual(self.client.post(url, {'estado': 'cotizado'}).json()['id'], primero)
+
+    def test_recuperar_solo_trabajos_abandonados(self):
+        viejo, reciente = trabajos.encolar(self.user, 'excel', {}), trabajos.encolar(self.user, 'pdf', {})
+        self.assertEqual(sorted(trabajos.reclamar(2)), sorted([viejo.pk, reciente.pk]))
+        TrabajoExportacion.objects.filter(pk=viejo.pk).update(
+            fecha_inicio=timezone.now() - timedelta(seconds=trabajos.TIEMPO_MAXIMO + 1),
+        )
+        self.assertEqual(trabajos.recuperar_colgados(trabajos.TIEMPO_MAXIMO), 1)
+        self.assertEqual(TrabajoExportacion.objects.get(pk=viejo.pk).estado, 'pendiente')
+        self.assertEqual(TrabajoExportacion.objects.get(pk=reciente.pk).estado, 'en_proceso')
+
+    def test_no_se_descarga_antes_de_terminar(self):
+        trabajo = trabajos.encolar(self.user, 'pdf', {})
+        self.assertEqual(self.client.get(f'/exportaciones/{trabajo.pk}/descargar/').status_code, 409)
+        self.assertEqual(trabajos.reclamar(1), [trabajo.pk])
+        self.assertEqual(trabajos.reclamar(1), [])
+
+
+class BusquedaTests(TestCase):
+
+    def setUp(self):
+        self.staff = crear_usuario('staff', is_staff=True)
+        self.cliente = crear_cliente(rut='76543210-3', nombre='Constructora Andina')
+        self.proyecto = crear_proyecto(
+            self.cliente, nombre='Remodelación oficinas centrales', descripcion='Pintura y cableado estructurado',
+        )
+
+    def tipos(self, user, texto):
+        return [(r.tipo, r.objeto_id) for r in busqueda.buscar(user, texto)]
+
+    def test_sincroniza_al_guardar_y_borrar(self):
+        self.assertEqual(self.tipos(self.staff, 'cableado'), [('proyecto', self.proyecto.pk)])
+        self.proyecto.descripcion = 'Climatización'
+        self.proyecto.save()
+        self.assertEqual(self.tipos(self.staff, 'cableado'), [])
+        self.assertEqual(self.tipos(self.staff, 'climatizacion'), [('proyecto', self.proyecto.pk)])
+        self.proyecto.delete()
+        self.assertEqual(self.tipos(self.staff, 'climatizacion'), [])
+
+    def test_prefijos_y_todas_las_palabras(self):
+        self.assertEqual(self.tipos(self.staff, 'remodel ofic'), [('proyecto', self.proyecto.pk)])
+        self.assertEqual(self.tipos(self.staff, 'remodelación piscina'), [])
+        self.assertEqual(self.tipos(self.staff, 'REMODELACION'), [('proyecto', self.proyecto.pk)])
+
+    def test_rut_con_y_sin_guion(self):
+        esperado = [('cliente', self.cliente.pk)]
+        self.assertEqual(self.tipos(self.staff, '76543210-3'), esperado)
+        self.assertEqual(self.tipos(self.staff, '765432103'), esperado)
+
+    def test_respeta_alcance(self):
+        otro = crear_cliente(rut='22222222-2', nombre='Otra Empresa')
+        usuario_cliente = crear_usuario('cli', 'cliente', cliente=otro)
+        self.assertEqual(self.tipos(usuario_cliente, 'cableado'), [])
+        self.assertEqual(self.tipos(usuario_cliente, 'andina'), [])
+        self.assertEqual(self.tipos(usuario_cliente, 'otra empresa'), [('cliente', otro.pk)])
+
+        empleado = crear_usuario('empleado')
+        self.assertEqual(self.tipos(empleado, 'cableado'), [])
+        Proyecto.objects.filter(pk=self.proyecto.pk).update(responsable=empleado)
+        self.assertEqual(self.tipos(empleado, 'cableado'), [('proyecto', self.proyecto.pk)])
+
+    def test_reindexar_reconstruye(self):
+        IndiceBusqueda.objects.all().delete()
+        self.assertEqual(self.tipos(self.staff, 'cableado'), [])
+        self.assertEqual(busqueda.reindexar()['proyecto'], 1)
+        self.assertEqual(self.tipos(self.staff, 'cableado'), [('proyecto', self.proyecto.pk)])
+
+    def test_vista(self):
+        self.client.force_login(self.staff)
+        respuesta = self.client.get('/buscar/', {'q': 'cableado'})
+        self.assertContains(respuesta, f'/proyectos/{self.proyecto.pk}/')
+        respuesta = self.client.get('/buscar/', {'q': 'andina', 'tipo': 'proyecto'})
+        self.assertEqual(len(respuesta.context['resultados']), 0)
+
+
+class AutocompletadoTests(TestCase):
+
+    def setUp(self):
+        self.staff = crear_usuario('staff', is_staff=True)
+        self.cliente = crear_cliente()
+        self.proyectos = [crear_proyecto(self.cliente, nombre=f'Obra {i:02d}') for i in range(25)]
+
+    def test_widget_solo_renderiza_lo_elegido(self):
+        html = str(IncidenciaForm()['proyecto'])
+        self.assertEqual(html.count('<option'), 1)
+        self.assertIn('data-autocompletar="/ajax/proyectos/"', html)
+
+        elegido = self.proyectos[3]
+        with self.assertNumQueries(1):
+            html = str(IncidenciaForm(initial={'proyecto': elegido.pk})['proyecto'])
+        self.assertEqual(html.count('<option'), 2)
+        self.assertIn(f'value="{elegido.pk}" selected', html)
+
+    def test_validacion_en_el_servidor(self):
+        datos = {'titulo': 'Falla', 'descripcion': 'x', 'tipo_incidencia': 'tecnica', 'prioridad': 'media'}
+        self.assertTrue(IncidenciaForm({**datos, 'proyecto': self.proyectos[0].pk}).is_valid())
+        form = IncidenciaForm({**datos, 'proyecto': 999_999})
+        self.assertFalse(form.is_valid())
+        self.assertIn('proyecto', form.errors)
+
+    def test_endpoints_por_prefijo_y_paginados(self):
+        self.client.force_login(self.staff)
+        datos = self.client.get('/ajax/proyectos/', {'q': 'obra'}).json()
+        self.assertEqual(len(datos['results']), 20)
+        self.assertTrue(datos['pagination']['more'])
+        datos = self.client.get('/ajax/proyectos/', {'q': 'obra', 'page': 2}).json()
+        self.assertEqual(len(datos['results']), 5)
+        self.assertFalse(datos['pagination']['more'])
+
+        self.assertEqual(len(self.client.get('/ajax/clientes/', {'q': '1111'}).json()['results']), 1)
+        self.assertEqual(self.client.get('/ajax/usuarios/', {'q': 'sta'}).json()['results'][0]['text'], 'staff')
+
+    def test_endpoints_respetan_alcance(self):
+        otro = crear_cliente(rut='22222222-2')
+        self.client.force_login(crear_usuario('cli', 'cliente', cliente=otro))
+        self.assertEqual(self.client.get('/ajax/proyectos/', {'q': 'obra'}).json()['results'], [])
+        self.assertEqual(self.client.get('/ajax/usuarios/').json()['results'], [])
+        clientes = self.client.get('/ajax/clientes/').json()['results']
+        self.assertEqual([c['id'] for c in clientes], [otro.pk])
+
+
+class FiltrosCacheadosTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.cliente = crear_cliente(nombre='Andina')
+        self.proyecto = crear_proyecto(self.cliente, nombre='Galpón')
+
+    def opciones(self, form_class, campo):
+        return [etiqueta for valor, etiqueta in form_class()[campo].field.widget.choices if valor]
+
+    def test_opciones_se_calculan_una_vez(self):
+        with self.assertNumQueries(1):
+            str(IncidenciaFiltroForm()['proyecto'])
+        with self.assertNumQueries(0):
+            html = str(IncidenciaFiltroForm()['proyecto'])
+        self.assertIn('Galpón - Andina', html)
+
+    def test_validacion_contra_ids_cacheados(self):
+        self.opciones(ProyectoFiltroForm, 'cliente')
+        with self.assertNumQueries(0):
+            form = ProyectoFiltroForm({'cliente': self.cliente.pk})
+            self.assertTrue(form.is_valid())
+            self.assertEqual(form.cleaned_data['cliente'], self.cliente.pk)
+            self.assertFalse(ProyectoFiltroForm({'cliente': 999_999}).is_valid())
+            self.assertFalse(ProyectoFiltroForm({'cliente': 'x'}).is_valid())
+
+    def test_invalidacion_por_cambios(self):
+        self.assertEqual(self.opciones(ProyectoFiltroForm, 'cliente'), [str(self.cliente)])
+        with self.captureOnCommitCallbacks(execute=True):
+            otro = crear_cliente(rut='22222222-2', nombre='Boreal')
+        self.assertEqual(self.opciones(ProyectoFiltroForm, 'cliente'), [str(self.cliente), str(otro)])
+        otro.activo = False
+        with self.captureOnCommitCallbacks(execute=True):
+            otro.save()
+        self.assertEqual(self.opciones(ProyectoFiltroForm, 'cliente'), [str(self.cliente)])
+
+        # La etiqueta del proyecto depende también del cliente
+        self.cliente.nombre = 'Andina Sur'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente.save()
+        self.assertEqual(self.opciones(IncidenciaFiltroForm, 'proyecto'), ['Galpón - Andina Sur'])
+
+    def test_login_no_invalida_usuarios(self):
+        user = crear_usuario('empleado')
+        version = cacheo.versiones('usuarios')
+        self.client.login(username='empleado', password='clave-segura-123')
+        self.assertEqual(cacheo.versiones('usuarios'), version)
+        user.first_name = 'Ana'
+        with self.captureOnCommitCallbacks(execute=True):
+            user.save()
+        self.assertNotEqual(cacheo.versiones('usuarios'), version)
+
+    def test_invalida_al_confirmar(self):
+        """Una lectura antes del commit no deja las filas viejas bajo la versión nueva"""
+        antes = self.opciones(ProyectoFiltroForm, 'cliente')
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.cliente.nombre = 'Andina Sur'
+                self.cliente.save()
+                # Antes del commit la versión no cambia: nada se recalcula bajo la versión nueva
+                self.assertEqual(self.opciones(ProyectoFiltroForm, 'cliente'), antes)
+        self.assertEqual(self.opciones(ProyectoFiltroForm, 'cliente'), [str(self.cliente)])
+
+
+class GetCondicionalTests(TestCase):
+    def setUp(self):
+        self.cliente = crear_cliente()
+        self.proyecto = crear_proyecto(self.cliente)
+        self.servicio = Servicio.objects.create(
+            nombre='Tablero', tipo_servicio='electrico', descripcion='Tablero', precio_base=100,
+        )
+        self.proyecto.servicios.add(self.servicio)
+        self.user = crear_usuario('empleado')
+        self.proyecto.responsable = self.user
+        self.proyecto.save()
+        self.incidencia = crear_incidencia(self.proyecto)
+        self.client.force_login(self.user)
+        self.url = reverse('proyecto_detalle', args=[self.proyecto.pk])
+
+    def etag(self, url=None):
+        respuesta = self.client.get(url or self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn('no-cache', respuesta['Cache-Control'])
+        return respuesta['ETag']
+
+    def assertNoModificado(self, etag, url=None):
+        # Sesión, usuario y la consulta de validadores; nada de la vista ni la plantilla
+        with self.assertNumQueries(3), self.assertTemplateNotUsed('proyectos/detalle.html'):
+            respuesta = self.client.get(url or self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+
+    def assertModificado(self, etag, url=None):
+        respuesta = self.client.get(url or self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_proyecto_sin_cambios(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta['Last-Modified'][-3:], 'GMT')
+        self.assertNoModificado(respuesta['ETag'])
+        respuesta = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=respuesta['Last-Modified'])
+        self.assertEqual(respuesta.status_code, 304)
+
+    def test_cambios_relacionados_invalidan(self):
+        cambios = [
+            lambda: self.proyecto.save(),
+            lambda: self.cliente.save(),
+            lambda: self.incidencia.save(),
+            lambda: crear_presupuesto(self.cliente, proyecto=self.proyecto),
+            lambda: Presupuesto.objects.get().save(),
+            lambda: self.servicio.save(),
+            lambda: self.proyecto.servicios.clear(),
+            lambda: Incidencia.objects.all().delete(),
+        ]
+        for cambio in cambios:
+            etag = self.etag()
+            cambio()
+            self.assertModificado(etag)
+
+    def test_etag_por_usuario(self):
+        etag = self.etag()
+        self.client.force_login(crear_usuario('otro', is_staff=True))
+        self.assertModificado(etag)
+
+    def test_mensajes_pendientes(self):
+        request = RequestFactory().get(self.url)
+        request.user = self.user
+        request.session = self.client.session
+        request._messages = FallbackStorage(request)
+        messages.success(request, 'Guardado')
+        self.assertIsNone(condicional.PROYECTO[0](request, pk=self.proyecto.pk))
+        self.assertIsNone(condicional.PROYECTO[1](request, pk=self.proyecto.pk))
+        # El mensaje sigue pendiente para la respuesta completa
+        self.assertEqual(len(messages.get_messages(request)), 1)
+
+    def test_no_visible(self):
+        dueno = crear_usuario('dueno', tipo_usuario='cliente', cliente=crear_cliente(rut='22222222-2'))
+        self.client.force_login(dueno)
+        respuesta = self.client.get(self.url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(respuesta.status_code, 404)
+
+    def test_catalogo_servicios(self):
+        url = reverse('servicio_lista')
+        etag = self.etag(url)
+        self.assertNoModificado(etag, url)
+        self.servicio.activo = False
+        self.servicio.save()
+        self.assertModificado(etag, url)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class PaginasCacheadasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.servicio = Servicio.objects.create(
+            nombre='Tablero', tipo_servicio='electrico', descripcion='Tablero', precio_base=100,
+        )
+
+    def test_portada_publica(self):
+        primera = self.client.get(reverse('home'))
+        with self.assertTemplateNotUsed('home.html'):
+            segunda = self.client.get(reverse('home'))
+        self.assertEqual(segunda.content, primera.content)
+        # Con parámetros no se usa la cache
+        with self.assertTemplateUsed('home.html'):
+            self.client.get(reverse('home'), {'x': '1'})
+
+    def test_catalogo_se_invalida_al_guardar_servicio(self):
+        self.client.force_login(crear_usuario('empleado'))
+        url = reverse('servicio_lista')
+        with self.assertTemplateUsed('servicios/lista.html'):
+            self.client.get(url)
+        with self.assertTemplateNotUsed('servicios/lista.html'):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.servicio.precio_base = 200
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servicio.save()
+        with self.assertTemplateUsed('servicios/lista.html'):
+            self.client.get(url)
+
+    def test_fragmento_servicios_en_portada(self):
+        self.client.force_login(crear_usuario('admin', is_staff=True))
+        self.assertContains(self.client.get(reverse('home')), 'Tablero')
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertContains(self.client.get(reverse('home')), 'Tablero')
+        self.assertFalse([q for q in consultas.captured_queries if 'siriusApp_servicio' in q['sql']])
+
+        self.servicio.nombre = 'Tablero trifásico'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.servicio.save()
+        self.assertContains(self.client.get(reverse('home')), 'Tablero trifásico')
+
+
+def rut_valido(numero):
+    return f'{numero}-{digito_verificador(numero)}'
+
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.servicio = Servicio.objects.create(
+            nombre='Tablero', tipo_servicio='electrico', descripcion='Tablero', precio_base=100,
+        )
+        self.cliente = crear_cliente(rut=rut_valido(76543210), nombre='Constructora Andina')
+
+    def csv(self, filas, separador=','):
+        texto = '\n'.join(separador.join(fila) for fila in filas)
+        return BytesIO(texto.encode('utf-8-sig'))
+
+    def test_validar_rut(self):
+        validar_rut('76.543.210-3')
+        validar_rut(rut_valido(12345670).lower())
+        with self.assertRaises(ValidationError):
+            validar_rut('76543210-4')
+        form = ClienteForm({
+            'nombre': 'X', 'rut': '76543211-3', 'email': 'x@sirius.test', 'telefono': '1',
+            'direccion': 'X', 'tipo_cliente': 'empresa',
+        })
+        self.assertIn('rut', form.errors)
+
+    def test_cliente_antiguo_con_rut_invalido_se_edita(self):
+        antiguo = crear_cliente(rut='76543210-4', nombre='Antiguo')
+        datos = {
+            'nombre': 'Antiguo SpA', 'rut': antiguo.rut, 'email': antiguo.email, 'telefono': '1',
+            'direccion': 'X', 'tipo_cliente': 'empresa',
+        }
+        self.assertTrue(ClienteForm(datos, instance=antiguo).is_valid())
+        form = ClienteForm(dict(datos, rut='76543211-3'), instance=antiguo)
+        self.assertIn('rut', form.errors)
+
+    def test_clientes_csv(self):
+        version = cacheo.versiones('clientes')
+        archivo = self.csv([
+            ['nombre', 'RUT', 'email', 'telefono', 'direccion', 'tipo_cliente'],
+            ['Boreal', '12.345.670-' + digito_verificador(12345670), 'b@sirius.test', '1', 'Calle', 'Empresa'],
+            ['Digito malo', '12345671-0', 'd@sirius.test', '1', 'Calle', 'empresa'],
+            ['Repetido', self.cliente.rut, 'r@sirius.test', '1', 'Calle', 'empresa'],
+            ['Sin correo', rut_valido(12345672), '', '1', 'Calle', 'particular'],
+        ], separador=';')
+        resultado = importacion.importar('clientes', archivo, 'csv')
+
+        self.assertEqual(resultado.creados, 1)
+        self.assertEqual([numero for numero, _ in resultado.errores], [3, 4, 5])
+        self.assertIn('rut', resultado.errores[0][1])
+        boreal = Cliente.objects.get(nombre='Boreal')
+        self.assertEqual(boreal.rut, rut_valido(12345670))
+        self.assertEqual(contadores.leer(contadores.clave(Cliente))[contadores.clave(Cliente)], 2)
+        self.assertTrue(IndiceBusqueda.objects.filter(tipo='cliente', objeto_id=boreal.pk).exists())
+        self.assertNotEqual(cacheo.versiones('clientes'), version)
+
+    def libro_proyectos(self, cantidad, extra=()):
+        libro = openpyxl.Workbook()
+        hoja = libro.active
+        hoja.append(['nombre', 'cliente', 'descripcion', 'fecha_inicio', 'fecha_fin_estimada',
+                     'estado', 'prioridad', 'presupuesto_total', 'servicios'])
+        for i in range(cantidad):
+            hoja.append([f'Galpón {i}', self.cliente.rut, 'Obra', date(2026, 1, 1), '31/12/2026',
+                         'En Proceso', 'alta', 1500000, 'Tablero'])
+        for fila in extra:
+            hoja.append(fila)
+        archivo = BytesIO()
+        libro.save(archivo)
+        archivo.seek(0)
+        return archivo
+
+    def test_proyectos_xlsx(self):
+        resultado = importacion.importar('proyectos', self.libro_proyectos(3, [
+            ['Sin cliente', '99999999-9', 'Obra', date(2026, 1, 1), date(2026, 2, 1), '', '', 1, ''],
+            ['Servicio raro', self.cliente.rut, 'Obra', date(2026, 1, 1), date(2026, 2, 1), '', '', 1, 'Otro'],
+            ['Sin fecha', self.cliente.rut, 'Obra', '', date(2026, 2, 1), '', '', 1, ''],
+        ]), 'xlsx')
+
+        self.assertEqual(resultado.creados, 3)
+        self.assertEqual([numero for numero, _ in resultado.errores], [5, 6, 7])
+        proyecto = Proyecto.objects.get(nombre='Galpón 0')
+        self.assertEqual(proyecto.estado, 'en_proceso')
+        self.assertEqual(proyecto.fecha_fin_estimada, date(2026, 12, 31))
+        self.assertEqual(list(proyecto.servicios.all()), [self.servicio])
+        self.assertEqual(contadores.leer(contadores.clave(Proyecto, 'estado', 'en_proceso'))[
+            contadores.clave(Proyecto, 'estado', 'en_proceso')], 3)
+        self.assertEqual(IndiceBusqueda.objects.filter(tipo='proyecto').count(), 3)
+
+    def test_consultas_por_lote_no_por_fila(self):
+        def consultas(cantidad):
+            archivo = self.libro_proyectos(cantidad)
+            with CaptureQueriesContext(connection) as capturadas:
+                importacion.importar('proyectos', archivo, 'xlsx')
+            return len(capturadas)
+
+        consultas(1)  # crea las filas de Contador
+        self.assertEqual(consultas(5), consultas(40))
+
+    def test_proyectos_sin_ids_del_insert(self):
+        """Como en MySQL: bulk_create no devuelve ids y no se cae a save() por fila"""
+        otro = Servicio.objects.create(nombre='Cableado', tipo_servicio='electrico', descripcion='C', precio_base=1)
+        archivo = self.libro_proyectos(2, [
+            ['Galpón 0', self.cliente.rut, 'Obra', date(2026, 1, 1), date(2026, 2, 1), '', '', 1, 'Cableado'],
+        ])
+        caracteristicas = type(connection.features)
+        with mock.patch.object(caracteristicas, 'can_return_rows_from_bulk_insert', False), \
+                mock.patch.object(Proyecto, 'save', side_effect=AssertionError('save() por fila')):
+            resultado = importacion.importar('proyectos', archivo, 'xlsx')
+
+        self.assertEqual(resultado.creados, 3)
+        primero, segundo = Proyecto.objects.filter(nombre='Galpón 0').order_by('id')
+        self.assertEqual(list(primero.servicios.all()), [self.servicio])
+        self.assertEqual(list(segundo.servicios.all()), [otro])
+        self.assertEqual(IndiceBusqueda.objects.filter(tipo='proyecto').count(), 3)
+        self.assertEqual(contadores.leer(contadores.clave(Proyecto))[contadores.clave(Proyecto)], 3)
+
+    def test_proyectos_sin_ids_con_filas_ajenas(self):
+        """Si otra importación inserta proyectos que calzan, el lote se deshace en vez de mezclarlos"""
+        insertar = importacion.Importador.guardar
+
+        def insertar_con_ajena(importador, objetos):
+            insertar(importador, objetos)
+            crear_proyecto(self.cliente, nombre='Galpón 0')
+
+        caracteristicas = type(connection.features)
+        with mock.patch.object(caracteristicas, 'can_return_rows_from_bulk_insert', False), \
+                mock.patch.object(importacion.Importador, 'guardar', insertar_con_ajena):
+            resultado = importacion.importar('proyectos', self.libro_proyectos(2), 'xlsx')
+
+        self.assertEqual(resultado.creados, 0)
+        self.assertEqual([numero for numero, _ in resultado.errores], [2, 3])
+        self.assertIn('no se guardó', resultado.errores[0][1])
+        self.assertFalse(Proyecto.objects.exists())
+
+    def test_admin(self):
+        admin = crear_usuario('admin', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        url = reverse('admin:siriusApp_servicio_importar')
+        self.assertContains(self.client.get(reverse('admin:siriusApp_servicio_changelist')), url)
+        self.assertContains(self.client.get(url), 'precio_base')
+        archivo = SimpleUploadedFile('servicios.csv', (
+            'nombre,tipo_servicio,descripcion,precio_base\n'
+            'Cableado,electrico,Cableado,2500\n'
+            'Tablero,electrico,Duplicado,100\n'
+        ).encode())
+        respuesta = self.client.post(url, {'archivo': archivo})
+        self.assertContains(respuesta, 'Ya existe un servicio llamado')
+        self.assertTrue(Servicio.objects.filter(nombre='Cableado').exists())
+
+
+class CambiosMasivosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empleado = crear_usuario('empleado')
+        self.proyecto = crear_proyecto(crear_cliente(), responsable=self.empleado)
+        ajeno = crear_proyecto(crear_cliente(rut='22222222-2'))
+        self.incidencias = [crear_incidencia(self.proyecto, titulo=f'Falla {i}') for i in range(4)]
+        self.ajena = crear_incidencia(ajeno)
+
+    def test_consultas_constantes(self):
+        def consultas(cantidad):
+            ids = [i.pk for i in self.incidencias[:cantidad]]
+            with CaptureQueriesContext(connection) as capturadas:
+                transiciones.cambiar_incidencias(Incidencia.objects.filter(pk__in=ids), prioridad='alta')
+            return len(capturadas)
+
+        self.assertEqual(consultas(1), consultas(4))
+
+    def test_resolver_varias(self):
+        antes = Incidencia.objects.get(pk=self.incidencias[0].pk).fecha_modificacion
+        actualizadas = transiciones.cambiar_incidencias(
+            Incidencia.objects.filter(proyecto=self.proyecto), estado='resuelta', solucion='Cambio de fusible',
+        )
+        self.assertEqual(actualizadas, 4)
+        for incidencia in Incidencia.objects.filter(proyecto=self.proyecto):
+            self.assertEqual(incidencia.estado, 'resuelta')
+            self.assertIsNotNone(incidencia.fecha_resolucion)
+            self.assertGreater(incidencia.fecha_modificacion, antes)
+        self.assertIsNone(Incidencia.objects.get(pk=self.ajena.pk).fecha_resolucion)
+        self.assertEqual(contadores.reconciliar(corregir=False), {})
+        self.assertEqual(busqueda.buscar(self.empleado, 'fusible').count(), 4)
+
+    def test_endpoint_solo_filas_visibles(self):
+        self.client.force_login(self.empleado)
+        url = reverse('incidencia_cambio_masivo')
+        ids = [i.pk for i in self.incidencias[:2]] + [self.ajena.pk]
+        respuesta = self.client.post(url, {'ids': ids, 'estado': 'cerrada', 'asignado_a': self.empleado.pk})
+        self.assertEqual(respuesta.json(), {'actualizadas': 2})
+        self.assertEqual(Incidencia.objects.filter(estado='cerrada', asignado_a=self.empleado).count(), 2)
+        self.assertEqual(Incidencia.objects.get(pk=self.ajena.pk).estado, 'abierta')
+
+        self.assertEqual(self.client.post(url, {'ids': ids}).status_code, 400)
+        self.assertEqual(self.client.post(url, {'ids': ['x'], 'estado': 'cerrada'}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 405)
+
+    def test_accion_admin(self):
+        self.client.force_login(crear_usuario('admin', is_staff=True, is_superuser=True))
+        otro = crear_proyecto(self.proyecto.cliente)
+        respuesta = self.client.post(reverse('admin:siriusApp_proyecto_changelist'), {
+            'action': 'cambiar_estado_prioridad', '_selected_action': [self.proyecto.pk, otro.pk],
+            'estado': 'completado', 'prioridad': '',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertEqual(Proyecto.objects.filter(estado='completado').count(), 2)
+        self.assertEqual(contadores.reconciliar(corregir=False), {})
+
+
+class AdminListadosTests(TestCase):
+    """Consultas por página de los listados del admin: fijas aunque crezcan las tablas"""
+    MAXIMO_CONSULTAS = 8
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(crear_usuario('admin', is_staff=True, is_superuser=True))
+        # Usuarios creados de antemano: crear uno invalida las opciones cacheadas del ActionForm
+        self.usuarios = [crear_usuario(f'empleado{i}') for i in range(3)]
+        self.filas = 0
+
+    def agregar_filas(self, cantidad):
+        for _ in range(cantidad):
+            self.filas += 1
+            usuario = self.usuarios[self.filas % len(self.usuarios)]
+            cliente = crear_cliente(rut=rut_valido(10000000 + self.filas), nombre=f'Cliente {self.filas}')
+            proyecto = crear_proyecto(
+                cliente, responsable=usuario, creado_por=usuario, fecha_inicio=date(2020 + self.filas % 4, 3, 1),
+            )
+            crear_incidencia(proyecto, reportado_por=usuario, asignado_a=usuario)
+            crear_presupuesto(cliente, proyecto=proyecto, creado_por=usuario)
+
+    def consultas(self, url):
+        with CaptureQueriesContext(connection) as capturadas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return len(capturadas)
+
+    def test_consultas_por_pagina(self):
+        self.agregar_filas(2)
+        for modelo in ['proyecto', 'incidencia', 'presupuesto', 'cliente']:
+            with self.subTest(modelo=modelo):
+                url = reverse(f'admin:siriusApp_{modelo}_changelist')
+                self.client.get(url)
+                self.agregar_filas(10)
+                pocas = self.consultas(url)
+                self.agregar_filas(10)
+                self.assertEqual(self.consultas(url), pocas)
+                self.assertLessEqual(pocas, self.MAXIMO_CONSULTAS)
+
+    def test_filtro_autocompletar_solo_elegido(self):
+        self.agregar_filas(3)
+        cliente = Cliente.objects.get(nombre='Cliente 2')
+        url = reverse('admin:siriusApp_proyecto_changelist')
+        respuesta = self.client.get(url, {'cliente__id__exact': cliente.pk})
+        self.assertEqual(list(respuesta.context['cl'].result_list), list(cliente.proyectos.all()))
+        self.assertContains(respuesta, str(cliente))
+        self.assertNotContains(respuesta, 'Cliente 1 -')
+        self.assertContains(respuesta, 'data-autocompletar="/admin/autocomplete/')
+
+    def test_filtro_autocompletar_filtra_al_escribir(self):
+        self.agregar_filas(12)
+        respuesta = self.client.get(reverse('admin:siriusApp_proyecto_changelist'))
+        # Lo que hace main.js: la URL del select más el texto en el parámetro que indica
+        select = re.search(
+            r'name="cliente__id__exact" data-autocompletar="([^"]+)" data-autocompletar-param="(\w+)"',
+            respuesta.content.decode(),
+        )
+        url, parametro = html.unescape(select[1]), select[2]
+        resultados = self.client.get(f'{url}&{parametro}=Cliente+11&page=1').json()['results']
+        self.assertEqual([r['text'] for r in resultados], [str(Cliente.objects.get(nombre='Cliente 11'))])
+
+    def test_filtro_anio(self):
+        self.agregar_filas(4)
+        url = reverse('admin:siriusApp_proyecto_changelist')
+        respuesta = self.client.get(url, {'fecha_inicio__year': 2021})
+        self.assertEqual(respuesta.context['cl'].result_count, 1)
+        for anio in range(2020, 2024):
+            self.assertContains(respuesta, f'fecha_inicio__year={anio}')
+
+    def test_total_estimado_sin_filtros(self):
+        self.agregar_filas(3)
+        queryset = Proyecto.objects.all()
+        with mock.patch.object(paginacion, 'estimar_filas', return_value=50000):
+            self.assertEqual(paginacion.PaginadorEstimado(queryset, 100).count, 50000)
+            self.assertEqual(paginacion.PaginadorEstimado(queryset.filter(nombre='Otro'), 100).count, 0)
+        with mock.patch.object(paginacion, 'estimar_filas', return_value=100):
+            self.assertEqual(paginacion.PaginadorEstimado(queryset, 100).count, 3)
+
+
+class ApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.empleado = crear_usuario('empleado')
+        cliente = crear_cliente()
+        self.proyectos = [
+            crear_proyecto(cliente, responsable=self.empleado, nombre=f'Propio {i}', estado='en_proceso' if i % 2 else 'cotizado')
+            for i in range(5)
+        ]
+        self.ajeno = crear_proyecto(crear_cliente(rut='22222222-2'), nombre='Ajeno')
+        self.url = reverse('api_lista', args=['proyectos'])
+        self.client.force_login(self.empleado)
+
+    def test_sin_sesion_401(self):
+        self.client.logout()
+        respuesta = self.client.get(self.url)
+        self.assertEqual(respuesta.status_code, 401)
+        self.assertIn('error', respuesta.json())
+
+    def test_campos_pedidos_y_alcance(self):
+        datos = self.client.get(self.url, {'fields': 'id,nombre,cliente_nombre'}).json()
+        self.assertEqual(len(datos['resultados']), 5)
+        self.assertEqual(set(datos['resultados'][0]), {'id', 'nombre', 'cliente_nombre'})
+        self.assertNotIn('Ajeno', [fila['nombre'] for fila in datos['resultados']])
+
+        respuesta = self.client.get(self.url, {'fields': 'id,clave'})
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['campos'], ['clave'])
+
+    def test_filtros_del_formulario(self):
+        datos = self.client.get(self.url, {'estado': 'en_proceso', 'fields': 'estado'}).json()
+        self.assertEqual([fila['estado'] for fila in datos['resultados']], ['en_proceso', 'en_proceso'])
+        self.assertEqual(self.client.get(self.url, {'estado': 'otro'}).status_code, 400)
+
+    def test_paginacion_por_cursor(self):
+        vistos = []
+        url, params = self.url, {'limite': 2, 'fields': 'id', 'total': '1'}
+        while url:
+            datos = self.client.get(url, params).json()
+            self.assertEqual(datos['total'], 5)
+            vistos += [fila['id'] for fila in datos['resultados']]
+            url, params = datos['siguiente'], None
+        self.assertEqual(vistos, [p.pk for p in reversed(self.proyectos)])
+
+    def test_etag_304(self):
+        respuesta = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+        Proyecto.objects.filter(pk=self.proyectos[0].pk).update(estado='pausado')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 200)
+
+    def test_detalle(self):
+        url = reverse('api_detalle', args=['proyectos', self.proyectos[0].pk])
+        self.assertEqual(self.client.get(url, {'fields': 'nombre'}).json(), {'nombre': 'Propio 0'})
+        self.assertEqual(self.client.get(reverse('api_detalle', args=['proyectos', self.ajeno.pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('api_lista', args=['usuarios'])).status_code, 404)
+
+    def test_consultas_constantes(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get(self.url, {'limite': 2, 'fields': 'id,cliente_nombre,responsable_usuario'})
+        with CaptureQueriesContext(connection) as muchas:
+            self.client.get(self.url, {'limite': 5, 'fields': 'id,cliente_nombre,responsable_usuario'})
+        self.assertEqual(len(pocas), len(muchas))
+
+
+ADJUNTOS_PRUEBAS = tempfile.mkdtemp(prefix='sirius-test-adjuntos-')
+
+
+@override_settings(MEDIA_ROOT=ADJUNTOS_PRUEBAS)
+class AdjuntosTests(TestCase):
+    CONTENIDO = b'plano electrico ' * 1000
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(ADJUNTOS_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        # Los archivos sobreviven al rollback de cada test
+        shutil.rmtree(Incidencia.archivo_adjunto.field.storage.path('adjuntos'), ignore_errors=True)
+        self.empleado = crear_usuario('empleado')
+        self.proyecto = crear_proyecto(crear_cliente(), responsable=self.empleado)
+        self.client.force_login(self.empleado)
+
+    def subir(self, contenido, nombre='plano.pdf'):
+        respuesta = self.client.post(reverse('incidencia_crear'), {
+            'proyecto': self.proyecto.pk, 'titulo': 'Con plano', 'descripcion': 'Ver adjunto',
+            'tipo_incidencia': 'tecnica', 'prioridad': 'media',
+            'archivo_adjunto': SimpleUploadedFile(nombre, contenido),
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        return Incidencia.objects.latest('pk')
+
+    def test_mismo_contenido_un_archivo(self):
+        primera = self.subir(self.CONTENIDO)
+        segunda = self.subir(self.CONTENIDO, 'otro-nombre.PDF')
+        self.assertEqual(primera.archivo_adjunto.name, segunda.archivo_adjunto.name)
+        self.assertRegex(primera.archivo_adjunto.name, r'^adjuntos/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(Adjunto.objects.get().referencias, 2)
+
+        segunda.archivo_adjunto = SimpleUploadedFile('nuevo.pdf', b'otro contenido')
+        segunda.save()
+        primera.delete()
+        self.assertEqual(
+            dict(Adjunto.objects.values_list('nombre', 'referencias')),
+            {primera.archivo_adjunto.name: 0, segunda.archivo_adjunto.name: 1},
+        )
+        self.assertEqual(adjuntos.reconciliar(corregir=False), {})
+
+    def test_recolectar_huerfanos(self):
+        incidencia = self.subir(self.CONTENIDO)
+        nombre = incidencia.archivo_adjunto.name
+        # Subida cuya incidencia nunca se guardó: archivo sin fila
+        suelto = Incidencia.archivo_adjunto.field.storage.save('adjuntos/suelto.txt', BytesIO(b'suelto'))
+        self.assertEqual(adjuntos.recolectar(gracia=timedelta(0)), (1, 6))
+        self.assertFalse(Incidencia.archivo_adjunto.field.storage.exists(suelto))
+
+        incidencia.delete()
+        self.assertEqual(adjuntos.recolectar(gracia=timedelta(hours=1)), (0, 0))
+        self.assertEqual(adjuntos.recolectar(gracia=timedelta(0)), (1, len(self.CONTENIDO)))
+        self.assertFalse(Incidencia.archivo_adjunto.field.storage.exists(nombre))
+        self.assertFalse(Adjunto.objects.exists())
+
+    def test_descarga_con_rangos(self):
+        incidencia = self.subir(self.CONTENIDO)
+        url = reverse('incidencia_adjunto', args=[incidencia.pk])
+
+        completa = self.client.get(url)
+        self.assertEqual(b''.join(completa.streaming_content), self.CONTENIDO)
+        self.assertEqual(completa['Accept-Ranges'], 'bytes')
+
+        parcial = self.client.get(url, HTTP_RANGE='bytes=100-199')
+        self.assertEqual(parcial.status_code, 206)
+        self.assertEqual(parcial['Content-Range'], f'bytes 100-199/{len(self.CONTENIDO)}')
+        self.assertEqual(b''.join(parcial.streaming_content), self.CONTENIDO[100:200])
+
+        final = self.client.get(url, HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(final.streaming_content), self.CONTENIDO[-5:])
+        self.assertEqual(self.client.get(url, HTTP_RANGE=f'bytes={len(self.CONTENIDO)}-').status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=completa['ETag']).status_code, 304)
+
+        self.client.force_login(crear_usuario('ajeno'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=ADJUNTOS_PRUEBAS)
+class SubidasTests(TestCase):
+    CONTENIDO = bytes(range(256)) * 400
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(ADJUNTOS_PRUEBAS, ignore_errors=True)
+
+    def setUp(self):
+        self.empleado = crear_usuario('empleado')
+        proyecto = crear_proyecto(crear_cliente(), responsable=self.empleado)
+        self.incidencia = crear_incidencia(proyecto)
+        self.client.force_login(self.empleado)
+
+    def crear(self, nombre='video.mp4', tamano=None):
+        return self.client.post(reverse('subida_crear', args=[self.incidencia.pk]), {
+            'nombre': nombre, 'tamano': len(self.CONTENIDO) if tamano is None else tamano,
+        })
+
+    def enviar(self, url, offset, datos, **extra):
+        return self.client.put(
+            url, datos, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset), **extra,
+        )
+
+    def test_subida_completa_por_partes(self):
+        sesion = self.crear().json()
+        mitad = len(self.CONTENIDO) // 2
+        self.assertEqual(self.enviar(sesion['url'], 0, self.CONTENIDO[:mitad]).json()['offset'], mitad)
+        # Reanudar: el cliente pregunta dónde quedó
+        self.assertEqual(self.client.get(sesion['url'])['Upload-Offset'], str(mitad))
+        self.enviar(sesion['url'], mitad, self.CONTENIDO[mitad:])
+
+        respuesta = self.client.post(sesion['url_finalizar'], {'sha256': hashlib.sha256(self.CONTENIDO).hexdigest()})
+        self.assertEqual(respuesta.status_code, 200)
+        self.incidencia.refresh_from_db()
+        self.assertTrue(self.incidencia.archivo_adjunto.name.endswith('.mp4'))
+        with self.incidencia.archivo_adjunto.open('rb') as archivo:
+            self.assertEqual(archivo.read(), self.CONTENIDO)
+        self.assertEqual(Adjunto.objects.get().referencias, 1)
+        self.assertFalse(SesionSubida.objects.exists())
+
+    def test_offset_y_tamano_validados(self):
+        sesion = self.crear().json()
+        respuesta = self.enviar(sesion['url'], 10, b'datos')
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(respuesta.json()['offset'], 0)
+        self.assertEqual(self.enviar(sesion['url'], 0, self.CONTENIDO + b'extra').status_code, 400)
+        self.assertEqual(self.client.post(sesion['url_finalizar']).status_code, 409)
+        self.assertEqual(self.crear(nombre='script.exe').status_code, 400)
+        self.assertEqual(self.crear(tamano=subidas.TAMANO_MAXIMO + 1).status_code, 400)
+
+    def test_corte_a_mitad_de_parte(self):
+        sesion = SesionSubida.objects.get(pk=self.crear().json()['id'])
+
+        class FlujoCortado(BytesIO):
+            def read(self, tamano=-1):
+                bloque = super().read(tamano)
+                if not bloque:
+                    raise UnreadablePostError('conexión cortada')
+                return bloque
+
+        # Llegan 1000 de los 5000 bytes anunciados: se conserva lo recibido
+        self.assertEqual(subidas.recibir(sesion, 0, FlujoCortado(self.CONTENIDO[:1000]), 5000), 1000)
+        self.assertEqual(self.client.get(reverse('subida_parte', args=[sesion.pk])).json()['offset'], 1000)
+
+    def test_hash_distinto_descarta(self):
+        sesion = self.crear(tamano=4).json()
+        self.enviar(sesion['url'], 0, b'abcd')
+        self.assertEqual(self.client.post(sesion['url_finalizar'], {'sha256': '0' * 64}).status_code, 400)
+        self.assertFalse(SesionSubida.objects.exists())
+
+    def test_vencidas_y_ajenas(self):
+        sesion = self.crear().json()
+        self.client.force_login(crear_usuario('ajeno'))
+        self.assertEqual(self.client.get(sesion['url']).status_code, 404)
+        self.client.force_login(self.empleado)
+
+        SesionSubida.objects.update(fecha_modificacion=timezone.now() - subidas.VIGENCIA - timedelta(minutes=1))
+        self.assertEqual(self.enviar(sesion['url'], 0, b'tarde').status_code, 410)
+        self.assertEqual(subidas.limpiar(), (1, 0))
+        self.assertFalse(SesionSubida.objects.exists())
+
+
+class InstrumentacionTests(TestCase):
+    def setUp(self):
+        self.empleado = crear_usuario('empleado')
+        self.client.force_login(self.empleado)
+
+    def metricas(self, respuesta):
+        return dict(
+            re.match(r'\s*(\w+)(.*)', entrada).groups() for entrada in respuesta['Server-Timing'].split(',')
+        )
+
+    def test_server_timing(self):
+        crear_proyecto(crear_cliente(), responsable=self.empleado)
+        with self.assertLogs('siriusApp.instrumentacion', 'INFO') as registro:
+            respuesta = self.client.get(reverse('proyecto_lista'))
+        metricas = self.metricas(respuesta)
+        self.assertEqual(set(metricas), {'db', 'dup', 'tpl', 'view', 'total'})
+        self.assertNotEqual(metricas['tpl'], ';dur=0.0')
+        self.assertIn('url=proyecto_lista metodo=GET', registro.output[0])
+        self.assertEqual(registro.records[0].instrumentacion['status'], 200)
+
+    def test_sin_log_de_peticiones(self):
+        # Con el logger en WARNING no se arma ni se emite la línea por petición
+        nivel = instrumentacion.logger.level
+        self.addCleanup(instrumentacion.logger.setLevel, nivel)
+        instrumentacion.logger.setLevel('WARNING')
+        with mock.patch.object(instrumentacion.logger, 'info') as info:
+            respuesta = self.client.get(reverse('proyecto_lista'))
+        self.assertIn('Server-Timing', respuesta)
+        info.assert_not_called()
+
+    def test_repetidas(self):
+        medicion = instrumentacion.Medicion()
+        with medicion.medir():
+            for pk in range(3):
+                Cliente.objects.filter(pk=pk).exists()
+            Proyecto.objects.count()
+        self.assertEqual((medicion.consultas, medicion.duplicadas), (4, 2))
+        sql, veces, _ = medicion.repetidas()[0]
+        self.assertIn('siriusApp_cliente', sql)
+        self.assertEqual(veces, 3)
+
+    @override_settings(PRESUPUESTO_CONSULTAS={'default': 50, 'proyecto_lista': 1})
+    def test_presupuesto_excedido(self):
+        with self.assertLogs('siriusApp.instrumentacion', 'WARNING') as registro:
+            self.client.get(reverse('proyecto_lista'))
+        self.assertIn('url=proyecto_lista hizo', registro.output[0])
+        self.assertIn('SELECT', registro.output[0])
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajuste = override_settings(METRICAS_DIR=carpeta)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.carpeta = carpeta
+
+    def valor(self, texto, serie):
+        for linea in texto.splitlines():
+            if linea.startswith(serie + ' '):
+                return float(linea.split()[-1])
+        return 0
+
+    def test_histograma_acumulado(self):
+        serie = 'sirius_peticion_segundos_bucket{url="prueba_histograma",le="%s"}'
+        texto = metricas.registro.exponer()
+        antes = [self.valor(texto, serie % le) for le in ('0.01', '1', '+Inf')]
+        for segundos in (0.003, 0.2, 90):
+            metricas.observar_peticion('prueba_histograma', 'GET', 200, segundos)
+        texto = metricas.registro.exponer()
+        despues = [self.valor(texto, serie % le) for le in ('0.01', '1', '+Inf')]
+        self.assertEqual([b - a for a, b in zip(antes, despues)], [1, 2, 3])
+        self.assertIn('# TYPE sirius_peticion_segundos histogram', texto)
+
+    def test_suma_otros_procesos(self):
+        serie = 'sirius_peticiones_total{url="prueba_procesos",metodo="GET",status="500"}'
+        metricas.observar_peticion('prueba_procesos', 'GET', 500, 0.1)
+        propio = self.valor(metricas.registro.exponer(), serie)
+        # El volcado de este proceso, renombrado, hace de otro worker
+        metricas.registro.volcar()
+        volcado = os.path.join(self.carpeta, f'{metricas.registro.proceso}.json')
+        os.replace(volcado, os.path.join(self.carpeta, '1.json'))
+        self.assertEqual(self.valor(metricas.registro.exponer(), serie), propio * 2)
+
+    @skipUnless(metricas.fcntl, 'Sin flock no se consolidan los volcados')
+    def test_consolida_procesos_terminados(self):
+        serie = 'sirius_peticiones_total{url="prueba_consolidar",metodo="GET",status="200"}'
+        metricas.observar_peticion('prueba_consolidar', 'GET', 200, 0.1)
+        metricas.registro.volcar()
+        propio = self.valor(metricas.registro.exponer(), serie)
+        volcado = os.path.join(self.carpeta, f'{metricas.registro.proceso}.json')
+        for nombre in ('100-muerto.json', '100-vivo.json'):
+            shutil.copy(volcado, os.path.join(self.carpeta, nombre))
+        # El worker vivo tiene tomado su lock; el muerto dejó el suyo libre
+        vivo = metricas._bloquear(os.path.join(self.carpeta, '100-vivo.lock'))
+        self.addCleanup(vivo.close)
+        open(os.path.join(self.carpeta, '100-muerto.lock'), 'w').close()
+
+        self.assertEqual(self.valor(metricas.registro.exponer(), serie), propio * 3)
+        self.assertEqual(
+            sorted(n for n in os.listdir(self.carpeta) if n.startswith(('100-', 'acumulado.json'))),
+            ['100-vivo.json', '100-vivo.lock', 'acumulado.json'],
+        )
+        # Lo consolidado se sigue sumando en las lecturas siguientes
+        self.assertEqual(self.valor(metricas.registro.exponer(), serie), propio * 3)
+
+    def test_vista_solo_staff(self):
+        self.client.force_login(crear_usuario('empleado'))
+        self.client.get(reverse('proyecto_lista'))
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 302)
+        self.client.force_login(crear_usuario('admin', is_staff=True))
+        respuesta = self.client.get(reverse('metricas'))
+        self.assertEqual(respuesta['Content-Type'], metricas.TIPO_CONTENIDO)
+        self.assertContains(respuesta, 'sirius_peticiones_total{url="proyecto_lista",metodo="GET",status="200"}')
+
+
+class PerfiladoTests(TestCase):
+    def setUp(self):
+        carpeta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, carpeta, ignore_errors=True)
+        ajuste = override_settings(PERFILES_DIR=carpeta, PERFILES_MAXIMO=2)
+        ajuste.enable()
+        self.addCleanup(ajuste.disable)
+        self.staff = crear_usuario('admin', is_staff=True)
+        self.client.force_login(self.staff)
+
+    def test_sin_firma_no_perfila(self):
+        respuesta = self.client.get(reverse('proyecto_lista'), HTTP_X_PERFILAR='perfilar:falsa:firma')
+        self.assertNotIn('X-Perfil', respuesta)
+        self.assertEqual(perfilado.listar(), [])
+
+    def test_firma_y_listado(self):
+        respuesta = self.client.get(reverse('proyecto_lista'), {'perfilar': perfilado.firmar()})
+        nombre = respuesta['X-Perfil']
+        self.assertTrue(nombre.startswith(timezone.now().strftime('%Y%m%d')))
+        self.assertContains(self.client.get(reverse('perfilado_lista')), nombre)
+        detalle = self.client.get(reverse('perfilado_detalle', args=[nombre]))
+        self.assertContains(detalle, 'proyecto_lista')
+        self.assertEqual(self.client.get(reverse('perfilado_detalle', args=['settings.py'])).status_code, 404)
+
+    @override_settings(PERFILADO_MUESTREO={'proyecto_lista': 1})
+    def test_muestreo_y_rotacion(self):
+        for _ in range(3):
+            self.assertIn('X-Perfil', self.client.get(reverse('proyecto_lista')))
+        self.assertNotIn('X-Perfil', self.client.get(reverse('perfil')))
+        self.assertEqual(len(perfilado.listar()), 2)
+
+    def test_solo_staff(self):
+        self.client.force_login(crear_usuario('empleado'))
+        self.assertEqual(self.client.get(reverse('perfilado_lista')).status_code, 302)
+
+
+class SinteticoTests(TestCase):
+    def test_presupuestos_con_correlativos_reservados(self):
+        usuarios = sintetico.generar_usuarios(2)
+        clientes = sintetico.generar_clientes(3, semilla=1)
+        servicios = sintetico.generar_servicios(4, semilla=1)
+        proyectos = sintetico.generar_proyectos(10, clientes, usuarios, semilla=1)
+        self.assertEqual(
+            sintetico.asignar_servicios(proyectos, servicios, semilla=1),
+            Proyecto.servicios.through.objects.count(),
+        )
+        sintetico.generar_presupuestos(30, proyectos, usuarios, semilla=1)
+
+        numeros = list(Presupuesto.objects.values_list('numero_presupuesto', flat=True))
+        self.assertEqual(len(set(numeros)), 30)
+        for presupuesto in Presupuesto.objects.select_related('proyecto'):
+            self.assertEqual(presupuesto.cliente_id, presupuesto.proyecto.cliente_id)
+        # Un alta normal sigue después de los reservados
+        anio = timezone.localdate().year
+        reservados = SecuenciaPresupuesto.objects.filter(anio=anio).values_list('ultimo', flat=True).first() or 0
+        nuevo = crear_presupuesto(Cliente.objects.get(pk=clientes[0]))
+        self.assertEqual(nuevo.numero_presupuesto, f'PRES-{anio}-{reservados + 1:04d}')
+
+
+@skipUnless(connection.vendor in ('sqlite', 'mysql'), 'EXPLAIN solo se interpreta en SQLite y MySQL')
+class PlanesConsultaTests(TestCase):
+    """Las consultas de las páginas más usadas no recorren tablas grandes ni ordenan en temporales.
+
+    Se capturan los SELECT de cada petición con execute_wrapper, se les pide
+    EXPLAIN y se revisa el plan: en SQLite 'SCAN tabla' sin índice o 'USE TEMP
+    B-TREE'; en MySQL type=ALL o 'Using filesort'/'Using temporary'. Ordenar
+    en un temporal se admite solo donde se pide con ordenar=True: filas ya
+    acotadas al usuario (incidencias de un empleado o de un cliente, que
+    vienen de varios proyectos) y filtros por rango de fechas, que no pueden
+    compartir índice con el orden de la lista.
+    """
+    GRANDES = {modelo._meta.db_table for modelo in (Cliente, Proyecto, Presupuesto, Incidencia)}
+
+    @classmethod
+    def setUpTestData(cls):
+        usuarios = sintetico.generar_usuarios(5)
+        cls.clientes = sintetico.generar_clientes(20, semilla=1)
+        proyectos = sintetico.generar_proyectos(200, cls.clientes, usuarios, semilla=1)
+        sintetico.generar_presupuestos(200, proyectos, usuarios, semilla=1)
+        sintetico.generar_incidencias(600, proyectos, usuarios, semilla=1)
+        cls.admin = crear_usuario('admin', 'administrador', is_staff=True)
+        cls.empleado = User.objects.get(pk=Proyecto.objects.exclude(responsable=None).values('responsable')[:1])
+        PerfilUsuario.objects.create(user=cls.empleado, tipo_usuario='empleado')
+        cls.cliente = crear_usuario('cliente', 'cliente', cliente=Cliente.objects.get(pk=cls.clientes[0]))
+
+    def setUp(self):
+        cache.clear()
+
+    def capturar(self, funcion):
+        consultas = []
+
+        def capturar(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                consultas.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capturar):
+            funcion()
+        return consultas
+
+    def plan(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                return [fila[-1] for fila in cursor.fetchall()]
+            cursor.execute('EXPLAIN ' + sql, params)
+            columnas = [columna[0].lower() for columna in cursor.description]
+            return [dict(zip(columnas, fila)) for fila in cursor.fetchall()]
+
+    def tablas(self, sql):
+        """Alias de Django (U0, T3) -> tabla, leídos de FROM/JOIN del SQL"""
+        alias = {}
+        for tabla, nombre in re.findall(r'(?:FROM|JOIN)\s+[`"]?(\w+)[`"]?(?:\s+(?:AS\s+)?[`"]?([A-Z]\d+)\b)?', sql):
+            alias[tabla] = tabla
+            if nombre:
+                alias[nombre] = tabla
+        return alias
+
+    def problemas(self, plan, sql, ordenar=False):
+        """Pasos del plan que recorren una tabla grande completa u ordenan en un temporal"""
+        alias = self.tablas(sql)
+        malos = []
+        if connection.vendor == 'sqlite':
+            tablas = {
+                alias.get(tabla, tabla) for paso in plan for tabla in re.findall(r'^(?:SCAN|SEARCH) (\w+)', paso)
+            }
+            for paso in plan:
+                tabla = re.match(r'SCAN (\w+)', paso)
+                if tabla and alias.get(tabla[1], tabla[1]) in self.GRANDES and 'USING' not in paso:
+                    malos.append(paso)
+                elif 'USE TEMP B-TREE' in paso and not ordenar and tablas & self.GRANDES:
+                    malos.append(paso)
+        else:
+            for paso in plan:
+                extra = paso.get('extra') or ''
+                tabla = alias.get(paso.get('table'), paso.get('table'))
+                if tabla not in self.GRANDES:
+                    continue
+                if paso.get('type') == 'ALL':
+                    malos.append(f"{paso['table']}: type=ALL")
+                if not ordenar and ('Using filesort' in extra or 'Using temporary' in extra):
+                    malos.append(f"{paso['table']}: {extra}")
+        return malos
+
+    def revisar(self, funcion, ordenar=False, **contexto):
+        consultas = self.capturar(funcion)
+        self.assertTrue(consultas)
+        for sql, params in consultas:
+            with self.subTest(sql=sql[:120], **contexto):
+                self.assertEqual(self.problemas(self.plan(sql, params), sql, ordenar), [], sql)
+
+    def pagina(self, usuario, url, datos, clave):
+        """GET de una lista y lectura de sus filas (la plantilla no siempre las usa)"""
+        self.client.force_login(usuario)
+        respuesta = self.client.get(url, datos)
+        self.assertEqual(respuesta.status_code, 200)
+        list(respuesta.context[clave])
+
+    def test_proyecto_lista(self):
+        proyecto = Proyecto.objects.exclude(responsable=None).first()
+        filtros = [
+            {}, {'cliente': proyecto.cliente_id}, {'estado': 'en_proceso'}, {'prioridad': 'alta'},
+            {'fecha_inicio': '2024-01-01'}, {'fecha_fin': '2024-01-01'}, {'responsable': proyecto.responsable_id},
+            {'estado': 'en_proceso', 'prioridad': 'alta'}, {'paginacion': 'cursor'},
+        ]
+        for usuario in (self.admin, self.empleado, self.cliente):
+            for datos in filtros:
+                rango = 'fecha_inicio' in datos or 'fecha_fin' in datos
+                self.revisar(lambda: self.pagina(usuario, reverse('proyecto_lista'), datos, 'proyectos'),
+                             ordenar=rango, usuario=usuario.username, **datos)
+
+    def test_incidencia_lista(self):
+        filtros = [
+            {}, {'proyecto': Proyecto.objects.first().pk}, {'tipo_incidencia': 'tecnica'}, {'estado': 'abierta'},
+            {'prioridad': 'critica'}, {'paginacion': 'cursor'},
+        ]
+        for usuario in (self.admin, self.empleado, self.cliente):
+            for datos in filtros:
+                self.revisar(lambda: self.pagina(usuario, reverse('incidencia_lista'), datos, 'incidencias'),
+                             ordenar=usuario != self.admin, usuario=usuario.username, **datos)
+
+    def test_presupuesto_lista(self):
+        for usuario in (self.admin, self.empleado, self.cliente):
+            for datos in ({}, {'paginacion': 'cursor'}):
+                self.revisar(lambda: self.pagina(usuario, reverse('presupuesto_lista'), datos, 'presupuestos'),
+                             usuario=usuario.username, **datos)
+
+    def test_home(self):
+        for usuario in (self.admin, self.empleado, self.cliente):
+            self.client.force_login(usuario)
+            self.revisar(lambda: self.client.get(reverse('home')), usuario=usuario.username)
+
+    def test_numeracion_presupuesto(self):
+        cliente = Cliente.objects.get(pk=self.clientes[0])
+        self.revisar(lambda: crear_presupuesto(cliente))
+
+    def test_detecta_planes_malos(self):
+        """El chequeo falla de verdad: filtrar u ordenar por un campo sin índice"""
+        # Dentro de una subconsulta la tabla aparece con el alias de Django (U0)
+        en_subconsulta = Incidencia.objects.filter(
+            proyecto__in=Subquery(Proyecto.objects.filter(descripcion='x').order_by().values('pk')),
+        ).order_by()
+        for consulta in (
+            Incidencia.objects.filter(titulo='x').order_by(), Incidencia.objects.order_by('titulo')[:10], en_subconsulta,
+        ):
+            consultas = self.capturar(lambda: list(consulta))
+            problemas = [paso for sql, params in consultas for paso in self.problemas(self.plan(sql, params), sql)]
+            self.assertTrue(problemas, consultas)
@@ -0,0 +1,125 @@
+"""Cola de exportaciones en la base de datos, procesada por `manage.py procesar_exportaciones`"""
+import logging
+import os
+import tempfile
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, connections
+from django.utils import timezone
+
+from . import exportacion, metricas
+from .forms import ProyectoFiltroForm
+from .models import Proyecto, TrabajoExportacion
+
+logger = logging.getLogger(__name__)
+
+ESCRITORES = {
+    'excel': (exportacion.escribir_proyectos_xlsx, 'xlsx'),
+    'pdf': (exportacion.escribir_proyectos_pdf, 'pdf'),
+}
+# Segundos en proceso tras los que un trabajo se da por abandonado (--recuperar)
+TIEMPO_MAXIMO = 60 * 60
+
+
+def encolar(usuario, formato, parametros):
+    """Registra una exportación pendiente con los filtros de la petición.
+
+    Si el usuario ya tiene la misma exportación pendiente o en proceso, devuelve esa.
+    """
+    existente = TrabajoExportacion.objects.filter(
+        usuario=usuario, formato=formato, parametros=parametros, estado__in=['pendiente', 'en_proceso'],
+    ).order_by('id').first()
+    if existente is not None:
+        return existente
+    return TrabajoExportacion.objects.create(usuario=usuario, formato=formato, parametros=parametros)
+
+
+def reclamar(limite):
+    """Marca como en proceso hasta `limite` trabajos pendientes y devuelve sus ids.
+
+    El UPDATE condicionado al estado hace que dos workers no tomen el mismo
+    trabajo, sin depender de SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    candidatos = (
+        TrabajoExportacion.objects.filter(estado='pendiente')
+        .order_by('fecha_creacion', 'id').values_list('id', flat=True)[:limite * 2]
+    )
+    reclamados = []
+    for pk in candidatos:
+        tomado = TrabajoExportacion.objects.filter(pk=pk, estado='pendiente').update(
+            estado='en_proceso', fecha_inicio=timezone.now(),
+        )
+        if tomado:
+            reclamados.append(pk)
+            if len(reclamados) == limite:
+                break
+    return reclamados
+
+
+def recuperar_colgados(tiempo_maximo=None):
+    """Vuelve a la cola los trabajos que quedaron en proceso por un worker caído.
+
+    Solo los que empezaron hace más de `tiempo_maximo` segundos
+    (EXPORTACION_TIEMPO_MAXIMO): los más recientes pueden ser de un worker vivo.
+    """
+    if tiempo_maximo is None:
+        tiempo_maximo = getattr(settings, 'EXPORTACION_TIEMPO_MAXIMO', TIEMPO_MAXIMO)
+    limite = timezone.now() - timedelta(seconds=tiempo_maximo)
+    return TrabajoExportacion.objects.filter(estado='en_proceso', fecha_inicio__lt=limite).update(
+        estado='pendiente', progreso=0, fecha_inicio=None,
+    )
+
+
+def marcar_error(pk, mensaje):
+    TrabajoExportacion.objects.filter(pk=pk).exclude(estado='completado').update(
+        estado='error', error=mensaje, fecha_fin=timezone.now(),
+    )
+
+
+def ejecutar(pk):
+    """Genera el archivo de un trabajo ya reclamado; devuelve el estado final"""
+    trabajo = TrabajoExportacion.objects.select_related('usuario').get(pk=pk)
+    escribir, extension = ESCRITORES[trabajo.formato]
+    inicio = time.perf_counter()
+    try:
+        # Mismo alcance y filtros que tendría la vista para ese usuario
+        proyectos = ProyectoFiltroForm(trabajo.parametros).filtrar(
+            Proyecto.objects.visible_to(trabajo.usuario)
+        )
+        total = proyectos.count()
+        TrabajoExportacion.objects.filter(pk=pk).update(total=total)
+
+        def progreso(filas):
+            TrabajoExportacion.objects.filter(pk=pk).update(progreso=filas)
+
+        with tempfile.TemporaryFile(suffix=f'.{extension}') as archivo:
+            filas = escribir(proyectos, archivo, progreso=progreso)
+            tamano = archivo.seek(0, os.SEEK_END)
+            archivo.seek(0)
+            nombre = f'proyectos_sirius_{trabajo.pk}_{timezone.now():%Y%m%d_%H%M%S}.{extension}'
+            trabajo.archivo.save(nombre, File(archivo), save=False)
+    except Exception:
+        logger.exception('Falló la exportación %s', pk)
+        marcar_error(pk, traceback.format_exc())
+        return 'error'
+
+    TrabajoExportacion.objects.filter(pk=pk).update(
+        estado='completado', archivo=trabajo.archivo.name, progreso=filas, total=filas,
+        fecha_fin=timezone.now(),
+    )
+    metricas.EXPORTACION_SEGUNDOS.observar(time.perf_counter() - inicio, trabajo.formato)
+    metricas.EXPORTACION_BYTES.observar(tamano, trabajo.formato)
+    # El worker puede terminar antes del próximo volcado periódico
+    metricas.registro.volcar()
+    return 'completado'
+
+
+def inicializar_proceso():
+    """Inicializador del pool: el hijo abre sus propias conexiones en vez de heredar las del padre"""
+    for conexion in connections.all(initialized_only=True):
+        conexion.connection = None
+    close_old_connections()
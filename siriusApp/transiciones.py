@@ -0,0 +1,75 @@
+"""Cambios masivos de estado, prioridad y asignación con un solo UPDATE.
+
+update() no dispara señales ni llena los campos auto_now. Por eso aquí se fija
+a mano fecha_modificacion, que invalida las ETag de condicional.py, y también
+fecha_resolucion de las incidencias resueltas o cerradas. Los contadores se
+ajustan una vez por lote con los valores anteriores leídos bajo bloqueo.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import busqueda, contadores
+from .models import Incidencia
+
+ESTADOS_RESUELTOS = ('resuelta', 'cerrada')
+# Ids por sentencia: el IN (...) queda bajo el límite de parámetros de SQLite
+LOTE = 500
+
+
+def _aplicar(queryset, cambios):
+    """UPDATE ... WHERE id IN (...) sobre las filas de `queryset`; devuelve cuántas cambió"""
+    modelo = queryset.model
+    dimensiones = [d for d in contadores.DIMENSIONES[modelo] if d in cambios]
+    with transaction.atomic():
+        # Solo se bloquea la tabla del modelo, aunque `queryset` tenga joins (visible_to)
+        filas = list(
+            modelo.objects.select_for_update()
+            .filter(pk__in=queryset.order_by().values('pk'))
+            .order_by('pk').values_list('pk', *dimensiones)
+        )
+        actualizadas = 0
+        for inicio in range(0, len(filas), LOTE):
+            ids = [fila[0] for fila in filas[inicio:inicio + LOTE]]
+            actualizadas += modelo.objects.filter(pk__in=ids).update(**cambios)
+
+        deltas = Counter()
+        for _, *anteriores in filas:
+            for dimension, anterior in zip(dimensiones, anteriores):
+                if anterior != cambios[dimension]:
+                    deltas[contadores.clave(modelo, dimension, anterior)] -= 1
+                    deltas[contadores.clave(modelo, dimension, cambios[dimension])] += 1
+        contadores.ajustar(deltas)
+    return actualizadas, [fila[0] for fila in filas]
+
+
+def cambiar_proyectos(queryset, estado=None, prioridad=None):
+    """Cambia estado y/o prioridad de los proyectos de `queryset`; devuelve cuántos cambió"""
+    cambios = {campo: valor for campo, valor in (('estado', estado), ('prioridad', prioridad)) if valor}
+    if not cambios:
+        return 0
+    cambios['fecha_modificacion'] = timezone.now()
+    return _aplicar(queryset, cambios)[0]
+
+
+def cambiar_incidencias(queryset, estado=None, prioridad=None, asignado_a=None, solucion=''):
+    """Cambia estado, prioridad, asignado (id) y/o solución de las incidencias de `queryset`.
+
+    Igual que incidencia_resolver: resolver o cerrar fija fecha_resolucion.
+    Devuelve cuántas cambió.
+    """
+    cambios = {campo: valor for campo, valor in (
+        ('estado', estado), ('prioridad', prioridad), ('asignado_a_id', asignado_a), ('solucion', solucion),
+    ) if valor}
+    if not cambios:
+        return 0
+    ahora = timezone.now()
+    cambios['fecha_modificacion'] = ahora
+    if estado in ESTADOS_RESUELTOS:
+        cambios['fecha_resolucion'] = ahora
+    actualizadas, ids = _aplicar(queryset, cambios)
+    if solucion:
+        # La solución es parte del contenido indexado
+        busqueda.reindexar_filas(Incidencia, ids)
+    return actualizadas
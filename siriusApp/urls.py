@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     # Home
@@ -22,6 +22,7 @@ urlpatterns = [
     path('proyectos/crear/', views.proyecto_crear, name='proyecto_crear'),
     path('proyectos/<int:pk>/', views.proyecto_detalle, name='proyecto_detalle'),
     path('proyectos/<int:pk>/editar/', views.proyecto_editar, name='proyecto_editar'),
+    path('proyectos/cambio-masivo/', views.proyecto_cambio_masivo, name='proyecto_cambio_masivo'),
     
     # Presupuestos
     path('presupuestos/', views.presupuesto_lista, name='presupuesto_lista'),
@@ -32,15 +33,38 @@ urlpatterns = [
     path('incidencias/', views.incidencia_lista, name='incidencia_lista'),
     path('incidencias/crear/', views.incidencia_crear, name='incidencia_crear'),
     path('incidencias/<int:pk>/resolver/', views.incidencia_resolver, name='incidencia_resolver'),
+    path('incidencias/<int:pk>/adjunto/', views.incidencia_adjunto, name='incidencia_adjunto'),
+    path('incidencias/<int:pk>/subidas/', views.subida_crear, name='subida_crear'),
+    path('subidas/<uuid:pk>/', views.subida_parte, name='subida_parte'),
+    path('subidas/<uuid:pk>/finalizar/', views.subida_finalizar, name='subida_finalizar'),
+    path('incidencias/cambio-masivo/', views.incidencia_cambio_masivo, name='incidencia_cambio_masivo'),
     
     # Autenticación
     path('registro/', views.registro, name='registro'),
     path('perfil/', views.perfil, name='perfil'),
     
+    # Búsqueda
+    path('buscar/', views.buscar, name='buscar'),
+    
     # Exportación
     path('proyectos/exportar-excel/', views.exportar_proyectos_excel, name='exportar_proyectos_excel'),
     path('proyectos/exportar-pdf/', views.exportar_proyectos_pdf, name='exportar_proyectos_pdf'),
+    path('exportaciones/<int:pk>/', views.exportacion_estado, name='exportacion_estado'),
+    path('exportaciones/<int:pk>/descargar/', views.exportacion_descargar, name='exportacion_descargar'),
+    
+    # Métricas (Prometheus) y perfilado
+    path('metrics', views.metricas_prometheus, name='metricas'),
+    path('perfilado/', views.perfilado_lista, name='perfilado_lista'),
+    path('perfilado/<str:nombre>/', views.perfilado_detalle, name='perfilado_detalle'),
     
     # AJAX
     path('ajax/calcular-total/', views.calcular_total_presupuesto, name='calcular_total_presupuesto'),
+    path('ajax/clientes/', views.autocompletar_clientes, name='autocompletar_clientes'),
+    path('ajax/proyectos/', views.autocompletar_proyectos, name='autocompletar_proyectos'),
+    path('ajax/usuarios/', views.autocompletar_usuarios, name='autocompletar_usuarios'),
+    path('ajax/servicios/', views.autocompletar_servicios, name='autocompletar_servicios'),
+    
+    # API JSON de solo lectura (app móvil)
+    path('api/v1/<str:recurso>/', api.lista, name='api_lista'),
+    path('api/v1/<str:recurso>/<int:pk>/', api.detalle, name='api_detalle'),
 ]
\ No newline at end of file
@@ -0,0 +1,26 @@
+"""Validadores de datos chilenos (RUT)"""
+from django.core.exceptions import ValidationError
+
+
+def digito_verificador(numero):
+    """Dígito verificador (módulo 11) de un RUT chileno"""
+    suma, factor = 0, 2
+    for digito in reversed(str(numero)):
+        suma += int(digito) * factor
+        factor = 2 if factor == 7 else factor + 1
+    resto = 11 - suma % 11
+    return {11: '0', 10: 'K'}.get(resto, str(resto))
+
+
+def normalizar_rut(valor):
+    """'12.345.678-k' -> '12345678-K'"""
+    return str(valor).replace('.', '').replace(' ', '').strip().upper()
+
+
+def validar_rut(valor):
+    """Revisa el dígito verificador; el formato lo valida el RegexValidator del campo"""
+    numero, _, digito = normalizar_rut(valor).partition('-')
+    if not numero.isdigit() or len(digito) != 1:
+        return
+    if digito_verificador(numero) != digito:
+        raise ValidationError('El dígito verificador del RUT no es válido.', code='rut_invalido')
@@ -1,31 +1,68 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import User
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q
+from django.http import JsonResponse, HttpResponse, FileResponse, Http404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.db.models import Count, Q
 from django.utils import timezone
 from django.core.exceptions import PermissionDenied
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
+from django.core.paginator import Paginator
 from io import BytesIO
-import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+import os
 
-from .models import Cliente, Servicio, Proyecto, Presupuesto, Incidencia, PerfilUsuario
+from . import (
+    almacenamiento, busqueda, cacheo, condicional, contadores, metricas, perfilado, subidas, trabajos, transiciones,
+)
+from .managers import cliente_de
+from .paginacion import paginar
+from .models import (
+    Cliente, Servicio, Proyecto, Presupuesto, Incidencia, PerfilUsuario, TrabajoExportacion, IndiceBusqueda,
+    SesionSubida,
+)
 from .forms import (
     ClienteForm, ServicioForm, ProyectoForm, PresupuestoForm, 
     IncidenciaForm, IncidenciaResolucionForm, CustomUserCreationForm, 
-    PerfilUsuarioForm, ProyectoFiltroForm, IncidenciaFiltroForm
+    PerfilUsuarioForm, ProyectoFiltroForm, IncidenciaFiltroForm,
+    CambioMasivoProyectoForm, CambioMasivoIncidenciaForm, SubidaForm
 )
 
 # Vista principal/home
 def home(request):
     """Página principal con estadísticas generales"""
+    if not request.user.is_authenticated:
+        return _home_publica(request)
+    
+    # Totales precalculados en Contador: una sola lectura indexada
+    claves = {
+        'total_proyectos': contadores.clave(Proyecto),
+        'proyectos_activos': contadores.clave(Proyecto, 'estado', 'en_proceso'),
+        'total_clientes': contadores.clave(Cliente, 'activo', True),
+        'incidencias_abiertas': contadores.clave(Incidencia, 'estado', 'abierta'),
+        'incidencias_en_proceso': contadores.clave(Incidencia, 'estado', 'en_proceso'),
+    }
+    totales = contadores.leer(*claves.values())
+    context = {
+        'total_proyectos': totales[claves['total_proyectos']],
+        'proyectos_activos': totales[claves['proyectos_activos']],
+        'total_clientes': totales[claves['total_clientes']],
+        'incidencias_abiertas': (
+            totales[claves['incidencias_abiertas']] + totales[claves['incidencias_en_proceso']]
+        ),
+        'proyectos_recientes': Proyecto.objects.select_related('cliente')[:5],
+        # Lazy: solo se consulta si el fragmento {% cache %} de la plantilla no está
+        'servicios': Servicio.objects.filter(activo=True)[:4],
+        'version_servicios': cacheo.versiones('servicios')[0],
+    }
+    return render(request, 'home.html', context)
+
+@cacheo.pagina('home', [])
+def _home_publica(request):
+    """Portada para visitantes: igual para todos, se sirve desde la cache"""
     context = {
         'total_proyectos': 0,
         'proyectos_activos': 0,
@@ -34,15 +71,6 @@ def home(request):
         'proyectos_recientes': [],
         'servicios': [],
     }
-    
-    if request.user.is_authenticated:
-        context['total_proyectos'] = Proyecto.objects.count()
-        context['proyectos_activos'] = Proyecto.objects.filter(estado='en_proceso').count()
-        context['total_clientes'] = Cliente.objects.filter(activo=True).count()
-        context['incidencias_abiertas'] = Incidencia.objects.filter(estado__in=['abierta', 'en_proceso']).count()
-        context['proyectos_recientes'] = Proyecto.objects.all()[:5]
-        context['servicios'] = Servicio.objects.filter(activo=True)[:4]
-    
     return render(request, 'home.html', context)
 
 # ============ VISTAS DE CLIENTES ============
@@ -51,9 +79,7 @@ def home(request):
 def cliente_lista(request):
     """Lista de clientes con paginación"""
     clientes = Cliente.objects.filter(activo=True).order_by('nombre')
-    paginator = Paginator(clientes, 10)
-    page = request.GET.get('page')
-    clientes = paginator.get_page(page)
+    clientes = paginar(request, clientes, ['nombre', 'id'])
     
     context = {'clientes': clientes}
     return render(request, 'clientes/lista.html', context)
@@ -103,6 +129,9 @@ def cliente_eliminar(request, pk):
 # ============ VISTAS DE SERVICIOS ============
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(*condicional.SERVICIOS)
+@cacheo.pagina('servicios', ['servicios'])
 def servicio_lista(request):
     """Lista de servicios"""
     servicios = Servicio.objects.filter(activo=True)
@@ -161,39 +190,15 @@ def servicio_eliminar(request, pk):
 @login_required
 def proyecto_lista(request):
     """Lista de proyectos con filtros y paginación"""
-    proyectos = Proyecto.objects.all()
+    # RESTRICCIÓN: clientes ven sus proyectos, empleados los que tienen a cargo
+    proyectos = Proyecto.objects.visible_to(request.user).select_related('cliente', 'responsable')
     filtro_form = ProyectoFiltroForm(request.GET)
     
     # Aplicar filtros
-    if filtro_form.is_valid():
-        if filtro_form.cleaned_data['cliente']:
-            proyectos = proyectos.filter(cliente=filtro_form.cleaned_data['cliente'])
-        if filtro_form.cleaned_data['estado']:
-            proyectos = proyectos.filter(estado=filtro_form.cleaned_data['estado'])
-        if filtro_form.cleaned_data['prioridad']:
-            proyectos = proyectos.filter(prioridad=filtro_form.cleaned_data['prioridad'])
-        if filtro_form.cleaned_data['fecha_inicio']:
-            proyectos = proyectos.filter(fecha_inicio__gte=filtro_form.cleaned_data['fecha_inicio'])
-        if filtro_form.cleaned_data['fecha_fin']:
-            proyectos = proyectos.filter(fecha_fin_estimada__lte=filtro_form.cleaned_data['fecha_fin'])
-        if filtro_form.cleaned_data['responsable']:
-            proyectos = proyectos.filter(responsable=filtro_form.cleaned_data['responsable'])
+    proyectos = filtro_form.filtrar(proyectos)
     
-    # RESTRICCIÓN: Verificar permisos de usuario
-    perfil_usuario = getattr(request.user, 'perfilusuario', None)
-    if perfil_usuario and perfil_usuario.tipo_usuario == 'cliente':
-        # Los clientes solo ven sus proyectos
-        cliente = Cliente.objects.filter(email=request.user.email).first()
-        if cliente:
-            proyectos = proyectos.filter(cliente=cliente)
-    elif not request.user.is_staff:
-        # Usuarios normales (empleados, contratistas) solo ven proyectos donde son responsables
-        proyectos = proyectos.filter(responsable=request.user)
-    
-    # Paginación
-    paginator = Paginator(proyectos, 10)
-    page = request.GET.get('page')
-    proyectos = paginator.get_page(page)
+    # Paginación (?paginacion=cursor para el modo por cursor)
+    proyectos = paginar(request, proyectos, ['-fecha_creacion', '-id'])
     
     context = {
         'proyectos': proyectos,
@@ -220,23 +225,29 @@ def proyecto_crear(request):
     return render(request, 'proyectos/form.html', context)
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(*condicional.PROYECTO)
 def proyecto_detalle(request, pk):
     """Ver detalle del proyecto"""
-    proyecto = get_object_or_404(Proyecto, pk=pk)
-    presupuestos = proyecto.presupuestos.all()
-    incidencias = proyecto.incidencias.all()[:5]  # Últimas 5 incidencias
+    proyecto = get_object_or_404(
+        Proyecto.objects.visible_to(request.user).select_related('cliente', 'responsable', 'creado_por'),
+        pk=pk
+    )
+    presupuestos = proyecto.presupuestos.select_related('cliente', 'creado_por')
+    incidencias = proyecto.incidencias.select_related('reportado_por', 'asignado_a')[:5]  # Últimas 5 incidencias
     
     context = {
         'proyecto': proyecto,
         'presupuestos': presupuestos,
-        'incidencias': incidencias
+        'incidencias': incidencias,
+        'servicios': proyecto.servicios.all()
     }
     return render(request, 'proyectos/detalle.html', context)
 
 @login_required
 def proyecto_editar(request, pk):
     """Editar proyecto existente"""
-    proyecto = get_object_or_404(Proyecto, pk=pk)
+    proyecto = get_object_or_404(Proyecto.objects.visible_to(request.user), pk=pk)
     
     if request.method == 'POST':
         form = ProyectoForm(request.POST, instance=proyecto, user=request.user)
@@ -255,18 +266,10 @@ def proyecto_editar(request, pk):
 @login_required
 def presupuesto_lista(request):
     """Lista de presupuestos"""
-    presupuestos = Presupuesto.objects.all()
-    
-    # Filtrar por cliente si es necesario
-    perfil_usuario = getattr(request.user, 'perfilusuario', None)
-    if perfil_usuario and perfil_usuario.tipo_usuario == 'cliente':
-        cliente = Cliente.objects.filter(email=request.user.email).first()
-        if cliente:
-            presupuestos = presupuestos.filter(cliente=cliente)
+    # Los clientes solo ven sus presupuestos
+    presupuestos = Presupuesto.objects.visible_to(request.user).select_related('cliente', 'proyecto__cliente')
     
-    paginator = Paginator(presupuestos, 10)
-    page = request.GET.get('page')
-    presupuestos = paginator.get_page(page)
+    presupuestos = paginar(request, presupuestos, ['-fecha_creacion', '-id'])
     
     context = {'presupuestos': presupuestos}
     return render(request, 'presupuestos/lista.html', context)
@@ -289,9 +292,14 @@ def presupuesto_crear(request):
     return render(request, 'presupuestos/form.html', context)
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@condition(*condicional.PRESUPUESTO)
 def presupuesto_detalle(request, pk):
     """Ver detalle del presupuesto"""
-    presupuesto = get_object_or_404(Presupuesto, pk=pk)
+    presupuesto = get_object_or_404(
+        Presupuesto.objects.visible_to(request.user).select_related('cliente', 'proyecto__cliente', 'creado_por'),
+        pk=pk
+    )
     context = {'presupuesto': presupuesto}
     return render(request, 'presupuestos/detalle.html', context)
 
@@ -300,27 +308,30 @@ def presupuesto_detalle(request, pk):
 @login_required
 def incidencia_lista(request):
     """Lista de incidencias con filtros"""
-    incidencias = Incidencia.objects.all()
+    incidencias = Incidencia.objects.visible_to(request.user).select_related(
+        'proyecto', 'reportado_por', 'asignado_a'
+    )
     filtro_form = IncidenciaFiltroForm(request.GET)
     
+    # Resumen por estado: los contadores globales sirven para el staff; el resto
+    # necesita un GROUP BY sobre sus incidencias visibles
+    if request.user.is_staff and cliente_de(request.user) is None:
+        resumen = contadores.por_valor(Incidencia, 'estado')
+    else:
+        resumen = dict(incidencias.values_list('estado').annotate(total=Count('pk')).order_by())
+    
     # Aplicar filtros
-    if filtro_form.is_valid():
-        if filtro_form.cleaned_data['proyecto']:
-            incidencias = incidencias.filter(proyecto=filtro_form.cleaned_data['proyecto'])
-        if filtro_form.cleaned_data['tipo_incidencia']:
-            incidencias = incidencias.filter(tipo_incidencia=filtro_form.cleaned_data['tipo_incidencia'])
-        if filtro_form.cleaned_data['estado']:
-            incidencias = incidencias.filter(estado=filtro_form.cleaned_data['estado'])
-        if filtro_form.cleaned_data['prioridad']:
-            incidencias = incidencias.filter(prioridad=filtro_form.cleaned_data['prioridad'])
+    incidencias = filtro_form.filtrar(incidencias)
     
-    paginator = Paginator(incidencias, 10)
-    page = request.GET.get('page')
-    incidencias = paginator.get_page(page)
+    incidencias = paginar(request, incidencias, ['-fecha_reporte', '-id'])
     
     context = {
         'incidencias': incidencias,
-        'filtro_form': filtro_form
+        'filtro_form': filtro_form,
+        'resumen_estados': [
+            {'codigo': codigo, 'etiqueta': etiqueta, 'total': resumen.get(codigo, 0)}
+            for codigo, etiqueta in Incidencia.ESTADO_CHOICES
+        ],
     }
     return render(request, 'incidencias/lista.html', context)
 
@@ -344,7 +355,7 @@ def incidencia_crear(request):
 @login_required
 def incidencia_resolver(request, pk):
     """Resolver incidencia"""
-    incidencia = get_object_or_404(Incidencia, pk=pk)
+    incidencia = get_object_or_404(Incidencia.objects.visible_to(request.user).select_related('proyecto'), pk=pk)
     
     if request.method == 'POST':
         form = IncidenciaResolucionForm(request.POST, instance=incidencia)
@@ -361,6 +372,113 @@ def incidencia_resolver(request, pk):
     context = {'form': form, 'incidencia': incidencia, 'titulo': 'Resolver Incidencia'}
     return render(request, 'incidencias/resolver.html', context)
 
+@login_required
+def incidencia_adjunto(request, pk):
+    """Descargar el adjunto de una incidencia (admite Range para reanudar)"""
+    incidencia = get_object_or_404(Incidencia.objects.visible_to(request.user).only('archivo_adjunto'), pk=pk)
+    if not incidencia.archivo_adjunto:
+        raise Http404('La incidencia no tiene adjunto')
+    extension = os.path.splitext(incidencia.archivo_adjunto.name)[1]
+    return almacenamiento.servir(request, incidencia.archivo_adjunto, f'incidencia-{pk}{extension}')
+
+# ============ SUBIDAS REANUDABLES ============
+# Protocolo en siriusApp/subidas.py
+
+def _estado_subida(sesion):
+    return {
+        'id': str(sesion.pk),
+        'nombre': sesion.nombre,
+        'tamano': sesion.tamano,
+        'offset': sesion.recibido,
+        'parte_maxima': subidas.PARTE_MAXIMA,
+        'url': reverse('subida_parte', args=[sesion.pk]),
+        'url_finalizar': reverse('subida_finalizar', args=[sesion.pk]),
+    }
+
+def _error_subida(error):
+    return JsonResponse({'error': str(error), **error.datos}, status=error.status)
+
+@login_required
+def subida_crear(request, pk):
+    """Abrir una subida reanudable para el adjunto de una incidencia (JSON)"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    incidencia = get_object_or_404(Incidencia.objects.visible_to(request.user).only('pk'), pk=pk)
+    form = SubidaForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errores': form.errors}, status=400)
+    sesion = subidas.crear(request.user, incidencia, form.cleaned_data['nombre'], form.cleaned_data['tamano'])
+    return JsonResponse(_estado_subida(sesion), status=201)
+
+@login_required
+def subida_parte(request, pk):
+    """Estado de la subida (GET) o una parte del archivo (PUT con Upload-Offset)"""
+    sesion = get_object_or_404(SesionSubida, pk=pk, usuario=request.user)
+    if request.method not in ('GET', 'HEAD', 'PUT'):
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    if subidas.vencida(sesion):
+        return JsonResponse({'error': 'La subida expiró'}, status=410)
+    if request.method == 'PUT':
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            longitud = int(request.META['CONTENT_LENGTH'])
+        except (KeyError, ValueError):
+            return JsonResponse({'error': 'Faltan Upload-Offset o Content-Length'}, status=400)
+        try:
+            # Se lee el cuerpo directo del request, por bloques
+            subidas.recibir(sesion, offset, request, longitud)
+        except subidas.ErrorSubida as error:
+            return _error_subida(error)
+    respuesta = JsonResponse(_estado_subida(sesion))
+    respuesta['Upload-Offset'] = sesion.recibido
+    respuesta['Cache-Control'] = 'no-store'
+    return respuesta
+
+@login_required
+def subida_finalizar(request, pk):
+    """Adjuntar a la incidencia el archivo de una subida completa"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    sesion = get_object_or_404(SesionSubida, pk=pk, usuario=request.user)
+    try:
+        incidencia = subidas.finalizar(sesion, request.POST.get('sha256', ''))
+    except subidas.ErrorSubida as error:
+        return _error_subida(error)
+    return JsonResponse({
+        'incidencia': incidencia.pk,
+        'url': reverse('incidencia_adjunto', args=[incidencia.pk]),
+    })
+
+# ============ CAMBIOS MASIVOS ============
+
+def _cambio_masivo(request, form_class, queryset, cambiar):
+    """Aplica el formulario a las filas visibles de `ids` con un solo UPDATE"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido'}, status=405)
+    form = form_class(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errores': form.errors}, status=400)
+    cambios = dict(form.cleaned_data)
+    ids = cambios.pop('ids')
+    actualizadas = cambiar(queryset.filter(pk__in=ids), **cambios)
+    return JsonResponse({'actualizadas': actualizadas})
+
+@login_required
+def proyecto_cambio_masivo(request):
+    """Cambia estado/prioridad de varios proyectos (AJAX)"""
+    return _cambio_masivo(
+        request, CambioMasivoProyectoForm,
+        Proyecto.objects.visible_to(request.user), transiciones.cambiar_proyectos,
+    )
+
+@login_required
+def incidencia_cambio_masivo(request):
+    """Cambia estado/prioridad/asignado de varias incidencias (AJAX)"""
+    return _cambio_masivo(
+        request, CambioMasivoIncidenciaForm,
+        Incidencia.objects.visible_to(request.user), transiciones.cambiar_incidencias,
+    )
+
 # ============ VISTAS DE AUTENTICACIÓN ============
 
 def registro(request):
@@ -373,6 +491,8 @@ def registro(request):
             user = user_form.save()
             perfil = perfil_form.save(commit=False)
             perfil.user = user
+            if perfil.tipo_usuario == 'cliente':
+                perfil.cliente = Cliente.objects.filter(email__iexact=user.email).first()
             perfil.save()
             
             username = user_form.cleaned_data.get('username')
@@ -405,118 +525,184 @@ def perfil(request):
     context = {'form': form, 'perfil': perfil_usuario}
     return render(request, 'registration/perfil.html', context)
 
-# ============ VISTA DE EXPORTACIÓN A EXCEL ============
+# ============ AUTOCOMPLETADO ============
+# Fuentes JSON de los AutocompletarSelect (formato de select2 / admin)
+
+AUTOCOMPLETAR_LIMITE = 20
+
+def _autocompletar(request, queryset, etiqueta=str):
+    """Página de resultados sin COUNT: se pide una fila extra para saber si hay más"""
+    try:
+        pagina = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        pagina = 1
+    inicio = (pagina - 1) * AUTOCOMPLETAR_LIMITE
+    filas = list(queryset[inicio:inicio + AUTOCOMPLETAR_LIMITE + 1])
+    return JsonResponse({
+        'results': [{'id': obj.pk, 'text': etiqueta(obj)} for obj in filas[:AUTOCOMPLETAR_LIMITE]],
+        'pagination': {'more': len(filas) > AUTOCOMPLETAR_LIMITE},
+    })
 
 @login_required
-def exportar_proyectos_excel(request):
-    """Exportar proyectos filtrados a Excel"""
-    proyectos = Proyecto.objects.all()
-    filtro_form = ProyectoFiltroForm(request.GET)
-    
-    # Aplicar los mismos filtros que en la lista
-    if filtro_form.is_valid():
-        if filtro_form.cleaned_data['cliente']:
-            proyectos = proyectos.filter(cliente=filtro_form.cleaned_data['cliente'])
-        if filtro_form.cleaned_data['estado']:
-            proyectos = proyectos.filter(estado=filtro_form.cleaned_data['estado'])
-        if filtro_form.cleaned_data['prioridad']:
-            proyectos = proyectos.filter(prioridad=filtro_form.cleaned_data['prioridad'])
-        if filtro_form.cleaned_data['fecha_inicio']:
-            proyectos = proyectos.filter(fecha_inicio__gte=filtro_form.cleaned_data['fecha_inicio'])
-        if filtro_form.cleaned_data['fecha_fin']:
-            proyectos = proyectos.filter(fecha_fin_estimada__lte=filtro_form.cleaned_data['fecha_fin'])
-        if filtro_form.cleaned_data['responsable']:
-            proyectos = proyectos.filter(responsable=filtro_form.cleaned_data['responsable'])
-    
-    # Crear workbook
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Proyectos Sirius"
-    
-    # Estilos
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_alignment = Alignment(horizontal="center", vertical="center")
-    
-    # Encabezados
-    headers = [
-        'ID', 'Nombre', 'Cliente', 'Estado', 'Prioridad', 
-        'Fecha Inicio', 'Fecha Fin Est.', 'Presupuesto', 'Responsable'
-    ]
-    
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = header_alignment
-    
-    # Datos
-    for row, proyecto in enumerate(proyectos, 2):
-        ws.cell(row=row, column=1, value=proyecto.id)
-        ws.cell(row=row, column=2, value=proyecto.nombre)
-        ws.cell(row=row, column=3, value=str(proyecto.cliente))
-        ws.cell(row=row, column=4, value=proyecto.get_estado_display())
-        ws.cell(row=row, column=5, value=proyecto.get_prioridad_display())
-        ws.cell(row=row, column=6, value=proyecto.fecha_inicio.strftime('%d/%m/%Y'))
-        ws.cell(row=row, column=7, value=proyecto.fecha_fin_estimada.strftime('%d/%m/%Y'))
-        ws.cell(row=row, column=8, value=f"${proyecto.presupuesto_total:,.2f}")
-        ws.cell(row=row, column=9, value=str(proyecto.responsable) if proyecto.responsable else "Sin asignar")
-    
-    # Ajustar ancho de columnas
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Preparar respuesta
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f'proyectos_sirius_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename={filename}'
-    
-    # Guardar workbook en response
-    wb.save(response)
-    return response
+def autocompletar_clientes(request):
+    """Clientes activos por prefijo de nombre o RUT"""
+    q = request.GET.get('q', '').strip()
+    clientes = Cliente.objects.visible_to(request.user).filter(activo=True)
+    if q:
+        clientes = clientes.filter(Q(nombre__istartswith=q) | Q(rut__startswith=q))
+    return _autocompletar(request, clientes.order_by('nombre', 'id'))
+
+@login_required
+def autocompletar_proyectos(request):
+    """Proyectos visibles por prefijo de nombre"""
+    q = request.GET.get('q', '').strip()
+    proyectos = Proyecto.objects.visible_to(request.user).select_related('cliente')
+    if q:
+        proyectos = proyectos.filter(nombre__istartswith=q)
+    return _autocompletar(request, proyectos.order_by('nombre', 'id'))
+
+@login_required
+def autocompletar_usuarios(request):
+    """Usuarios activos por prefijo de usuario, nombre o apellido"""
+    if cliente_de(request.user) is not None:
+        # Los clientes no asignan responsables: no listar el personal
+        return _autocompletar(request, User.objects.none())
+    q = request.GET.get('q', '').strip()
+    usuarios = User.objects.filter(is_active=True)
+    if q:
+        usuarios = usuarios.filter(
+            Q(username__istartswith=q) | Q(first_name__istartswith=q) | Q(last_name__istartswith=q)
+        )
+    return _autocompletar(request, usuarios.order_by('username'))
+
+@login_required
+def autocompletar_servicios(request):
+    """Servicios activos por prefijo de nombre"""
+    q = request.GET.get('q', '').strip()
+    servicios = Servicio.objects.filter(activo=True)
+    if q:
+        servicios = servicios.filter(nombre__istartswith=q)
+    return _autocompletar(request, servicios.order_by('nombre', 'id'))
 
-# ============ VISTA DE EXPORTACIÓN A PDF ============
+# ============ BÚSQUEDA ============
 
 @login_required
+def buscar(request):
+    """Búsqueda de texto completo en proyectos, incidencias, clientes y presupuestos"""
+    texto = request.GET.get('q', '').strip()
+    tipo = request.GET.get('tipo', '')
+    tipos = [tipo] if tipo in busqueda.MODELOS else None
+    resultados = busqueda.buscar(request.user, texto, tipos) if texto else IndiceBusqueda.objects.none()
+
+    paginator = Paginator(resultados, 20)
+    resultados = paginator.get_page(request.GET.get('page'))
+
+    context = {
+        'q': texto,
+        'tipo': tipo,
+        'tipos': IndiceBusqueda.TIPO_CHOICES,
+        'resultados': resultados,
+    }
+    return render(request, 'busqueda/resultados.html', context)
+
+# ============ VISTAS DE EXPORTACIÓN ============
+# Las exportaciones se encolan y las genera `manage.py procesar_exportaciones`.
+# Encolar es solo por POST (con CSRF): un GET de un prefetch o de un <img> no llena la cola
+
+def _encolar_exportacion(request, formato):
+    """Encola la exportación con los filtros de la lista y responde 202 con el id.
+
+    Los filtros vienen en el formulario o en la query string de su action.
+    """
+    parametros = {}
+    for campo in ProyectoFiltroForm.base_fields:
+        valor = request.POST.get(campo) or request.GET.get(campo)
+        if valor:
+            parametros[campo] = valor
+    trabajo = trabajos.encolar(request.user, formato, parametros)
+    return JsonResponse({
+        'id': trabajo.pk,
+        'estado': trabajo.estado,
+        'url_estado': reverse('exportacion_estado', args=[trabajo.pk]),
+    }, status=202)
+
+@login_required
+@require_POST
+def exportar_proyectos_excel(request):
+    """Encolar la exportación de proyectos filtrados a Excel"""
+    return _encolar_exportacion(request, 'excel')
+
+@login_required
+@require_POST
 def exportar_proyectos_pdf(request):
-    """Exportar proyectos a PDF"""
-    proyectos = Proyecto.objects.all()[:20]
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="proyectos_sirius.pdf"'
-    
-    doc = SimpleDocTemplate(response, pagesize=letter)
-    elements = []
-    
-    data = [['Proyecto', 'Cliente', 'Estado', 'Presupuesto']]
-    for p in proyectos:
-        data.append([
-            p.nombre[:30],
-            str(p.cliente)[:25],
-            p.get_estado_display(),
-            f"${p.presupuesto_total:,.0f}"
-        ])
-    
-    table = Table(data)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-    
-    elements.append(table)
-    doc.build(elements)
-    return response
+    """Encolar la exportación de proyectos filtrados a PDF"""
+    return _encolar_exportacion(request, 'pdf')
+
+@login_required
+def exportacion_estado(request, pk):
+    """Estado y progreso de una exportación del usuario"""
+    trabajo = get_object_or_404(TrabajoExportacion, pk=pk, usuario=request.user)
+    datos = {
+        'id': trabajo.pk,
+        'formato': trabajo.formato,
+        'estado': trabajo.estado,
+        'progreso': trabajo.progreso,
+        'total': trabajo.total,
+    }
+    if trabajo.estado == 'completado':
+        datos['url_descarga'] = reverse('exportacion_descargar', args=[trabajo.pk])
+    elif trabajo.estado == 'error':
+        datos['error'] = 'No se pudo generar el archivo.'
+    return JsonResponse(datos)
+
+@login_required
+def exportacion_descargar(request, pk):
+    """Descargar el archivo de una exportación terminada"""
+    trabajo = get_object_or_404(TrabajoExportacion, pk=pk, usuario=request.user)
+    if trabajo.estado != 'completado' or not trabajo.archivo:
+        return JsonResponse({'estado': trabajo.estado, 'error': 'La exportación no está lista'}, status=409)
+    return FileResponse(
+        trabajo.archivo.open('rb'), as_attachment=True, filename=os.path.basename(trabajo.archivo.name),
+    )
+
+# ============ MÉTRICAS ============
+
+@login_required
+@staff_member_required
+@cache_control(no_store=True)
+def metricas_prometheus(request):
+    """Métricas de todos los workers en formato de texto de Prometheus"""
+    return HttpResponse(metricas.registro.exponer(), content_type=metricas.TIPO_CONTENIDO)
+
+# ============ PERFILADO ============
+
+@login_required
+@staff_member_required
+def perfilado_lista(request):
+    """Perfiles capturados y una firma vigente para pedir uno nuevo"""
+    return render(request, 'perfilado/lista.html', {
+        'perfiles': perfilado.listar(),
+        'firma': perfilado.firmar(),
+        'vigencia_minutos': perfilado.VIGENCIA_FIRMA // 60,
+    })
+
+@login_required
+@staff_member_required
+def perfilado_detalle(request, nombre):
+    """Resumen pstats de un perfil, o el .prof con ?descargar=1"""
+    ruta = perfilado.ruta(nombre)
+    if ruta is None or not os.path.exists(ruta):
+        raise Http404('Perfil no encontrado')
+    if request.GET.get('descargar'):
+        return FileResponse(open(ruta, 'rb'), as_attachment=True, filename=nombre)
+    orden = request.GET.get('orden', 'cumulative')
+    if orden not in ('cumulative', 'tottime', 'ncalls'):
+        orden = 'cumulative'
+    return render(request, 'perfilado/detalle.html', {
+        'nombre': nombre,
+        'orden': orden,
+        'resumen': perfilado.resumen(nombre, orden),
+    })
 
 # ============ AJAX PARA CÁLCULOS AUTOMÁTICOS ============
 
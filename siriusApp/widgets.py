@@ -0,0 +1,45 @@
+from django import forms
+from django.urls import reverse
+
+
+class AutocompletarSelect(forms.Select):
+    """Select que solo renderiza las opciones elegidas; el resto se pide por AJAX.
+
+    Igual que AutocompleteSelect del admin: no recorre el queryset del campo,
+    así la página pesa lo mismo con 20 o con 20.000 filas. La validación sigue
+    siendo la del ModelChoiceField (un get por pk).
+    """
+
+    def __init__(self, url_name, attrs=None, choices=()):
+        self.url_name = url_name
+        super().__init__(attrs, choices)
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs.setdefault('class', 'form-select')
+        attrs['data-autocompletar'] = reverse(self.url_name)
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        """Solo la opción vacía y las opciones seleccionadas"""
+        default = (None, [], 0)
+        groups = [default]
+        campo = self.choices.field
+        seleccionados = {str(v) for v in value if str(v) not in campo.empty_values}
+        # Igual que el Select normal: opción vacía salvo que el campo la haya quitado
+        if not self.allow_multiple_selected and campo.empty_label is not None:
+            default[1].append(self.create_option(name, '', campo.empty_label, False, 0))
+        if not seleccionados:
+            return groups
+        clave = campo.to_field_name or 'pk'
+        objetos = self.choices.queryset.filter(**{f'{clave}__in': seleccionados})
+        for indice, obj in enumerate(objetos, len(default[1])):
+            valor = campo.prepare_value(obj)
+            default[1].append(self.create_option(
+                name, valor, campo.label_from_instance(obj), True, indice, subindex=None, attrs=attrs,
+            ))
+        return groups
+
+
+class AutocompletarSelectMultiple(AutocompletarSelect, forms.SelectMultiple):
+    pass
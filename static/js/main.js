@@ -0,0 +1,122 @@
+/* Sistema Sirius - scripts comunes */
+
+/*
+ * Autocompletado para los <select data-autocompletar="url"> (AutocompletarSelect).
+ * El select solo trae las opciones elegidas; al escribir en el buscador se
+ * piden las coincidencias al servidor y se agregan como opción seleccionada.
+ */
+(function () {
+    'use strict';
+
+    const ESPERA_MS = 250;
+
+    function crearBuscador(select) {
+        const contenedor = document.createElement('div');
+        contenedor.className = 'autocompletar position-relative mb-1';
+
+        const entrada = document.createElement('input');
+        entrada.type = 'search';
+        entrada.className = 'form-control form-control-sm';
+        entrada.placeholder = 'Escriba para buscar...';
+        entrada.autocomplete = 'off';
+
+        const lista = document.createElement('div');
+        lista.className = 'list-group position-absolute w-100 shadow-sm autocompletar-resultados d-none';
+
+        contenedor.appendChild(entrada);
+        contenedor.appendChild(lista);
+        select.parentNode.insertBefore(contenedor, select);
+        return { entrada, lista };
+    }
+
+    function elegir(select, id, texto) {
+        let opcion = Array.from(select.options).find((o) => o.value === String(id));
+        if (!opcion) {
+            opcion = new Option(texto, id);
+            select.add(opcion);
+        }
+        if (!select.multiple) {
+            Array.from(select.options).forEach((o) => { o.selected = false; });
+        }
+        opcion.selected = true;
+        select.dispatchEvent(new Event('change', { bubbles: true }));
+    }
+
+    function mostrar(select, lista, datos, q, pagina) {
+        if (pagina === 1) {
+            lista.innerHTML = '';
+        } else {
+            const anterior = lista.querySelector('[data-mas]');
+            if (anterior) anterior.remove();
+        }
+        datos.results.forEach((item) => {
+            const boton = document.createElement('button');
+            boton.type = 'button';
+            boton.className = 'list-group-item list-group-item-action py-1';
+            boton.textContent = item.text;
+            boton.addEventListener('click', () => {
+                elegir(select, item.id, item.text);
+                lista.classList.add('d-none');
+            });
+            lista.appendChild(boton);
+        });
+        if (datos.pagination && datos.pagination.more) {
+            const mas = document.createElement('button');
+            mas.type = 'button';
+            mas.dataset.mas = '1';
+            mas.className = 'list-group-item list-group-item-action py-1 text-muted small';
+            mas.textContent = 'Ver más...';
+            mas.addEventListener('click', () => buscar(select, lista, q, pagina + 1));
+            lista.appendChild(mas);
+        }
+        if (!lista.children.length) {
+            lista.innerHTML = '<div class="list-group-item py-1 text-muted small">Sin resultados</div>';
+        }
+        lista.classList.remove('d-none');
+    }
+
+    function buscar(select, lista, q, pagina) {
+        const url = new URL(select.dataset.autocompletar, window.location.origin);
+        // data-autocompletar-param cambia el nombre del texto buscado (el admin usa "term")
+        url.searchParams.set(select.dataset.autocompletarParam || 'q', q);
+        url.searchParams.set('page', pagina);
+        fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' }, credentials: 'same-origin' })
+            .then((respuesta) => (respuesta.ok ? respuesta.json() : Promise.reject(respuesta)))
+            .then((datos) => mostrar(select, lista, datos, q, pagina))
+            .catch(() => lista.classList.add('d-none'));
+    }
+
+    function iniciar(select) {
+        if (select.dataset.autocompletarListo) return;
+        select.dataset.autocompletarListo = '1';
+        const { entrada, lista } = crearBuscador(select);
+        let temporizador = null;
+
+        entrada.addEventListener('input', () => {
+            clearTimeout(temporizador);
+            temporizador = setTimeout(() => buscar(select, lista, entrada.value.trim(), 1), ESPERA_MS);
+        });
+        entrada.addEventListener('focus', () => {
+            if (!lista.children.length) buscar(select, lista, entrada.value.trim(), 1);
+            else lista.classList.remove('d-none');
+        });
+        document.addEventListener('click', (evento) => {
+            if (!entrada.parentNode.contains(evento.target)) lista.classList.add('d-none');
+        });
+        if (select.multiple) {
+            // Doble clic quita una opción elegida; las que quedan se envían todas
+            select.addEventListener('dblclick', (evento) => {
+                if (evento.target.tagName === 'OPTION') evento.target.remove();
+            });
+            if (select.form) {
+                select.form.addEventListener('submit', () => {
+                    Array.from(select.options).forEach((o) => { o.selected = true; });
+                });
+            }
+        }
+    }
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('select[data-autocompletar]').forEach(iniciar);
+    });
+})();